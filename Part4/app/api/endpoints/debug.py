@@ -0,0 +1,12 @@
+from fastapi import APIRouter, Query
+from app.core.heavy_hitters import hot_key_trackers
+
+router = APIRouter()
+
+@router.get("/debug/hot-keys")
+async def read_hot_keys(limit: int = Query(20, ge=1, le=256)):
+    """
+    Endpoint to get the most requested cache keys, per cache, most requested first.
+    Counts are approximate and decay over time; "error" is how much a count may be over-estimated.
+    """
+    return {name: tracker.top(limit) for name, tracker in hot_key_trackers.items()}
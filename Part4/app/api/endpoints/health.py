@@ -1,4 +1,5 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Response, status
+from app.core.warmup import readiness
 
 router = APIRouter()
 
@@ -7,4 +8,14 @@ async def read_root():
     """
     Root endpoint, serving as a health check endpoint for now.
     """
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+@router.get("/ready")
+async def read_readiness(response: Response):
+    """
+    Readiness endpoint. Unlike the health check, it reports ready only once the
+    startup warm-up has completed or timed out, and 503 until then.
+    """
+    if not readiness.ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return readiness.snapshot()
\ No newline at end of file
@@ -0,0 +1,11 @@
+from fastapi import APIRouter
+from app.core.metrics import metrics
+
+router = APIRouter()
+
+@router.get("/metrics")
+async def read_metrics():
+    """
+    Endpoint to get the in-process counters, e.g. deadline-exceeded outcomes per route.
+    """
+    return metrics.snapshot()
@@ -14,6 +14,7 @@ def read_orders(
 ):
     """
     Endpoint to get a list of orders with pagination and filtering.
+    You can filter with filter[field][$op]=value, e.g. "filter[total][$gte]=100&filter[status][$in]=pending,paid".
     """
     return ordersResponse
 
@@ -1,7 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from app.core.error import ErrorModel
+from app.core.product_facets_query import FacetRebuildResponse, ProductFacetsResponse
 from app.core.product_list_query import ProductListResponse
-from app.core.product_service import get_product_by_id, list_products
+from app.core.product_suggest_query import ProductSuggestResponse
+from app.core.product_service import (get_product_by_id, get_product_facets, get_product_suggestions, list_products,
+                                      rebuild_product_facets)
 from app.models.product import ProductModel
 
 router = APIRouter()
@@ -15,6 +18,8 @@ def read_products(
     """
     Endpoint to get a list of products with pagination and filtering.
     You can filter by name or exact category.
+    You can also filter with filter[field][$op]=value, e.g. "filter[price][$gte]=100&filter[tags][$in]=sale,new".
+    Supported operators are $eq (the default), $ne, $gt, $gte, $lt, $lte, $in, $nin and $all, depending on the field.
     You can also sort by multiple fields, separated by commas. (e.g. "name:asc,price:desc" or "name:1,price:-1").
 
     Returns:
@@ -22,6 +27,48 @@ def read_products(
     """
     return productsResponse
 
+@router.get("/products/facets",
+            response_model=ProductFacetsResponse,
+            )
+def read_product_facets(
+    facetsResponse = Depends(get_product_facets)
+):
+    """
+    Endpoint to get the number of products per category, tag and price bucket.
+    You can narrow the counts to a category, to products having all of the given tags (e.g. "tags=sale&tags=new")
+    and to a price range with minPrice (inclusive) and maxPrice (exclusive).
+
+    Returns:
+        The number of matching products, the most frequent categories and tags, and the price histogram.
+    """
+    return facetsResponse
+
+@router.post("/products/facets/rebuild",
+             response_model=FacetRebuildResponse,
+             )
+def rebuild_facets(
+    rebuildResponse = Depends(rebuild_product_facets)
+):
+    """
+    Endpoint to rebuild the facet counts from the products collection.
+    """
+    return rebuildResponse
+
+@router.get("/products/suggest",
+            response_model=ProductSuggestResponse,
+            )
+def read_product_suggestions(
+    suggestResponse = Depends(get_product_suggestions)
+):
+    """
+    Endpoint to get typeahead suggestions: products whose name, or a later word of it, starts with q,
+    and tags starting with q. Matching ignores case, accents and punctuation.
+
+    Returns:
+        Suggestions, most popular (ordered and reviewed) first.
+    """
+    return suggestResponse
+
 @router.get("/products/{product_id}",
             response_model=ProductModel,
             responses= {
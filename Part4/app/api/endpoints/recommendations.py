@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from app.core.error import ErrorModel
+from app.core.recommendation_query import FrequentlyBoughtTogetherResponse, SimilarProductsResponse
+from app.core.recommendation_service import get_frequently_bought_together, get_similar_products
+
+router = APIRouter()
+
+@router.get("/products/{product_id}/frequently-bought-together",
+            response_model=FrequentlyBoughtTogetherResponse,
+            )
+def read_frequently_bought_together(
+    recommendationsResponse = Depends(get_frequently_bought_together)
+):
+    """
+    Endpoint to get the products most often ordered together with a product.
+    The lists are refreshed by the co-purchase job (python -m app.core.co_purchase), not on every order.
+    """
+    return recommendationsResponse
+
+@router.get("/products/{product_id}/similar",
+            response_model=SimilarProductsResponse,
+            responses= {
+                404: {
+                    "description": "Product not found, or without tags and categories",
+                    "model": ErrorModel,
+                },
+            }
+            )
+def read_similar_products(
+    similarResponse = Depends(get_similar_products)
+):
+    """
+    Endpoint to get the products sharing the most tags and categories with a product,
+    scored by Jaccard similarity. Unlike frequently-bought-together, it works for products never ordered.
+    """
+    if not similarResponse:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
+    return similarResponse
@@ -0,0 +1,50 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from app.core.error import ErrorModel
+from app.core.review_list_query import ReviewListResponse
+from app.core.review_service import create_product_review, list_product_reviews
+from app.models.review import ReviewModel
+
+router = APIRouter()
+
+@router.get("/products/{product_id}/reviews",
+            response_model=ReviewListResponse,
+            responses= {
+                404: {
+                    "description": "Product not found",
+                    "model": ErrorModel,
+                },
+            }
+            )
+def read_product_reviews(
+    reviewsResponse = Depends(list_product_reviews)
+):
+    """
+    Endpoint to get the reviews of a product, newest first.
+    Pass the nextCursor of a page as the cursor parameter to get the next page.
+    """
+    if not reviewsResponse:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
+    return reviewsResponse
+
+@router.post("/products/{product_id}/reviews", status_code=status.HTTP_201_CREATED,
+             response_model=ReviewModel,
+             responses= {
+                404: {
+                    "description": "Product not found",
+                    "model": ErrorModel,
+                },
+                409: {
+                    "description": "Concurrent reviews kept conflicting",
+                    "model": ErrorModel,
+                },
+             }
+            )
+def create_review(
+    reviewResponse = Depends(create_product_review)
+):
+    """
+    Endpoint to review a product. The product's rating and reviewCount are updated with the review.
+    """
+    if not reviewResponse:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
+    return reviewResponse
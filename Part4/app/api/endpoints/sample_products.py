@@ -1,7 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from typing import List, Optional
 from pydantic import BaseModel
+from app.core.config import settings
+from app.core.deadline import Deadline, request_deadline
 from app.core.mongodb_connection import MongoDBConnection
+from app.core.part4_products_query import fetch_page
 import pymongo
 
 router = APIRouter()
@@ -20,50 +23,21 @@ async def get_products(
     page: int = Query(1, alias="pagination[page]", ge=1),
     page_size: int = Query(10, alias="pagination[pageSize]", ge=1),
     category: Optional[str] = None,
+    strategy: Optional[str] = Query(None, pattern="^(facet|concurrent)$"),
+    deadline: Deadline = Depends(request_deadline("part4_products")),
 ):
-    query = {}
-    if category:
-        query["category"] = category
-
-    pipeline = [
-        {
-            "$match": {
-                "category": {
-                    "$regex": category if category else "",
-                    "$options": "i"
-                }
-            } if category else {}
-        },
-        {
-            "$sort": {
-                "name": 1
-            }
-        },
-        {
-            "$facet": {
-                "metadata": [
-                    {"$count": "totalCount"}
-                ],
-                "data": [
-                    {"$skip": (page - 1) * page_size},
-                    {"$limit": page_size}
-                ]
-            }
-        }
-    ]
-
+    """
+    List products by name, optionally in a category.
+    The strategy parameter overrides PART4_PRODUCTS_STRATEGY: "facet" matches the category as a
+    case-insensitive pattern and counts inside the same pipeline, "concurrent" matches it exactly
+    (ignoring case) and runs the page query and the cached count concurrently.
+    """
     async with MongoDBConnection.get_collection(
         "ecommercedb", "products"
     ) as collection:
-        cursor = collection.aggregate(pipeline)
-        agg_result = await cursor.to_list(length=None)
-        if agg_result:
-            metadata = agg_result[0].get("metadata", [])
-            products = agg_result[0].get("data", [])
-            total = metadata[0]["totalCount"] if metadata else 0
-        else:
-            products = []
-            total = 0
+        products, total = await fetch_page(
+            strategy or settings.PART4_PRODUCTS_STRATEGY, collection, category, page, page_size, deadline
+        )
         # Some quick workarounds to work with data types. Should be unrelated to the assignment
         for product in products:
             product["_id"] = str(product["_id"])
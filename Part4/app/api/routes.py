@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.endpoints import health, products, orders, sample_products
+from app.api.endpoints import debug, health, metrics, products, orders, recommendations, reviews, sample_products
 
 router = APIRouter()
 
@@ -9,9 +9,21 @@ router.include_router(health.router,
 router.include_router(products.router,
                       tags=['Products'], 
                       prefix='/api/v1')
+router.include_router(reviews.router,
+                      tags=['Reviews'], 
+                      prefix='/api/v1')
+router.include_router(recommendations.router,
+                      tags=['Recommendations'], 
+                      prefix='/api/v1')
 router.include_router(orders.router,
                       tags=['Orders'], 
                       prefix='/api/v1')
+router.include_router(metrics.router,
+                      tags=['Metrics'], 
+                      prefix='/api/v1')
+router.include_router(debug.router,
+                      tags=['Debug'], 
+                      prefix='/api/v1')
 
 # Add sample endpoint of Part 4 assignment
 router.include_router(sample_products.router,
@@ -0,0 +1,48 @@
+from typing import Any, Dict, Mapping, Type, TypeVar
+
+from pydantic import BaseModel, SerializationInfo
+
+M = TypeVar("M", bound=BaseModel)
+
+# Serialization context telling models to dump MongoDB-native types
+BSON_CONTEXT = {"bson": True}
+
+
+def is_bson_context(info: SerializationInfo) -> bool:
+    """
+    Returns:
+        bool: Whether a model is being serialized for MongoDB by `to_bson`.
+    """
+    return info.mode == "python" and bool(info.context) and info.context.get("bson", False)
+
+
+def to_bson(model: BaseModel) -> Dict[str, Any]:
+    """
+    Convert a model to a document that can be written to MongoDB as is.
+
+    Unlike `jsonable_encoder`, nothing goes through JSON: ObjectIds stay ObjectIds,
+    datetimes stay datetimes (stored as BSON dates, so they can be range-queried and
+    indexed), and MongoTimestamps become BSON Timestamps. Fields are keyed by alias,
+    so `id` is written as `_id`.
+
+    Args:
+        model (BaseModel): The model to convert.
+
+    Returns:
+        Dict[str, Any]: The BSON-ready document.
+    """
+    return model.model_dump(by_alias=True, context=BSON_CONTEXT)
+
+
+def from_bson(model_type: Type[M], document: Mapping[str, Any]) -> M:
+    """
+    Convert a document read from MongoDB to a model.
+
+    Args:
+        model_type (Type[M]): The model class.
+        document (Mapping[str, Any]): The document as returned by pymongo.
+
+    Returns:
+        M: The validated model.
+    """
+    return model_type.model_validate(document)
@@ -0,0 +1,138 @@
+"""
+Keeps the product_catalog read model in sync with the products collection.
+
+Every product change published on `product_events` is projected onto the catalog,
+whether it comes from this application's writes or from the change stream watcher.
+Once the catalog has the change, the versions that cached listing pages and their
+ETags depend on are bumped, so no page read before the change is served after it.
+At warm-up the catalog is backfilled if it is empty or out of date. Until then, and
+whenever the change stream watcher is not running (so writes of other processes can be
+missed), listings read the products collection instead.
+The catalog can also be rebuilt from scratch and checked for drift from the command line.
+
+Usage:
+    python -m app.core.catalog_projection rebuild
+    python -m app.core.catalog_projection check [--repair]
+"""
+import json
+import sys
+import threading
+from typing import Any, Dict, Optional, Set, Tuple
+
+from bson import ObjectId
+from pymongo import MongoClient
+
+from app.core.config import settings
+from app.core.product_events import product_events
+from app.repository.catalog_repository import CatalogRepository
+from app.repository.version_repository import VersionRepository
+
+
+class CatalogProjector:
+    """
+    Applies product changes to the catalog, once bound to the application's MongoDB client.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._repositories: Optional[Tuple[CatalogRepository, VersionRepository]] = None
+        # Whether the catalog was found, or made, up to date with the products collection
+        self.synced = False
+        # Products changed while a backfill runs, by _id
+        self._touched: Optional[Set[Any]] = None
+
+    @property
+    def current(self) -> bool:
+        """
+        Whether listings can be served from the catalog: it was synced, and the change stream
+        watcher has kept it up to date with the writes of other processes since.
+        """
+        return self.synced and product_events.watching
+
+    def bind(self, mongo_client: Optional[MongoClient]) -> None:
+        with self._lock:
+            if mongo_client is None:
+                self._repositories = None
+            else:
+                self._repositories = (CatalogRepository(mongo_client), VersionRepository(mongo_client))
+
+    def on_upsert(self, product: Dict[str, Any]) -> None:
+        repositories = self._repositories
+        if repositories is None:
+            return
+        catalog_repository, version_repository = repositories
+        touched = self._touched
+        if touched is not None:
+            touched.add(product["_id"])
+        previous_categories = catalog_repository.upsert(product)
+        if previous_categories is not None:
+            # Listings of the categories the product left are invalidated too
+            version_repository.bump_products(previous_categories + list(product.get("categories") or ()))
+
+    def on_delete(self, product_id: str) -> None:
+        repositories = self._repositories
+        if repositories is None:
+            return
+        catalog_repository, version_repository = repositories
+        product_id = ObjectId(product_id) if ObjectId.is_valid(product_id) else product_id
+        touched = self._touched
+        if touched is not None:
+            touched.add(product_id)
+        categories = catalog_repository.delete(product_id)
+        version_repository.bump_products(categories)
+
+    def sync(self, mongo_client: MongoClient) -> int:
+        """
+        Backfill the catalog from the products collection if it is empty or out of date.
+        Products changed while the rebuild runs are projected again afterwards, as the
+        rebuild may have read them before the change.
+
+        Args:
+            mongo_client (MongoClient): The application's MongoDB client.
+
+        Returns:
+            int: The number of catalog documents written, 0 if the catalog was up to date.
+        """
+        catalog_repository = CatalogRepository(mongo_client)
+        if not catalog_repository.is_stale():
+            self.synced = True
+            return 0
+        self._touched = set()
+        try:
+            count = catalog_repository.rebuild()
+        finally:
+            touched, self._touched = self._touched, None
+        if touched:
+            catalog_repository.refresh(touched)
+        # Every cached listing page may predate the backfill
+        version_repository = VersionRepository(mongo_client)
+        version_repository.bump_products(catalog_repository.categories())
+        self.synced = True
+        return count
+
+# Create a global catalog projector, kept up to date with product changes
+catalog_projector = CatalogProjector()
+product_events.subscribe(catalog_projector.on_upsert, catalog_projector.on_delete)
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    if command not in ("rebuild", "check"):
+        print(__doc__)
+        sys.exit(2)
+    client = MongoClient(settings.MONGODB_URL, tz_aware=True)
+    try:
+        catalog_repository = CatalogRepository(client)
+        if command == "rebuild":
+            print(f"Catalog rebuilt: {catalog_repository.rebuild()} product(s)")
+            return
+        repair = "--repair" in sys.argv
+        report = catalog_repository.check_consistency(repair=repair)
+    finally:
+        client.close()
+    print(json.dumps(report, indent=2))
+    if not repair and (report["missing"] or report["stale"] or report["orphaned"]):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+Builds the "frequently bought together" lists from order co-occurrence.
+
+Every pair of distinct products in an order is counted, and each product keeps its
+top-K co-purchased products in the product_neighbours collection. A full run recounts
+every order and replaces the collection; an incremental run only counts the orders
+created since the previous run and adds them to the stored lists.
+
+Usage:
+    python -m app.core.co_purchase [--full]
+"""
+import json
+import math
+import os
+import sys
+import tempfile
+from collections import defaultdict
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+from pymongo import MongoClient
+
+from app.core.config import settings
+from app.repository.order_repository import OrderRepository
+from app.repository.recommendation_repository import RecommendationRepository
+
+# A pair of product codes is one int64: the product in the high 32 bits, its neighbour in the low ones
+_CODE_BITS = 32
+_CODE_MASK = (1 << _CODE_BITS) - 1
+# Bytes per spilled (pair, count) record, and how much more numpy needs to aggregate them
+_RECORD_BYTES = 16
+_AGGREGATION_OVERHEAD = 4
+
+
+class CoPurchaseCounter:
+    """
+    Counts product pairs of orders as a sparse matrix of pair codes, within a memory budget.
+
+    Orders are buffered until their pairs would use a quarter of the budget. The buffered pairs
+    are then generated and aggregated with numpy, and spilled to `partitions` files by product,
+    so the top neighbours can be selected one partition at a time. A partition too large for
+    the budget is split again before it is aggregated.
+    """
+    def __init__(self, spill_dir: str, memory_budget_bytes: int, partitions: int, max_items_per_order: int):
+        self.spill_dir = spill_dir
+        self.memory_budget_bytes = memory_budget_bytes
+        self.partitions = partitions
+        self.max_items_per_order = max_items_per_order
+        self.orders = 0
+        self.product_ids: List[str] = []
+        self._codes: Dict[str, int] = {}
+        self._pending: Dict[int, List[List[int]]] = defaultdict(list)
+        self._pending_pairs = 0
+        self._files = [open(self._partition_path(p), "wb") for p in range(partitions)]
+
+    def _partition_path(self, partition: int) -> str:
+        return os.path.join(self.spill_dir, f"pairs-{partition}.bin")
+
+    def _code(self, product_id: str) -> int:
+        code = self._codes.get(product_id)
+        if code is None:
+            code = self._codes[product_id] = len(self.product_ids)
+            self.product_ids.append(product_id)
+        return code
+
+    def add(self, product_ids: Iterable[Any]) -> None:
+        """
+        Count the product pairs of one order. Repeated products count once, and only the
+        first `max_items_per_order` distinct products of very large orders are paired.
+        """
+        self.orders += 1
+        codes = sorted({self._code(str(product_id)) for product_id in product_ids})[:self.max_items_per_order]
+        if len(codes) < 2:
+            return
+        self._pending[len(codes)].append(codes)
+        self._pending_pairs += len(codes) * (len(codes) - 1)
+        if self._pending_pairs * _RECORD_BYTES * _AGGREGATION_OVERHEAD > self.memory_budget_bytes:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Aggregate the buffered orders and spill their pair counts to the partition files.
+        """
+        if not self._pending:
+            return
+        pairs = []
+        # Orders of the same size form a matrix, whose pairs of columns are the product pairs
+        for size, orders in self._pending.items():
+            matrix = np.array(orders, dtype=np.int64)
+            left, right = np.triu_indices(size, 1)
+            first, second = matrix[:, left].ravel(), matrix[:, right].ravel()
+            pairs.append((first << _CODE_BITS) | second)
+            pairs.append((second << _CODE_BITS) | first)
+        self._pending.clear()
+        self._pending_pairs = 0
+        codes, counts = np.unique(np.concatenate(pairs), return_counts=True)
+        partitions = (codes >> _CODE_BITS) % self.partitions
+        for partition, spill_file in enumerate(self._files):
+            selected = partitions == partition
+            np.column_stack((codes[selected], counts[selected])).tofile(spill_file)
+
+    def _split(self, path: str, divisor: int, parts: int) -> List[Tuple[str, int]]:
+        # Rows of this file share their value modulo `divisor`, so the next digit spreads them
+        paths = [f"{path}.{part}" for part in range(parts)]
+        files = [open(part_path, "wb") for part_path in paths]
+        chunk_records = max(1, self.memory_budget_bytes // (_RECORD_BYTES * _AGGREGATION_OVERHEAD))
+        try:
+            with open(path, "rb") as spill_file:
+                while True:
+                    records = np.fromfile(spill_file, dtype=np.int64, count=chunk_records * 2).reshape(-1, 2)
+                    if not len(records):
+                        break
+                    parts_of = ((records[:, 0] >> _CODE_BITS) // divisor) % parts
+                    for part, part_file in enumerate(files):
+                        records[parts_of == part].tofile(part_file)
+        finally:
+            for part_file in files:
+                part_file.close()
+        os.remove(path)
+        return [(part_path, divisor * parts) for part_path in paths]
+
+    def _aggregate(self, path: str, top_k: int) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+        records = np.fromfile(path, dtype=np.int64).reshape(-1, 2)
+        os.remove(path)
+        if not len(records):
+            return
+        codes, inverse = np.unique(records[:, 0], return_inverse=True)
+        counts = np.bincount(inverse, weights=records[:, 1]).astype(np.int64)
+        del records, inverse
+        products, neighbours = codes >> _CODE_BITS, codes & _CODE_MASK
+        # By product, then most co-purchased first, keeping the first top_k of each product
+        order = np.lexsort((neighbours, -counts, products))
+        products, neighbours, counts = products[order], neighbours[order], counts[order]
+        starts = np.flatnonzero(np.r_[True, products[1:] != products[:-1]])
+        ranks = np.arange(len(products)) - np.repeat(starts, np.diff(np.r_[starts, len(products)]))
+        kept = ranks < top_k
+        products, neighbours, counts = products[kept], neighbours[kept], counts[kept]
+        bounds = np.flatnonzero(np.r_[True, products[1:] != products[:-1], True])
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            yield self.product_ids[products[start]], [
+                {"productId": self.product_ids[neighbour], "count": int(count)}
+                for neighbour, count in zip(neighbours[start:end].tolist(), counts[start:end].tolist())
+            ]
+
+    def top_neighbours(self, top_k: int) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+        """
+        Select the most co-purchased products of every product, one partition at a time.
+
+        Args:
+            top_k (int): The number of neighbours to keep per product.
+
+        Returns:
+            Iterator[Tuple[str, List[Dict[str, Any]]]]: Product IDs and their neighbours
+            with co-purchase counts, most co-purchased first.
+        """
+        self.flush()
+        for spill_file in self._files:
+            spill_file.close()
+        limit = self.memory_budget_bytes // _AGGREGATION_OVERHEAD
+        pending = [(self._partition_path(p), self.partitions) for p in range(self.partitions)]
+        while pending:
+            path, divisor = pending.pop()
+            size = os.path.getsize(path)
+            # A single product's pairs cannot be split further, whatever their size
+            if size > limit and divisor < len(self.product_ids):
+                pending.extend(self._split(path, divisor, math.ceil(size / limit)))
+            else:
+                yield from self._aggregate(path, top_k)
+
+
+def run_co_purchase_job(mongo_client: MongoClient, full: bool = False) -> Dict[str, Any]:
+    """
+    Count co-purchases and store the top neighbours of every product.
+
+    An incremental run counts the orders with an _id greater than the last one counted, and
+    adds them to the stored lists. Pairs that were below a product's top-K are only counted
+    from the new orders, so lists drift from exact counts until the next full run.
+
+    Args:
+        mongo_client (MongoClient): The MongoDB client.
+        full (bool): Recount every order and replace all lists. Implied when there was no run yet.
+
+    Returns:
+        Dict[str, Any]: Whether the run was full, the number of orders counted and of products written.
+    """
+    recommendation_repository = RecommendationRepository(mongo_client)
+    order_repository = OrderRepository(mongo_client)
+    last_order_id = None if full else recommendation_repository.get_last_counted_order_id()
+    full = last_order_id is None
+    if settings.CO_PURCHASE_SPILL_DIR:
+        os.makedirs(settings.CO_PURCHASE_SPILL_DIR, exist_ok=True)
+    with tempfile.TemporaryDirectory(prefix="co_purchase_", dir=settings.CO_PURCHASE_SPILL_DIR) as spill_dir:
+        counter = CoPurchaseCounter(
+            spill_dir,
+            memory_budget_bytes=settings.CO_PURCHASE_MEMORY_BUDGET_MB * 1024 * 1024,
+            partitions=settings.CO_PURCHASE_PARTITIONS,
+            max_items_per_order=settings.CO_PURCHASE_MAX_ITEMS_PER_ORDER
+        )
+        for order in order_repository.iter_order_items(after_id=last_order_id):
+            counter.add(item["productId"] for item in order.get("orderItems") or ())
+            last_order_id = order["_id"]
+        neighbours = counter.top_neighbours(settings.CO_PURCHASE_TOP_K)
+        if full:
+            written = recommendation_repository.replace_neighbours(neighbours)
+        else:
+            written = recommendation_repository.merge_neighbours(neighbours, settings.CO_PURCHASE_TOP_K)
+    if last_order_id is not None:
+        recommendation_repository.set_last_counted_order_id(last_order_id)
+    return {"full": full, "orders": counter.orders, "products": written}
+
+
+def main():
+    client = MongoClient(settings.MONGODB_URL, tz_aware=True)
+    try:
+        report = run_co_purchase_job(client, full="--full" in sys.argv)
+    finally:
+        client.close()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import hashlib
+from datetime import datetime
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import HTTPException, Request, status
+
+from app.core.config import settings
+
+
+def strong_etag(*parts: object) -> str:
+    """
+    Build a strong ETag from the parts that identify one exact representation.
+
+    Returns:
+        str: A quoted entity tag, e.g. '"3f2a..."'.
+    """
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return f'"{digest}"'
+
+
+def weak_etag(*parts: object) -> str:
+    """
+    Build a weak ETag, for representations that are only semantically equivalent
+    (e.g. a listing page derived from a collection version).
+
+    Returns:
+        str: A weak entity tag, e.g. 'W/"3f2a..."'.
+    """
+    return f"W/{strong_etag(*parts)}"
+
+
+def is_conditional(request: Request) -> bool:
+    """
+    Returns:
+        bool: Whether the request carries a validator we could answer with 304.
+    """
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match uses the weak comparison function (RFC 9110, 13.1.2)
+    if if_none_match.strip() == "*":
+        return True
+    opaque_tag = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque_tag
+        for candidate in if_none_match.split(",")
+    )
+
+
+def _not_modified_since(if_modified_since: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    return last_modified.replace(microsecond=0) <= since
+
+
+def cache_headers(route: str, etag: str, last_modified: Optional[datetime] = None) -> dict:
+    """
+    Build the validator and `Cache-Control` headers for a route.
+
+    Args:
+        route (str): The route name, used to look up `CACHE_CONTROL_POLICIES`.
+        etag (str): The ETag of the representation.
+        last_modified (Optional[datetime]): When the resource last changed, if known.
+
+    Returns:
+        dict: The headers to send with both 200 and 304 responses.
+    """
+    headers = {"ETag": etag}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    policy = settings.CACHE_CONTROL_POLICIES.get(route)
+    if policy:
+        headers["Cache-Control"] = policy
+    return headers
+
+
+def check_not_modified(
+    request: Request,
+    route: str,
+    etag: str,
+    last_modified: Optional[datetime] = None
+) -> None:
+    """
+    Answer a conditional GET before the body is loaded or serialized.
+
+    `If-None-Match` takes precedence; `If-Modified-Since` is only evaluated when
+    it is absent.
+
+    Raises:
+        HTTPException: 304 Not Modified, carrying the cache headers, when the
+            client's copy is still current.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        not_modified = _etag_matches(if_none_match, etag)
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        not_modified = (
+            if_modified_since is not None
+            and last_modified is not None
+            and _not_modified_since(if_modified_since, last_modified)
+        )
+    if not_modified:
+        raise HTTPException(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers=cache_headers(route, etag, last_modified)
+        )
+
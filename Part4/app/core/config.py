@@ -1,3 +1,4 @@
+from typing import Dict, List, Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
@@ -14,5 +15,93 @@ class Settings(BaseSettings):
     MONGODB_DATABASE: str = "ecommercedb"
     MONGODB_MAX_CONNECTIONS_COUNT: int = 10
     MONGODB_MIN_CONNECTIONS_COUNT: int = 1
+    # Request deadlines, in milliseconds. Budgets are per route and can be
+    # overridden per request with the DEADLINE_HEADER, up to DEADLINE_MAX_MS.
+    DEADLINE_HEADER: str = "X-Request-Deadline-Ms"
+    DEADLINE_DEFAULT_MS: int = 5000
+    DEADLINE_MAX_MS: int = 30000
+    DEADLINE_ROUTE_BUDGETS_MS: Dict[str, int] = {
+        "list_products": 2000,
+        "get_product_by_id": 1000,
+        "list_product_reviews": 1000,
+        "get_frequently_bought_together": 500,
+        "list_orders": 2000,
+        "get_order_by_id": 1000,
+        "get_orders_by_customer_id": 2000,
+        "part4_products": 3000,
+        "get_product_facets": 1000,
+        "get_product_suggestions": 500,
+    }
+    DEADLINE_DISCONNECT_POLL_MS: int = 50
+    # Cache-Control header sent with ETag'd responses, per route
+    CACHE_CONTROL_POLICIES: Dict[str, str] = {
+        "get_product_by_id": "public, max-age=60, must-revalidate",
+        "list_products": "public, max-age=30, must-revalidate",
+        "list_orders": "private, no-cache",
+    }
+    # Page-level response cache. The shared tier is only used when a Redis URL is set,
+    # and is skipped for RESPONSE_CACHE_REDIS_BACKOFF_SECONDS after a failure.
+    RESPONSE_CACHE_MAX_ENTRIES: int = 1024
+    RESPONSE_CACHE_TTL_SECONDS: float = 300
+    RESPONSE_CACHE_REDIS_URL: Optional[str] = None
+    RESPONSE_CACHE_REDIS_TIMEOUT_MS: int = 50
+    RESPONSE_CACHE_REDIS_BACKOFF_SECONDS: float = 10
+    RESPONSE_CACHE_KEY_PREFIX: str = "rc:"
+    # Startup warm-up. The readiness endpoint reports ready once it completes or times out.
+    WARMUP_ENABLED: bool = True
+    WARMUP_TIMEOUT_SECONDS: float = 30
+    WARMUP_CONNECTIONS: int = 10
+    WARMUP_TOP_PRODUCTS: int = 100
+    WARMUP_TOP_CATEGORIES: int = 10
+    WARMUP_PAGES_PER_CATEGORY: int = 1
+    WARMUP_PAGE_SIZE: int = 10
+    # Facet counts. Price buckets are [edge, next edge), the last one is open-ended.
+    FACET_PRICE_BUCKETS: List[float] = [0, 10, 25, 50, 100, 250, 500, 1000]
+    FACET_DEFAULT_LIMIT: int = 20
+    # Retry-After of the 503 answered while an in-memory index (facets, suggest, similarity)
+    # is first built in the background
+    INDEX_RETRY_AFTER_SECONDS: int = 5
+    # Publish product changes made by other processes to the in-memory indexes, the catalog and the
+    # listing versions. Requires a replica set. Without it, listings read the products collection
+    # and are not cached, since writes made elsewhere would not change their version.
+    PRODUCT_CHANGE_STREAM_ENABLED: bool = True
+    # Reviews. The most recent ones are embedded in the product, older ones are in the reviews collection.
+    REVIEWS_EMBEDDED_LIMIT: int = 10
+    REVIEWS_DEFAULT_PAGE_SIZE: int = 10
+    REVIEW_WRITE_RETRIES: int = 5
+    # Part4 products endpoint. "facet" counts inside one $facet pipeline, "concurrent" runs an
+    # equality-matched page query and a cached count concurrently.
+    PART4_PRODUCTS_STRATEGY: str = "facet"
+    PART4_COUNT_CACHE_MAX_ENTRIES: int = 1024
+    PART4_COUNT_CACHE_TTL_SECONDS: float = 30
+    # Hot key tracking. In-process caches only admit a key over their eviction victim if it
+    # is requested more often (TinyLFU). Counts are halved every HOT_KEYS_SAMPLE_SIZE requests.
+    CACHE_ADMISSION_ENABLED: bool = True
+    HOT_KEYS_SKETCH_WIDTH: int = 16384
+    HOT_KEYS_SKETCH_DEPTH: int = 4
+    HOT_KEYS_SAMPLE_SIZE: int = 100000
+    HOT_KEYS_TOP_CAPACITY: int = 256
+    # Serialized products by ID, in process only. Entries are dropped when the product changes.
+    PRODUCT_CACHE_MAX_ENTRIES: int = 4096
+    PRODUCT_CACHE_TTL_SECONDS: float = 60
+
+    # Typeahead suggestions, from an in-memory prefix index of product names and tags.
+    # The least popular entries are left out when the index would exceed its budget.
+    SUGGEST_MEMORY_BUDGET_MB: int = 512
+    SUGGEST_MAX_WORDS_PER_NAME: int = 4
+    SUGGEST_DEFAULT_LIMIT: int = 10
+    # "Frequently bought together" job: top neighbours kept per product, memory used to count
+    # co-purchases (pairs beyond it are spilled to disk), and the largest order paired in full
+    CO_PURCHASE_TOP_K: int = 20
+    CO_PURCHASE_MEMORY_BUDGET_MB: int = 256
+    CO_PURCHASE_PARTITIONS: int = 16
+    CO_PURCHASE_MAX_ITEMS_PER_ORDER: int = 50
+    CO_PURCHASE_SPILL_DIR: Optional[str] = None
+    # "Related products" MinHash/LSH index over tags and categories. More bands find less similar
+    # products. The index is saved to the snapshot file at shutdown and loaded at startup.
+    SIMILARITY_NUM_PERM: int = 64
+    SIMILARITY_BANDS: int = 16
+    SIMILARITY_MAX_CANDIDATES: int = 1000
+    SIMILARITY_SNAPSHOT_PATH: Optional[str] = "data/similarity_index.npz"
 
 settings = Settings()     
\ No newline at end of file
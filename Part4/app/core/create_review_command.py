@@ -0,0 +1,8 @@
+from typing import Optional
+from pydantic import BaseModel, Field
+
+
+class CreateReviewCommand(BaseModel):
+    reviewAuthor: str
+    stars: int = Field(ge=1, le=5)
+    reviewText: Optional[str] = None
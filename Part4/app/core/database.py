@@ -1,8 +1,13 @@
-from typing import Callable
+import threading
+from typing import Callable, Optional
 from contextlib import contextmanager
 from fastapi import FastAPI
 from pymongo import MongoClient
+from app.core.catalog_projection import catalog_projector
 from app.core.config import settings
+from app.core.product_events import start_product_change_watcher
+from app.core.similarity_index import similarity_index
+from app.core.warmup import readiness, start_warmup
 
 
 class MongoDB:
@@ -10,10 +15,21 @@ class MongoDB:
     MongoDB class to hold a single MongoClient instance for the application.
     """
     client: MongoClient = None
+    # Set to stop the product change stream watcher, if it runs
+    change_watcher_stop: Optional[threading.Event] = None
 
 # Create a global MongoDB instance
 mongo_db = MongoDB()
 
+def get_mongodb() -> MongoClient:
+    """
+    Get the application's MongoClient outside of a request, e.g. in startup jobs.
+
+    Returns:
+        MongoClient: The MongoDB client instance, None before startup.
+    """
+    return mongo_db.client
+
 def mongodb_startup(app: FastAPI) -> None:
     """
     Establishes a connection to the MongoDB database on application startup.
@@ -30,6 +46,8 @@ def mongodb_startup(app: FastAPI) -> None:
         settings.MONGODB_URL,
         MaxPoolSize = settings.MONGODB_MAX_CONNECTIONS_COUNT,
         MinPoolSize = settings.MONGODB_MIN_CONNECTIONS_COUNT,
+        # Return BSON dates as aware UTC datetimes, so they serialize with their offset
+        tz_aware = True,
     )
     mongo_db.client = mongo_client
     app.state.mongo_client = mongo_client
@@ -51,7 +69,7 @@ def mongodb_shutdown(app: FastAPI) -> None:
 
 def create_start_app_handler(app: FastAPI) -> Callable:
     """
-    Creates an application startup handler that connects to MongoDB.
+    Creates an application startup handler that connects to MongoDB and starts the warm-up.
 
     Args:
         app (FastAPI): The FastAPI application instance.
@@ -61,6 +79,12 @@ def create_start_app_handler(app: FastAPI) -> Callable:
     """
     def start_app() -> None:
         mongodb_startup(app)
+        catalog_projector.bind(get_mongodb())
+        mongo_db.change_watcher_stop = start_product_change_watcher(get_mongodb())
+        if settings.WARMUP_ENABLED:
+            start_warmup(app, get_mongodb())
+        else:
+            readiness.mark_ready("disabled")
     return start_app
 
 def create_stop_app_handler(app: FastAPI) -> Callable:
@@ -75,5 +99,11 @@ def create_stop_app_handler(app: FastAPI) -> Callable:
     """
 
     def stop_app() -> None:
+        if mongo_db.change_watcher_stop:
+            mongo_db.change_watcher_stop.set()
+        catalog_projector.bind(None)
+        # Save the similarity index, so the next start only re-signs products changed meanwhile
+        if settings.SIMILARITY_SNAPSHOT_PATH and similarity_index.built and similarity_index.changes:
+            similarity_index.save(settings.SIMILARITY_SNAPSHOT_PATH)
         mongodb_shutdown(app)
     return stop_app
\ No newline at end of file
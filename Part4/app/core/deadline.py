@@ -0,0 +1,173 @@
+import asyncio
+import time
+from typing import AsyncGenerator, Awaitable, Callable, Optional, Set, TypeVar
+
+from fastapi import HTTPException, Request, status
+from pymongo.errors import ExecutionTimeout
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+T = TypeVar("T")
+
+# Non-standard status code (nginx convention) for requests the client abandoned.
+HTTP_499_CLIENT_CLOSED_REQUEST = 499
+
+
+class DeadlineExceeded(Exception):
+    """
+    Raised when a request has used up its time budget.
+    """
+
+
+class ClientDisconnected(Exception):
+    """
+    Raised when the client went away before the request was finished.
+    """
+
+
+class Deadline:
+    """
+    A per-request time budget.
+
+    The remaining budget is handed to MongoDB as `maxTimeMS` on every read, so
+    the server stops working on a query once the client would no longer wait for it.
+    The deadline can also be cancelled when the client disconnects; further
+    database calls are then skipped.
+    """
+    def __init__(self, budget_ms: int):
+        self.budget_ms = budget_ms
+        self._expires_at = time.monotonic() + budget_ms / 1000
+        self._cancelled = False
+        self._tasks: Set[asyncio.Future] = set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self._expires_at
+
+    def remaining_ms(self) -> int:
+        """
+        Returns:
+            int: Milliseconds left before the deadline, 0 once it has passed.
+        """
+        return max(0, int((self._expires_at - time.monotonic()) * 1000))
+
+    @property
+    def max_time_ms(self) -> int:
+        """
+        The remaining budget to pass to MongoDB as `maxTimeMS`.
+
+        Raises:
+            ClientDisconnected: If the client has gone away.
+            DeadlineExceeded: If there is no budget left to start another query.
+        """
+        self.check()
+        return max(1, self.remaining_ms())
+
+    def check(self) -> None:
+        """
+        Raise if the work for this request should be abandoned.
+        """
+        if self._cancelled:
+            raise ClientDisconnected()
+        if self.expired:
+            raise DeadlineExceeded()
+
+    def cancel(self) -> None:
+        """
+        Abandon the request. Pending awaitables started with `run` are cancelled.
+        """
+        self._cancelled = True
+        for task in list(self._tasks):
+            task.cancel()
+
+    async def run(self, awaitable: Awaitable[T]) -> T:
+        """
+        Await `awaitable` within the remaining budget.
+
+        Raises:
+            ClientDisconnected: If the client disconnects while waiting.
+            DeadlineExceeded: If the budget runs out while waiting.
+        """
+        self.check()
+        task = asyncio.ensure_future(awaitable)
+        self._tasks.add(task)
+        try:
+            return await asyncio.wait_for(task, timeout=self.remaining_ms() / 1000)
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded()
+        except asyncio.CancelledError:
+            if self._cancelled:
+                raise ClientDisconnected()
+            raise
+        finally:
+            self._tasks.discard(task)
+
+
+def resolve_budget_ms(route: str, header_value: Optional[str] = None) -> int:
+    """
+    Work out the budget for a route.
+
+    The route budget comes from `DEADLINE_ROUTE_BUDGETS_MS`, falling back to
+    `DEADLINE_DEFAULT_MS`. Clients can override it with the deadline header,
+    capped at `DEADLINE_MAX_MS`.
+
+    Args:
+        route (str): The route name, e.g. "list_products".
+        header_value (Optional[str]): The raw value of the deadline header, if sent.
+
+    Returns:
+        int: The budget in milliseconds.
+    """
+    budget_ms = settings.DEADLINE_ROUTE_BUDGETS_MS.get(route, settings.DEADLINE_DEFAULT_MS)
+    if header_value is not None:
+        if not header_value.isdigit() or int(header_value) <= 0:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid {settings.DEADLINE_HEADER} header. Must be a positive number of milliseconds."
+            )
+        budget_ms = int(header_value)
+    return min(budget_ms, settings.DEADLINE_MAX_MS)
+
+
+async def _watch_disconnect(request: Request, deadline: Deadline) -> None:
+    while not deadline.cancelled:
+        if await request.is_disconnected():
+            deadline.cancel()
+            return
+        await asyncio.sleep(settings.DEADLINE_DISCONNECT_POLL_MS / 1000)
+
+
+# Get a per-route deadline. Only use it on read routes, because watching for
+# a disconnect consumes the request body.
+def request_deadline(route: str) -> Callable:
+    async def _get_deadline(request: Request) -> AsyncGenerator[Deadline, None]:
+        deadline = Deadline(resolve_budget_ms(route, request.headers.get(settings.DEADLINE_HEADER)))
+        watcher = asyncio.create_task(_watch_disconnect(request, deadline))
+        try:
+            yield deadline
+        except (DeadlineExceeded, ExecutionTimeout):
+            metrics.increment("deadline_exceeded", route)
+            raise HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail="Deadline exceeded"
+            )
+        except ClientDisconnected:
+            metrics.increment("client_disconnected", route)
+            raise HTTPException(
+                status_code=HTTP_499_CLIENT_CLOSED_REQUEST,
+                detail="Client disconnected"
+            )
+        except HTTPException:
+            raise
+        except Exception:
+            metrics.increment("errors", route)
+            raise
+        finally:
+            watcher.cancel()
+
+    return _get_deadline
@@ -0,0 +1,305 @@
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.product_events import product_events
+
+
+class _Column:
+    """
+    A growable numpy array with amortized O(1) appends.
+    """
+    def __init__(self, dtype, capacity: int = 1024):
+        self._data = np.empty(capacity, dtype=dtype)
+        self.size = 0
+
+    def append(self, value) -> None:
+        if self.size == len(self._data):
+            grown = np.empty(len(self._data) * 2, dtype=self._data.dtype)
+            grown[:self.size] = self._data
+            self._data = grown
+        self._data[self.size] = value
+        self.size += 1
+
+    @property
+    def values(self) -> np.ndarray:
+        return self._data[:self.size]
+
+
+class _Facet:
+    """
+    The (row, value code) pairs of a multi-valued field, e.g. categories.
+    Counting the values of a set of rows is a single bincount.
+    """
+    def __init__(self):
+        self.codes: Dict[str, int] = {}
+        self.values: List[str] = []
+        self.pair_rows = _Column(np.int64)
+        self.pair_codes = _Column(np.int64)
+
+    def code(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def add(self, row: int, values: Iterable[str]) -> None:
+        for value in values:
+            self.pair_rows.append(row)
+            self.pair_codes.append(self.code(value))
+
+    def rows_with(self, value: str, row_count: int) -> np.ndarray:
+        mask = np.zeros(row_count, dtype=bool)
+        code = self.codes.get(value)
+        if code is not None:
+            mask[self.pair_rows.values[self.pair_codes.values == code]] = True
+        return mask
+
+    def counts(self, mask: np.ndarray) -> np.ndarray:
+        codes = self.pair_codes.values[mask[self.pair_rows.values]]
+        return np.bincount(codes, minlength=len(self.values))
+
+
+class FacetIndex:
+    """
+    Facet counts (categories, tags, price buckets) of the products collection, kept in memory.
+
+    Unfiltered counts are maintained incrementally as products change. Counts for a
+    filter are computed with vectorized operations over columnar arrays: products are
+    rows, a changed product gets a new row and its old row is marked dead, and the
+    arrays are compacted once dead rows outnumber live ones. Price arrays of filtered
+    sets are cached until the next change.
+    """
+    def __init__(self, price_edges: Sequence[float], price_cache_size: int = 256):
+        self._lock = threading.RLock()
+        self.price_edges = np.asarray(sorted(price_edges), dtype=np.float64)
+        self.price_cache_size = price_cache_size
+        # Changes applied while a rebuild scans the collection, by product ID (None for a delete)
+        self._touched: Optional[Dict[str, Optional[tuple]]] = None
+        self._reset()
+
+    def _reset(self) -> None:
+        self.built = False
+        self.generation = 0
+        self._products: Dict[str, Tuple[Tuple[str, ...], Tuple[str, ...], Optional[float]]] = {}
+        self._row_of: Dict[str, int] = {}
+        self._alive = _Column(np.bool_)
+        self._prices = _Column(np.float64)
+        self._categories = _Facet()
+        self._tags = _Facet()
+        self._category_counts: Counter = Counter()
+        self._tag_counts: Counter = Counter()
+        self._price_cache: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._products)
+
+    @staticmethod
+    def _fields(product: Dict[str, Any]) -> Tuple[Tuple[str, ...], Tuple[str, ...], Optional[float]]:
+        categories = tuple(sorted(set(product.get("categories") or ())))
+        tags = tuple(sorted(set(product.get("tags") or ())))
+        price = product.get("price")
+        return categories, tags, float(price) if price is not None else None
+
+    def _add_row(self, product_id: str, categories, tags, price) -> None:
+        row = self._alive.size
+        self._alive.append(True)
+        self._prices.append(np.nan if price is None else price)
+        self._categories.add(row, categories)
+        self._tags.add(row, tags)
+        self._row_of[product_id] = row
+
+    def _remove_locked(self, product_id: str) -> None:
+        previous = self._products.pop(product_id, None)
+        if previous is None:
+            return
+        categories, tags, _ = previous
+        # In-place subtraction drops the values no product has any more
+        self._category_counts -= Counter(categories)
+        self._tag_counts -= Counter(tags)
+        self._alive.values[self._row_of.pop(product_id)] = False
+
+    def _changed(self) -> None:
+        self.generation += 1
+        self._price_cache.clear()
+        dead_rows = self._alive.size - len(self._products)
+        if dead_rows > max(1024, len(self._products)):
+            self._compact()
+
+    def _compact(self) -> None:
+        products = self._products
+        self._alive = _Column(np.bool_)
+        self._prices = _Column(np.float64)
+        self._categories = _Facet()
+        self._tags = _Facet()
+        self._row_of = {}
+        for product_id, (categories, tags, price) in products.items():
+            self._add_row(product_id, categories, tags, price)
+
+    def rebuild(self, products: Iterable[Dict[str, Any]]) -> int:
+        """
+        Rebuild the whole index.
+
+        Args:
+            products (Iterable[Dict[str, Any]]): Product documents with at least _id, categories, tags and price.
+
+        Returns:
+            int: The number of products indexed.
+        """
+        # Scan without holding the lock, so the current counts keep being served meanwhile
+        with self._lock:
+            self._touched = {}
+        try:
+            fields_by_id = {str(product["_id"]): self._fields(product) for product in products}
+        finally:
+            with self._lock:
+                touched, self._touched = self._touched, None
+        with self._lock:
+            # Changes applied during the scan may be newer than what the scan read
+            for product_id, fields in touched.items():
+                if fields is None:
+                    fields_by_id.pop(product_id, None)
+                else:
+                    fields_by_id[product_id] = fields
+            self._reset()
+            self._products = fields_by_id
+            for categories, tags, _ in fields_by_id.values():
+                self._category_counts.update(categories)
+                self._tag_counts.update(tags)
+            self._compact()
+            self.built = True
+            return len(self._products)
+
+    def upsert(self, product: Dict[str, Any]) -> None:
+        """
+        Index an inserted or updated product.
+        """
+        product_id = str(product["_id"])
+        fields = self._fields(product)
+        with self._lock:
+            if self._touched is not None:
+                self._touched[product_id] = fields
+            if self._products.get(product_id) == fields:
+                return
+            self._remove_locked(product_id)
+            self._products[product_id] = fields
+            self._category_counts.update(fields[0])
+            self._tag_counts.update(fields[1])
+            self._add_row(product_id, *fields)
+            self._changed()
+
+    def remove(self, product_id: str) -> None:
+        """
+        Remove a deleted product.
+        """
+        with self._lock:
+            if self._touched is not None:
+                self._touched[product_id] = None
+            if product_id in self._products:
+                self._remove_locked(product_id)
+                self._changed()
+
+    def _mask(self, category: Optional[str], tags: Tuple[str, ...],
+              min_price: Optional[float], max_price: Optional[float]) -> np.ndarray:
+        mask = self._alive.values.copy()
+        row_count = len(mask)
+        if category:
+            mask &= self._categories.rows_with(category, row_count)
+        for tag in tags:
+            mask &= self._tags.rows_with(tag, row_count)
+        prices = self._prices.values
+        # Comparisons with NaN are False, so products without a price drop out of price filters
+        if min_price is not None:
+            mask &= prices >= min_price
+        if max_price is not None:
+            mask &= prices < max_price
+        return mask
+
+    def _filtered_prices(self, key: tuple, mask: np.ndarray) -> np.ndarray:
+        prices = self._price_cache.get(key)
+        if prices is None:
+            prices = self._prices.values[mask]
+            prices = prices[~np.isnan(prices)]
+            self._price_cache[key] = prices
+            while len(self._price_cache) > self.price_cache_size:
+                self._price_cache.popitem(last=False)
+        else:
+            self._price_cache.move_to_end(key)
+        return prices
+
+    def _price_buckets(self, prices: np.ndarray) -> List[Dict[str, Any]]:
+        edges = self.price_edges
+        buckets = np.searchsorted(edges, prices, side="right") - 1
+        # Prices below the first edge are not counted
+        counts = np.bincount(buckets[buckets >= 0], minlength=len(edges))
+        return [
+            {
+                "min": float(edges[i]),
+                "max": float(edges[i + 1]) if i + 1 < len(edges) else None,
+                "count": int(counts[i]),
+            }
+            for i in range(len(edges))
+        ]
+
+    @staticmethod
+    def _top(values: List[str], counts: np.ndarray, limit: int) -> List[Dict[str, Any]]:
+        order = np.lexsort((np.arange(len(counts)), -counts))
+        return [
+            {"value": values[i], "count": int(counts[i])}
+            for i in order[:limit] if counts[i] > 0
+        ]
+
+    def facets(
+        self,
+        category: Optional[str] = None,
+        tags: Sequence[str] = (),
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        limit: int = 20
+    ) -> Dict[str, Any]:
+        """
+        Count the categories, tags and price buckets of the products matching a filter.
+
+        Args:
+            category (Optional[str]): Only count products in this category.
+            tags (Sequence[str]): Only count products having all these tags.
+            min_price (Optional[float]): Only count products priced at least this.
+            max_price (Optional[float]): Only count products priced below this.
+            limit (int): How many categories and tags to return, most frequent first.
+
+        Returns:
+            Dict[str, Any]: The total, and the counts per category, tag and price bucket.
+        """
+        tags = tuple(sorted(set(tags)))
+        with self._lock:
+            key = (category, tags, min_price, max_price)
+            unfiltered = not category and not tags and min_price is None and max_price is None
+            if unfiltered:
+                # Served from the incrementally maintained counters
+                categories = [{"value": value, "count": count}
+                              for value, count in self._category_counts.most_common(limit)]
+                tag_counts = [{"value": value, "count": count}
+                              for value, count in self._tag_counts.most_common(limit)]
+                total = len(self._products)
+                mask = self._alive.values
+            else:
+                mask = self._mask(category, tags, min_price, max_price)
+                categories = self._top(self._categories.values, self._categories.counts(mask), limit)
+                tag_counts = self._top(self._tags.values, self._tags.counts(mask), limit)
+                total = int(mask.sum())
+            prices = self._filtered_prices(key, mask)
+            return {
+                "total": total,
+                "categories": categories,
+                "tags": tag_counts,
+                "priceBuckets": self._price_buckets(prices),
+            }
+
+# Create a global facet index, kept up to date with product changes
+facet_index = FacetIndex(settings.FACET_PRICE_BUCKETS)
+product_events.subscribe(facet_index.upsert, facet_index.remove)
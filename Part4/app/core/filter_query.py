@@ -0,0 +1,183 @@
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, FrozenSet, List, NamedTuple, Optional, Tuple, Type, Union, get_args, get_origin
+
+from fastapi import HTTPException, status
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+from app.models.order import OrderModel
+from app.models.catalog_product import CatalogProductModel
+
+_FILTER_PARAM = re.compile(r"^filter\[([A-Za-z_][A-Za-z0-9_]*)\](?:\[(\$[A-Za-z]+)\])?$")
+
+EQUALITY_OPERATORS = frozenset({"$eq", "$ne", "$in", "$nin"})
+RANGE_OPERATORS = frozenset({"$eq", "$ne", "$gt", "$gte", "$lt", "$lte"})
+ARRAY_OPERATORS = frozenset({"$eq", "$in", "$nin", "$all"})
+# Operators taking a comma-separated list of values
+LIST_OPERATORS = frozenset({"$in", "$nin", "$all"})
+
+
+class FilterSpec(NamedTuple):
+    """
+    The filterable fields of a resource and the operators allowed on each.
+    Values are coerced to the type the field has on `model`.
+    """
+    name: str
+    model: Type[BaseModel]
+    fields: Dict[str, FrozenSet[str]]
+
+
+# Product listings read the catalog, so product filters apply to catalog fields
+PRODUCT_FILTERS = FilterSpec("products", CatalogProductModel, {
+    "name": EQUALITY_OPERATORS,
+    "categories": ARRAY_OPERATORS,
+    "tags": ARRAY_OPERATORS,
+    "price": RANGE_OPERATORS,
+    "inventoryCount": RANGE_OPERATORS,
+    "rating": RANGE_OPERATORS,
+    "reviewCount": RANGE_OPERATORS,
+    "createdAt": RANGE_OPERATORS,
+})
+
+ORDER_FILTERS = FilterSpec("orders", OrderModel, {
+    "customerId": EQUALITY_OPERATORS,
+    "status": EQUALITY_OPERATORS,
+    "subtotal": RANGE_OPERATORS,
+    "total": RANGE_OPERATORS,
+    "createdAt": RANGE_OPERATORS,
+})
+
+_SPECS = {spec.name: spec for spec in (PRODUCT_FILTERS, ORDER_FILTERS)}
+
+
+class _Step(NamedTuple):
+    param: str
+    field: str
+    operator: str
+    coerce: Callable[[Any], Any]
+
+
+class FilterPlan:
+    """
+    A compiled filter for one query shape, i.e. one set of `filter[...]` parameter names.
+    Building the MongoDB query from a plan only coerces the values.
+    """
+    def __init__(self, steps: Tuple[_Step, ...]):
+        self.steps = steps
+
+    def build(self, values: Dict[str, List[str]]) -> Dict[str, Any]:
+        """
+        Build the MongoDB filter.
+
+        Args:
+            values (Dict[str, List[str]]): The raw values of each filter parameter.
+
+        Returns:
+            Dict[str, Any]: The MongoDB filter.
+
+        Raises:
+            ValueError: If a value cannot be coerced to the field's type.
+        """
+        query: Dict[str, Dict[str, Any]] = {}
+        for step in self.steps:
+            raw_values = values[step.param]
+            if step.operator in LIST_OPERATORS:
+                value = [step.coerce(item) for raw in raw_values for item in raw.split(",") if item != ""]
+            elif len(raw_values) > 1:
+                raise ValueError(f"{step.param} can only be given once")
+            else:
+                value = step.coerce(raw_values[0])
+            query.setdefault(step.field, {})[step.operator] = value
+        return query
+
+
+def _element_type(annotation: Any) -> Any:
+    # Unwrap Optional[X] and List[X] down to X, the type each filter value is coerced to
+    while get_origin(annotation) in (Union, list, List):
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        annotation = args[0]
+    return annotation
+
+
+@lru_cache(maxsize=None)
+def _coercer(spec_name: str, field: str) -> Callable[[Any], Any]:
+    model_field = _SPECS[spec_name].model.model_fields[field]
+    adapter = TypeAdapter(_element_type(model_field.annotation))
+    return adapter.validate_python
+
+
+@lru_cache(maxsize=1024)
+def compile_filter(spec_name: str, shape: Tuple[str, ...]) -> FilterPlan:
+    """
+    Compile the filter parameters of a query shape into a plan. Plans are cached by
+    shape, so parsing, allowlist checks and type resolution happen once per shape.
+
+    Args:
+        spec_name (str): The resource, "products" or "orders".
+        shape (Tuple[str, ...]): The sorted `filter[...]` parameter names.
+
+    Returns:
+        FilterPlan: The compiled plan.
+
+    Raises:
+        ValueError: If a parameter is malformed, or a field or operator is not allowed.
+    """
+    spec = _SPECS[spec_name]
+    steps = []
+    for param in shape:
+        match = _FILTER_PARAM.match(param)
+        if not match:
+            raise ValueError(f"Malformed filter parameter {param}")
+        field, operator = match.group(1), match.group(2) or "$eq"
+        if field not in spec.fields:
+            raise ValueError(f"Filtering on {field} is not allowed")
+        if operator not in spec.fields[field]:
+            raise ValueError(f"Operator {operator} is not allowed on {field}")
+        alias = spec.model.model_fields[field].alias or field
+        steps.append(_Step(param, alias, operator, _coercer(spec_name, field)))
+    return FilterPlan(tuple(steps))
+
+
+def parse_filters(spec: FilterSpec, query_params: List[Tuple[str, str]]) -> Dict[str, Any]:
+    """
+    Parse the `filter[field][$op]=value` parameters of a request into a MongoDB filter.
+
+    Args:
+        spec (FilterSpec): The filterable fields of the resource.
+        query_params (List[Tuple[str, str]]): All query parameters, e.g. `request.query_params.multi_items()`.
+
+    Returns:
+        Dict[str, Any]: The MongoDB filter, empty if there are no filter parameters.
+
+    Raises:
+        HTTPException: 400 if the filter is invalid.
+    """
+    values: Dict[str, List[str]] = {}
+    for key, value in query_params:
+        if key.startswith("filter["):
+            values.setdefault(key, []).append(value)
+    if not values:
+        return {}
+    try:
+        return compile_filter(spec.name, tuple(sorted(values))).build(values)
+    except (ValueError, ValidationError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid filter: {e}"
+        )
+
+
+def merge_filters(base: Dict[str, Any], extra: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Combine two MongoDB filters so that documents must match both.
+
+    Returns:
+        Dict[str, Any]: The combined filter.
+    """
+    if not extra:
+        return base
+    if not base:
+        return extra
+    if set(base) & set(extra):
+        return {"$and": [base, extra]}
+    return {**base, **extra}
@@ -0,0 +1,176 @@
+import hashlib
+import threading
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+
+class CountMinSketch:
+    """
+    Approximate frequencies of keys in constant memory: `depth` rows of `width` counters,
+    each key hashed to one counter per row, and its estimate is the minimum of those.
+
+    Counters are incremented with conservative update, which keeps over-estimation low,
+    and are all halved every `sample_size` additions (the TinyLFU reset), so old
+    popularity fades and keys that stop being requested lose their standing.
+    """
+    def __init__(self, width: int, depth: int, sample_size: int):
+        if not 1 <= depth <= 8:
+            raise ValueError("depth must be between 1 and 8")
+        self.width = width
+        self.depth = depth
+        self.sample_size = sample_size
+        self.additions = 0
+        self._table = np.zeros((depth, width), dtype=np.uint32)
+        self._rows = np.arange(depth)
+
+    def _columns(self, key: str) -> np.ndarray:
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8 * self.depth).digest()
+        return np.frombuffer(digest, dtype=np.uint64) % np.uint64(self.width)
+
+    def add(self, key: str) -> bool:
+        """
+        Count one occurrence of a key.
+
+        Returns:
+            bool: Whether the counters were halved by this addition.
+        """
+        columns = self._columns(key)
+        current = self._table[self._rows, columns]
+        self._table[self._rows, columns] = np.maximum(current, current.min() + 1)
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            self._table >>= 1
+            self.additions //= 2
+            return True
+        return False
+
+    def estimate(self, key: str) -> int:
+        """
+        Returns:
+            int: The estimated count of a key, never lower than its true (aged) count.
+        """
+        return int(self._table[self._rows, self._columns(key)].min())
+
+
+class SpaceSaving:
+    """
+    The Space-Saving algorithm: the top keys of a stream with `capacity` counters.
+    A new key replaces the key with the smallest count and inherits that count as its
+    possible over-estimation (error), so any key more frequent than total / capacity is kept.
+    """
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._counts: Dict[str, int] = {}
+        self._errors: Dict[str, int] = {}
+
+    def add(self, key: str) -> None:
+        if key in self._counts:
+            self._counts[key] += 1
+        elif len(self._counts) < self.capacity:
+            self._counts[key] = 1
+            self._errors[key] = 0
+        else:
+            victim = min(self._counts, key=self._counts.__getitem__)
+            count = self._counts.pop(victim)
+            del self._errors[victim]
+            self._counts[key] = count + 1
+            self._errors[key] = count
+
+    def halve(self) -> None:
+        for key in self._counts:
+            self._counts[key] //= 2
+            self._errors[key] //= 2
+
+    def top(self, limit: int) -> List[Dict[str, Any]]:
+        keys = sorted(self._counts, key=self._counts.__getitem__, reverse=True)[:limit]
+        return [{"key": key, "count": self._counts[key], "error": self._errors[key]} for key in keys]
+
+
+class HeavyHitters:
+    """
+    Tracks how often each key of a cache is requested.
+
+    The sketch estimates the frequency of any key, for cache admission. Space-Saving
+    keeps the current top keys, to see (and pre-warm) what customers actually hit.
+    """
+    def __init__(self, name: str, width: int, depth: int, sample_size: int, top_capacity: int):
+        self.name = name
+        self._lock = threading.Lock()
+        self._sketch = CountMinSketch(width, depth, sample_size)
+        self._top = SpaceSaving(top_capacity)
+
+    def record(self, key: str) -> None:
+        """
+        Count one request for a key.
+        """
+        with self._lock:
+            if self._sketch.add(key):
+                self._top.halve()
+            self._top.add(key)
+
+    def estimate(self, key: str) -> int:
+        with self._lock:
+            return self._sketch.estimate(key)
+
+    def admit(self, candidate: str, victim: str) -> bool:
+        """
+        TinyLFU admission: a new key only takes the place of the cache's eviction victim
+        if it is requested more often, so one-off long-tail keys do not push out hot ones.
+
+        Args:
+            candidate (str): The key about to be cached.
+            victim (str): The key the cache would evict to make room.
+
+        Returns:
+            bool: Whether to cache the candidate.
+        """
+        with self._lock:
+            admitted = self._sketch.estimate(candidate) > self._sketch.estimate(victim)
+        metrics.increment("cache_admission", f"{self.name}.{'admitted' if admitted else 'rejected'}")
+        return admitted
+
+    def top(self, limit: int) -> List[Dict[str, Any]]:
+        """
+        Returns:
+            List[Dict[str, Any]]: The most requested keys with their counts and possible
+            over-estimation, most requested first.
+        """
+        with self._lock:
+            return self._top.top(limit)
+
+# Trackers by cache name, listed by the hot keys endpoint
+hot_key_trackers: Dict[str, HeavyHitters] = {}
+
+
+def tiny_lfu_admission(tracker: HeavyHitters, key_of: Callable[[str], str] = lambda key: key) -> Callable[[str, str], bool]:
+    """
+    Build the admission policy of an InProcessCache from a tracker.
+
+    Args:
+        tracker (HeavyHitters): The tracker the cache's keys are recorded in.
+        key_of (Callable[[str], str]): Maps a cache key to the key recorded in the tracker,
+            e.g. to drop a version prefix.
+
+    Returns:
+        Callable[[str, str], bool]: The policy, called with the candidate and victim cache keys.
+    """
+    return lambda candidate, victim: tracker.admit(key_of(candidate), key_of(victim))
+
+
+def create_heavy_hitters(name: str) -> HeavyHitters:
+    """
+    Create a tracker from the settings, and register it so its top keys can be listed.
+    """
+    tracker = HeavyHitters(
+        name,
+        width=settings.HOT_KEYS_SKETCH_WIDTH,
+        depth=settings.HOT_KEYS_SKETCH_DEPTH,
+        sample_size=settings.HOT_KEYS_SAMPLE_SIZE,
+        top_capacity=settings.HOT_KEYS_TOP_CAPACITY
+    )
+    hot_key_trackers[name] = tracker
+    return tracker
@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic import BaseModel
 
 
@@ -8,4 +9,11 @@ class Pagination(BaseModel):
     total: int
 
 class Meta(BaseModel):
-    pagination: Pagination
\ No newline at end of file
+    pagination: Pagination
+
+class CursorPagination(BaseModel):
+    limit: int
+    nextCursor: Optional[str] = None
+
+class CursorMeta(BaseModel):
+    pagination: CursorPagination
@@ -0,0 +1,72 @@
+import threading
+from collections import defaultdict
+from typing import Callable, Dict
+
+
+class Metrics:
+    """
+    A minimal in-process counter registry.
+
+    Counters are grouped by name and labelled by route (or any other short key),
+    so that e.g. deadline-exceeded outcomes can be told apart from other errors.
+    Gauges are computed on read from registered callbacks, e.g. ratios derived from counters.
+    It is thread-safe because the sync endpoints run in the threadpool.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._gauges: Dict[str, Dict[str, Callable[[], float]]] = defaultdict(dict)
+
+    def increment(self, name: str, label: str = "total", amount: int = 1) -> None:
+        """
+        Increment a counter.
+
+        Args:
+            name (str): The counter name, e.g. "deadline_exceeded".
+            label (str): The label to count under, usually the route name.
+            amount (int): How much to add.
+        """
+        with self._lock:
+            self._counters[name][label] += amount
+
+    def get(self, name: str, label: str = "total") -> int:
+        """
+        Returns:
+            int: The current value of a counter, 0 if it was never incremented.
+        """
+        with self._lock:
+            return self._counters.get(name, {}).get(label, 0)
+
+    def register_gauge(self, name: str, label: str, callback: Callable[[], float]) -> None:
+        """
+        Register a gauge whose value is computed when the metrics are read.
+
+        Args:
+            name (str): The gauge name, e.g. "single_flight_coalescing_ratio".
+            label (str): The label to report it under.
+            callback (Callable[[], float]): Computes the current value.
+        """
+        with self._lock:
+            self._gauges[name][label] = callback
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """
+        Returns:
+            Dict[str, Dict[str, float]]: A copy of every counter and gauge, grouped by name then label.
+        """
+        with self._lock:
+            result = {name: dict(labels) for name, labels in self._counters.items()}
+            gauges = {name: dict(labels) for name, labels in self._gauges.items()}
+        for name, labels in gauges.items():
+            result[name] = {label: callback() for label, callback in labels.items()}
+        return result
+
+    def reset(self) -> None:
+        """
+        Clear all counters. Gauges stay registered. Mostly useful in tests.
+        """
+        with self._lock:
+            self._counters.clear()
+
+# Create a global metrics registry
+metrics = Metrics()
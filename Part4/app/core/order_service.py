@@ -1,16 +1,30 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 
 from bson import ObjectId
-from fastapi import Body, Depends, Query
+from fastapi import Body, Depends, Query, Request, Response
+from pydantic import TypeAdapter
+from app.core.conditional import cache_headers, check_not_modified, weak_etag
 from app.core.create_order_command import CreateOrderCommand
+from app.core.deadline import Deadline, request_deadline
 from app.core.dependencies import get_mongodb_repo
+from app.core.filter_query import ORDER_FILTERS, merge_filters, parse_filters
 from app.core.order_list_query import OrderListResponse
+from app.core.query_key import query_key
+from app.core.single_flight import SingleFlight
+from app.core.suggest_index import suggest_index
 from app.models.order import OrderModel
 from app.repository.order_repository import OrderRepository
+from app.repository.version_repository import VersionRepository
+
+# Identical concurrent order reads share one database call and one serialized result
+order_flights = SingleFlight("orders")
+
+_order_list_adapter = TypeAdapter(List[OrderModel])
 
 def get_order_by_id(
     order_id: str,
-    order_repository: OrderRepository = Depends(get_mongodb_repo(OrderRepository))
+    order_repository: OrderRepository = Depends(get_mongodb_repo(OrderRepository)),
+    deadline: Deadline = Depends(request_deadline("get_order_by_id"))
 ):
     """
     Get an order by its ID.
@@ -21,18 +35,31 @@ def get_order_by_id(
     Returns:
         The order data if found, otherwise None.
     """
-    return order_repository.get_by_id(order_id)
+    def load() -> Optional[bytes]:
+        order = order_repository.get_by_id(order_id, deadline=deadline)
+        return order.model_dump_json(by_alias=True).encode("utf-8") if order else None
+
+    body = order_flights.do(query_key("order", {"_id": order_id}), load,
+                            timeout=deadline.remaining_ms() / 1000)
+    if body is None:
+        return None
+    return Response(content=body, media_type="application/json")
 
 def list_orders(
+    request: Request,
     page: int = Query(1, alias="pagination[page]", ge=1),
     page_size: int = Query(10, alias="pagination[pageSize]", ge=1),
     sort: Optional[str] = Query(None),
     status: Optional[str] = Query(None),
     customer_id: Optional[str] = Query(None),
-    order_repository: OrderRepository = Depends(get_mongodb_repo(OrderRepository))
+    order_repository: OrderRepository = Depends(get_mongodb_repo(OrderRepository)),
+    version_repository: VersionRepository = Depends(get_mongodb_repo(VersionRepository)),
+    deadline: Deadline = Depends(request_deadline("list_orders"))
 ):
     """
     List orders with optional filtering, pagination, and sorting.
+    Besides status and customer_id, filters can be given as filter[field][$op]=value (see ORDER_FILTERS).
+    The response carries a weak ETag derived from the orders collection version and the query.
 
     Returns:
         Orders data array matching the criteria and metadata about pagination.
@@ -42,6 +69,7 @@ def list_orders(
         filter_query["status"] = status
     if customer_id:
         filter_query["customerId"] = ObjectId(customer_id)
+    filter_query = merge_filters(filter_query, parse_filters(ORDER_FILTERS, request.query_params.multi_items()))
 
     sort_query = None
     if sort:
@@ -60,33 +88,49 @@ def list_orders(
                 field = pair
                 sort_query.append((field, 1))
 
+    key = query_key("orders", filter_query, sort_query, page, page_size)
+    version = version_repository.get_version("orders", deadline=deadline)
+    etag = weak_etag(version, key)
+    check_not_modified(request, "list_orders", etag)
+
     skip = (page - 1) * page_size
     limit = page_size
 
-    orders, total = order_repository.get_all(
-        filter=filter_query,
-        skip=skip,
-        limit=limit,
-        sort=sort_query
-    )
-
-    page_count = (total + page_size - 1) // page_size if page_size else 0
-
-    return OrderListResponse(
-        data=orders,
-        meta={
-            "pagination": {
-                "page": page,
-                "pageSize": page_size,
-                "pageCount": page_count,
-                "total": total
+    def load() -> bytes:
+        orders, total = order_repository.get_all(
+            filter=filter_query,
+            skip=skip,
+            limit=limit,
+            sort=sort_query,
+            deadline=deadline
+        )
+
+        page_count = (total + page_size - 1) // page_size if page_size else 0
+
+        return OrderListResponse(
+            data=orders,
+            meta={
+                "pagination": {
+                    "page": page,
+                    "pageSize": page_size,
+                    "pageCount": page_count,
+                    "total": total
+                }
             }
-        }
+        ).model_dump_json(by_alias=True).encode("utf-8")
+
+    # The version is part of the key, so a request made after a write never joins a read started before it
+    body = order_flights.do(f"{version}:{key}", load, timeout=deadline.remaining_ms() / 1000)
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers=cache_headers("list_orders", etag)
     )
 
 def create_order(
     command: CreateOrderCommand = Body(..., ),
-    order_repository: OrderRepository = Depends(get_mongodb_repo(OrderRepository))
+    order_repository: OrderRepository = Depends(get_mongodb_repo(OrderRepository)),
+    version_repository: VersionRepository = Depends(get_mongodb_repo(VersionRepository))
 ):
     """
     Create a new order.
@@ -108,11 +152,19 @@ def create_order(
         status=command.status,
         createdAt=command.createdAt,
     )
-    return order_repository.create_new_order(new_order)
+    created_order = order_repository.create_new_order(new_order)
+    # Invalidate ETags of order listings
+    version_repository.bump("orders")
+    # Ordered products rank higher in suggestions
+    for item in command.orderItems:
+        suggest_index.add_sold(item.productId, item.quantity)
+    return created_order
 
 def get_orders_by_customer_id(
     customer_id: str,
-    order_repository: OrderRepository = Depends(get_mongodb_repo(OrderRepository))
+    order_repository: OrderRepository = Depends(get_mongodb_repo(OrderRepository)),
+    version_repository: VersionRepository = Depends(get_mongodb_repo(VersionRepository)),
+    deadline: Deadline = Depends(request_deadline("get_orders_by_customer_id"))
 ):
     """
     Get all orders for a specific customer by their ID.
@@ -123,4 +175,14 @@ def get_orders_by_customer_id(
     Returns:
         List of orders for the specified customer.
     """
-    return order_repository.get_orders_by_customer_id(customer_id)
\ No newline at end of file
+    def load() -> Optional[bytes]:
+        orders = order_repository.get_orders_by_customer_id(customer_id, deadline=deadline)
+        return _order_list_adapter.dump_json(orders, by_alias=True) if orders else None
+
+    # Customers expect to see an order they just created, so never join a read started before a write
+    version = version_repository.get_version("orders", deadline=deadline)
+    key = query_key("orders", {"customerId": customer_id})
+    body = order_flights.do(f"{version}:{key}", load, timeout=deadline.remaining_ms() / 1000)
+    if body is None:
+        return []
+    return Response(content=body, media_type="application/json")
\ No newline at end of file
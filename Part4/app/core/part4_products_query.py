@@ -0,0 +1,148 @@
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import ASCENDING
+from pymongo.collation import Collation
+from pymongo.database import Database
+
+from app.core.config import settings
+from app.core.deadline import Deadline
+from app.core.metrics import metrics
+from app.core.response_cache import InProcessCache
+
+STRATEGIES = ("facet", "concurrent")
+
+# Case-insensitive equality on category, which an index with the same collation can serve
+CATEGORY_COLLATION = Collation(locale="en", strength=2)
+
+# Counts change slowly compared to how often pages are read, so they are cached briefly
+_count_cache = InProcessCache(
+    max_entries=settings.PART4_COUNT_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.PART4_COUNT_CACHE_TTL_SECONDS
+)
+
+
+def ensure_indexes(database: Database) -> List[str]:
+    """
+    Create the indexes the concurrent strategy relies on: (category, name) with the
+    case-insensitive collation for category pages, and name for the unfiltered listing.
+
+    Returns:
+        List[str]: The index names.
+    """
+    return [
+        database.products.create_index(
+            [("category", ASCENDING), ("name", ASCENDING)],
+            collation=CATEGORY_COLLATION,
+            name="category_1_name_1_ci"
+        ),
+        database.products.create_index([("name", ASCENDING)]),
+    ]
+
+
+def build_facet_pipeline(category: Optional[str], page: int, page_size: int) -> List[Dict[str, Any]]:
+    """
+    Build the single pipeline of the facet strategy: the page and the total count are
+    both computed inside `$facet`, over the whole match.
+    """
+    return [
+        {
+            "$match": {
+                "category": {
+                    "$regex": category if category else "",
+                    "$options": "i"
+                }
+            } if category else {}
+        },
+        {
+            "$sort": {
+                "name": 1
+            }
+        },
+        {
+            "$facet": {
+                "metadata": [
+                    {"$count": "totalCount"}
+                ],
+                "data": [
+                    {"$skip": (page - 1) * page_size},
+                    {"$limit": page_size}
+                ]
+            }
+        }
+    ]
+
+
+async def fetch_page_facet(collection, category: Optional[str], page: int, page_size: int,
+                           deadline: Deadline) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Fetch a page and the total count with one `$facet` aggregation.
+
+    Returns:
+        Tuple[List[Dict[str, Any]], int]: The products of the page and the total count.
+    """
+    cursor = collection.aggregate(build_facet_pipeline(category, page, page_size), maxTimeMS=deadline.max_time_ms)
+    agg_result = await deadline.run(cursor.to_list(length=None))
+    if not agg_result:
+        return [], 0
+    metadata = agg_result[0].get("metadata", [])
+    total = metadata[0]["totalCount"] if metadata else 0
+    return agg_result[0].get("data", []), total
+
+
+async def count_products(collection, category: Optional[str], deadline: Deadline) -> int:
+    """
+    Count the products of a category, from the count cache when possible.
+    The unfiltered count comes from the collection metadata instead of a scan.
+    """
+    key = category.lower() if category else ""
+    total = _count_cache.get(key)
+    if total is not None:
+        metrics.increment("part4_count_cache", "hits")
+        return total
+    metrics.increment("part4_count_cache", "misses")
+    if category:
+        total = await collection.count_documents(
+            {"category": category},
+            collation=CATEGORY_COLLATION,
+            maxTimeMS=deadline.max_time_ms
+        )
+    else:
+        total = await collection.estimated_document_count(maxTimeMS=deadline.max_time_ms)
+    _count_cache.set(key, total)
+    return total
+
+
+async def fetch_page_concurrent(collection, category: Optional[str], page: int, page_size: int,
+                                deadline: Deadline) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Fetch a page with an equality match and the total count as two queries run concurrently.
+    Unlike the facet strategy, the page query stops after skip + limit index entries, and the
+    count is cacheable. Categories match case-insensitively but exactly, not as a substring.
+
+    Returns:
+        Tuple[List[Dict[str, Any]], int]: The products of the page and the total count.
+    """
+    query: Dict[str, Any] = {}
+    options: Dict[str, Any] = {}
+    if category:
+        query["category"] = category
+        options["collation"] = CATEGORY_COLLATION
+
+    async def load_page() -> List[Dict[str, Any]]:
+        cursor = collection.find(query, max_time_ms=deadline.max_time_ms, **options) \
+            .sort("name", ASCENDING).skip((page - 1) * page_size).limit(page_size)
+        return await cursor.to_list(length=page_size)
+
+    products, total = await deadline.run(asyncio.gather(load_page(), count_products(collection, category, deadline)))
+    return products, total
+
+
+async def fetch_page(strategy: str, collection, category: Optional[str], page: int, page_size: int,
+                     deadline: Deadline) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Fetch a page and the total count with the given strategy, "facet" or "concurrent".
+    """
+    if strategy == "concurrent":
+        return await fetch_page_concurrent(collection, category, page, page_size, deadline)
+    return await fetch_page_facet(collection, category, page, page_size, deadline)
@@ -0,0 +1,117 @@
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+from app.core.config import settings
+
+ProductUpsertListener = Callable[[Dict[str, Any]], None]
+ProductDeleteListener = Callable[[str], None]
+
+
+class ProductEvents:
+    """
+    Notifies in-memory indexes derived from the products collection when a product changes.
+
+    Product writes made by this application publish events directly. Writes made by other
+    processes (e.g. the ETL) reach the listeners through the change stream watcher, when enabled.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._listeners: List[Tuple[ProductUpsertListener, ProductDeleteListener]] = []
+        # Whether the change stream watcher is delivering the writes of other processes.
+        # While it is not, state derived from these events can miss product changes.
+        self.watching = False
+
+    def subscribe(self, on_upsert: ProductUpsertListener, on_delete: ProductDeleteListener) -> None:
+        """
+        Register a listener.
+
+        Args:
+            on_upsert (ProductUpsertListener): Called with the full product document after an insert or update.
+            on_delete (ProductDeleteListener): Called with the product ID after a delete.
+        """
+        with self._lock:
+            self._listeners.append((on_upsert, on_delete))
+
+    def _listeners_snapshot(self) -> List[Tuple[ProductUpsertListener, ProductDeleteListener]]:
+        with self._lock:
+            return list(self._listeners)
+
+    def publish_upsert(self, product: Dict[str, Any]) -> None:
+        """
+        Notify listeners that a product was inserted or updated.
+
+        Args:
+            product (Dict[str, Any]): The full product document, as stored.
+        """
+        for on_upsert, _ in self._listeners_snapshot():
+            try:
+                on_upsert(product)
+            except Exception as e:
+                # A failing index must not fail the write that triggered it
+                print(f"Product upsert listener {on_upsert} failed: {e}")
+
+    def publish_delete(self, product_id: str) -> None:
+        """
+        Notify listeners that a product was deleted.
+
+        Args:
+            product_id (str): The ID of the deleted product.
+        """
+        for _, on_delete in self._listeners_snapshot():
+            try:
+                on_delete(product_id)
+            except Exception as e:
+                print(f"Product delete listener {on_delete} failed: {e}")
+
+# Create a global product events hub
+product_events = ProductEvents()
+
+
+def watch_product_changes(mongo_client: MongoClient, stop: threading.Event) -> None:
+    """
+    Publish the changes of the products collection, from any writer, until `stop` is set.
+    Change streams require a replica set or sharded cluster.
+
+    Args:
+        mongo_client (MongoClient): The application's MongoDB client.
+        stop (threading.Event): Set to stop watching.
+    """
+    collection = mongo_client[settings.MONGODB_DATABASE].products
+    try:
+        with collection.watch(full_document="updateLookup", max_await_time_ms=500) as stream:
+            product_events.watching = True
+            while not stop.is_set() and stream.alive:
+                change = stream.try_next()
+                if change is None:
+                    continue
+                operation = change["operationType"]
+                if operation in ("insert", "update", "replace") and change.get("fullDocument"):
+                    product_events.publish_upsert(change["fullDocument"])
+                elif operation == "delete":
+                    product_events.publish_delete(str(change["documentKey"]["_id"]))
+    except PyMongoError as e:
+        print(f"Watching product changes failed: {e}")
+    finally:
+        product_events.watching = False
+
+
+def start_product_change_watcher(mongo_client: MongoClient) -> Optional[threading.Event]:
+    """
+    Start watching product changes in the background, if `PRODUCT_CHANGE_STREAM_ENABLED`.
+
+    Returns:
+        Optional[threading.Event]: Set it to stop the watcher. None if the watcher is disabled.
+    """
+    if not settings.PRODUCT_CHANGE_STREAM_ENABLED:
+        return None
+    stop = threading.Event()
+    threading.Thread(
+        target=watch_product_changes,
+        args=(mongo_client, stop),
+        name="product-change-watcher",
+        daemon=True
+    ).start()
+    return stop
@@ -0,0 +1,21 @@
+from typing import List, Optional
+from pydantic import BaseModel
+
+
+class FacetCount(BaseModel):
+    value: str
+    count: int
+
+class PriceBucket(BaseModel):
+    min: float
+    max: Optional[float] = None
+    count: int
+
+class ProductFacetsResponse(BaseModel):
+    total: int
+    categories: List[FacetCount]
+    tags: List[FacetCount]
+    priceBuckets: List[PriceBucket]
+
+class FacetRebuildResponse(BaseModel):
+    indexed: int
@@ -2,9 +2,9 @@ from typing import Dict, List
 from pydantic import BaseModel
 
 from app.core.meta import Meta
-from app.models.product import ProductModel
+from app.models.catalog_product import CatalogProductModel
 
 
 class ProductListResponse(BaseModel):
-    data: List[ProductModel]
+    data: List[CatalogProductModel]
     meta: Meta
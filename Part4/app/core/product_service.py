@@ -1,11 +1,118 @@
-from typing import Dict, Any, List, Optional
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Any, List, NamedTuple, Optional
 
 from bson import ObjectId
-from fastapi import Depends, HTTPException, Query, status
+from fastapi import Depends, HTTPException, Query, Request, Response, status
+from app.core.catalog_projection import catalog_projector
+from app.core.config import settings
+from app.core.conditional import cache_headers, check_not_modified, is_conditional, strong_etag, weak_etag
+from app.core.deadline import Deadline, request_deadline
 from app.core.dependencies import get_mongodb_repo
+from app.core.facet_index import facet_index
+from app.core.heavy_hitters import create_heavy_hitters, tiny_lfu_admission
+from app.core.filter_query import PRODUCT_FILTERS, merge_filters, parse_filters
 from app.core.meta import Meta
+from app.core.metrics import metrics
 from app.core.product_list_query import ProductListResponse
+from app.core.product_events import product_events
+from app.core.query_key import query_key
+from app.core.response_cache import InProcessCache, create_response_cache
+from app.core.single_flight import SingleFlight
+from app.core.suggest_index import suggest_index
+from app.models.product import ProductModel
+from app.repository.catalog_repository import CatalogRepository
+from app.repository.order_repository import OrderRepository
 from app.repository.product_repository import ProductRepository
+from app.repository.version_repository import VersionRepository, listing_version_name
+
+# Identical concurrent product reads share one database call and one serialized result
+product_flights = SingleFlight("products")
+# The background builds of the in-memory indexes started by requests, by index name
+_index_builds: Dict[str, threading.Thread] = {}
+_index_builds_lock = threading.Lock()
+# How often each product and each listing query is requested, to admit only popular ones to the caches
+product_hot_keys = create_heavy_hitters("get_product_by_id")
+product_list_hot_keys = create_heavy_hitters("list_products")
+# Listing pages are identical for all users, so their serialized bodies are cached.
+# Cache keys are prefixed with a version, popularity is tracked across versions.
+product_list_cache = create_response_cache(
+    "list_products",
+    admission=tiny_lfu_admission(product_list_hot_keys, lambda key: key.partition(":")[2])
+    if settings.CACHE_ADMISSION_ENABLED else None
+)
+
+
+class SerializedProduct(NamedTuple):
+    body: bytes
+    etag: str
+    last_modified: Optional[datetime]
+
+# Serialized products by ID. Unlike listings, entries are not versioned: they are dropped
+# when the product changes. While the change stream is not watched, changes made elsewhere
+# are missed, so hits are revalidated against the product's lastUpdatedAt.
+product_cache = InProcessCache(
+    settings.PRODUCT_CACHE_MAX_ENTRIES,
+    settings.PRODUCT_CACHE_TTL_SECONDS,
+    admission=tiny_lfu_admission(product_hot_keys) if settings.CACHE_ADMISSION_ENABLED else None
+)
+
+def product_cache_key(product_id: str) -> str:
+    return query_key("product", {"_id": product_id})
+
+product_events.subscribe(
+    lambda product: product_cache.delete(product_cache_key(str(product["_id"]))),
+    lambda product_id: product_cache.delete(product_cache_key(product_id))
+)
+
+def start_index_build(name: str, build: Callable[[], Any]) -> threading.Thread:
+    """
+    Build an in-memory index in the background, unless a background build of it is already running.
+
+    Args:
+        name (str): The name of the index.
+        build (Callable[[], Any]): Builds the index.
+
+    Returns:
+        threading.Thread: The thread running the build.
+    """
+    def run() -> None:
+        try:
+            build()
+        except Exception as e:
+            print(f"Building the {name} index failed: {e}")
+
+    with _index_builds_lock:
+        thread = _index_builds.get(name)
+        if thread is None or not thread.is_alive():
+            thread = _index_builds[name] = threading.Thread(target=run, name=f"{name}-build", daemon=True)
+            thread.start()
+        return thread
+
+def require_index(name: str, index: Any, build: Callable[[], Any], deadline: Deadline) -> None:
+    """
+    Make sure an in-memory index is built before it is read. The first use builds it in the
+    background, so no request scans the products collection itself: requests wait for the
+    build within their deadline.
+
+    Args:
+        name (str): The name of the index.
+        index (Any): The index, with a `built` flag.
+        build (Callable[[], Any]): Builds the index.
+        deadline (Deadline): The deadline of the current request.
+
+    Raises:
+        HTTPException: 503 with Retry-After, if the index is not built by the deadline.
+    """
+    if index.built:
+        return
+    start_index_build(name, build).join(deadline.remaining_ms() / 1000)
+    if not index.built:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"The {name} index is being built",
+            headers={"Retry-After": str(settings.INDEX_RETRY_AFTER_SECONDS)}
+        )
 
 def validate_object_id(product_id: str):
     if not ObjectId.is_valid(product_id):
@@ -16,12 +123,36 @@ def validate_object_id(product_id: str):
     return product_id
 
 
+def build_product_filter(name: Optional[str] = None, category: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Build the MongoDB filter of a product listing.
+
+    Args:
+        name (Optional[str]): Case-insensitive pattern to match product names against.
+        category (Optional[str]): Exact category.
+
+    Returns:
+        Dict[str, Any]: The filter.
+    """
+    filter_query: Dict[str, Any] = {}
+    if name:
+        filter_query["name"] = {"$regex": name, "$options": "i"}
+    if category:
+        filter_query["categories"] = category
+    return filter_query
+
+
 def get_product_by_id(
     product_id: str,
-    product_repository: ProductRepository = Depends(get_mongodb_repo(ProductRepository))
+    request: Request,
+    product_repository: ProductRepository = Depends(get_mongodb_repo(ProductRepository)),
+    deadline: Deadline = Depends(request_deadline("get_product_by_id"))
 ):
     """
     Get a product by its ID.
+    The response carries a strong ETag derived from lastUpdatedAt, or from the content when
+    the product has no lastUpdatedAt. A matching If-None-Match is answered with 304.
+    Serialized products are cached in process, when popular enough to be admitted.
 
     Args:
         product_id (str): The ID of the product to retrieve.
@@ -30,27 +161,118 @@ def get_product_by_id(
         The product data if found, otherwise None.
     """
     validate_object_id(product_id)
-    return product_repository.get_by_id(product_id)
+    cache_key = product_cache_key(product_id)
+    product_hot_keys.record(cache_key)
+    product = product_cache.get(cache_key)
+    if product is not None and not is_fresh(product_id, product, product_repository, deadline):
+        product_cache.delete(cache_key)
+        metrics.increment("response_cache_stale", "get_product_by_id")
+        product = None
+    if product is not None:
+        metrics.increment("response_cache_hits", "get_product_by_id.local")
+    else:
+        metrics.increment("response_cache_misses", "get_product_by_id")
+        product = load_product(product_id, request, product_repository, deadline, cache_key)
+        if not product:
+            return None
+    check_not_modified(request, "get_product_by_id", product.etag, product.last_modified)
+    return Response(
+        content=product.body,
+        media_type="application/json",
+        headers=cache_headers("get_product_by_id", product.etag, product.last_modified)
+    )
+
+def is_fresh(
+    product_id: str,
+    product: SerializedProduct,
+    product_repository: ProductRepository,
+    deadline: Deadline
+) -> bool:
+    """
+    Tell whether a cached product is still current. While the change stream is watched, every
+    change drops the cached product, so it is. Otherwise only lastUpdatedAt is fetched and
+    compared, and products without one cannot be validated.
+
+    Returns:
+        bool: Whether the cached product can be served.
+    """
+    if product_events.watching:
+        return True
+    if product.last_modified is None:
+        return False
+    last_updated_at = product_repository.get_last_updated_at(product_id, deadline=deadline)
+    return last_updated_at is not None and strong_etag(product_id, last_updated_at) == product.etag
+
+def serialize_product(product_id: str, product: ProductModel) -> SerializedProduct:
+    """
+    Serialize a product with its validators, as the product cache holds it.
+
+    Returns:
+        SerializedProduct: The body, the ETag and when the product last changed, if known.
+    """
+    body = product.model_dump_json(by_alias=True).encode("utf-8")
+    if product.lastUpdatedAt is not None:
+        return SerializedProduct(body, strong_etag(product_id, product.lastUpdatedAt),
+                                 product.lastUpdatedAt.as_datetime())
+    return SerializedProduct(body, strong_etag(body), None)
+
+def load_product(
+    product_id: str,
+    request: Request,
+    product_repository: ProductRepository,
+    deadline: Deadline,
+    cache_key: str
+) -> Optional[SerializedProduct]:
+    """
+    Load and serialize a product missing from the product cache, and cache it if admitted.
+
+    Returns:
+        Optional[SerializedProduct]: The serialized product, None if not found.
+    """
+    if is_conditional(request):
+        # Only lastUpdatedAt is fetched, so an unchanged product is neither loaded nor serialized
+        last_updated_at = product_repository.get_last_updated_at(product_id, deadline=deadline)
+        if last_updated_at is not None:
+            check_not_modified(request, "get_product_by_id",
+                               strong_etag(product_id, last_updated_at), last_updated_at.as_datetime())
+
+    def load() -> Optional[SerializedProduct]:
+        product = product_repository.get_by_id(product_id, deadline=deadline)
+        return serialize_product(product_id, product) if product else None
+
+    product = product_flights.do(cache_key, load, timeout=deadline.remaining_ms() / 1000)
+    if product:
+        product_cache.set(cache_key, product)
+    return product
 
 def list_products(
+    request: Request,
     page: int = Query(1, alias="pagination[page]", ge=1),
     page_size: int = Query(10, alias="pagination[pageSize]", ge=1),
     sort: Optional[str] = Query(None),
     name: Optional[str] = Query(None),
     category: Optional[str] = Query(None),
-    product_repository: ProductRepository = Depends(get_mongodb_repo(ProductRepository))
+    catalog_repository: CatalogRepository = Depends(get_mongodb_repo(CatalogRepository)),
+    version_repository: VersionRepository = Depends(get_mongodb_repo(VersionRepository)),
+    deadline: Deadline = Depends(request_deadline("list_products"))
 ):
     """
     List products with optional filtering, pagination, and sorting.
+    Products are read from the lean product catalog, not from the products collection.
+    Besides name and category, filters can be given as filter[field][$op]=value (see PRODUCT_FILTERS).
+    The response carries a weak ETag derived from the products collection (or category) version
+    and the query, so a matching If-None-Match is answered with 304 before the products are queried.
+    The serialized page is cached under the same version, so a write makes it unreachable.
+    While the change stream is not watched, the version misses writes made by other processes,
+    so the ETag is derived from the page itself.
 
     Returns:
         Products data array matching the criteria and metadata about pagination.
     """
-    filter_query: Dict[str, Any] = {}
-    if name:
-        filter_query["name"] = {"$regex": name, "$options": "i"}
-    if category:
-        filter_query["categories"] = category
+    filter_query = merge_filters(
+        build_product_filter(name, category),
+        parse_filters(PRODUCT_FILTERS, request.query_params.multi_items())
+    )
 
     sort_query = None
     if sort:
@@ -74,26 +296,191 @@ def list_products(
                 field = pair
                 sort_query.append((field, 1))
 
-    skip = (page - 1) * page_size
-    limit = page_size
+    key = query_key("products", filter_query, sort_query, page, page_size)
+    product_list_hot_keys.record(key)
+    version = version_repository.get_version(listing_version_name("products", category), deadline=deadline)
+    watching = product_events.watching
+    if watching:
+        etag = weak_etag(version, key)
+        check_not_modified(request, "list_products", etag)
 
-    products, total = product_repository.get_all(
-        filter=filter_query,
-        skip=skip,
-        limit=limit,
-        sort=sort_query
-    )
+    body = load_product_page(catalog_repository, f"{version}:{key}", filter_query, sort_query,
+                             page, page_size, deadline=deadline)
+    if not watching:
+        etag = weak_etag(body)
+        check_not_modified(request, "list_products", etag)
+    return Response(content=body, media_type="application/json",
+                    headers=cache_headers("list_products", etag))
+
+def load_product_page(
+    catalog_repository: CatalogRepository,
+    cache_key: str,
+    filter_query: Dict[str, Any],
+    sort_query: Optional[List[tuple]],
+    page: int,
+    page_size: int,
+    deadline: Optional[Deadline] = None
+) -> bytes:
+    """
+    Get a serialized listing page from the response cache, or load and cache it.
+    While the change stream is not watched, writes made by other processes do not bump the
+    version, so the page is loaded from the products collection and not cached.
+
+    Args:
+        catalog_repository (CatalogRepository): The repository to load the page from on a miss.
+        cache_key (str): The normalized query key, prefixed with the version the page depends on.
+        filter_query (Dict[str, Any]): The MongoDB filter.
+        sort_query (Optional[List[tuple]]): The (field, direction) sort pairs.
+        page (int): The page number.
+        page_size (int): The page size.
+        deadline (Optional[Deadline]): The deadline of the current request, if any.
+
+    Returns:
+        bytes: The serialized ProductListResponse.
+    """
+    cached = product_events.watching
+    if cached:
+        body = product_list_cache.get(cache_key)
+        if body is not None:
+            return body
+    else:
+        metrics.increment("response_cache_bypassed", "list_products")
 
-    page_count = (total + page_size - 1) // page_size if page_size else 0
-
-    return ProductListResponse(
-        data=products,
-        meta=Meta(
-            pagination={
-                "page": page,
-                "pageSize": page_size,
-                "pageCount": page_count,
-                "total": total
-            }
+    def load() -> bytes:
+        products, total = catalog_repository.get_all(
+            filter=filter_query,
+            skip=(page - 1) * page_size,
+            limit=page_size,
+            sort=sort_query,
+            deadline=deadline,
+            # Until the catalog is known to be up to date, read the products themselves
+            from_products=not catalog_projector.current
         )
-    )
\ No newline at end of file
+
+        page_count = (total + page_size - 1) // page_size if page_size else 0
+
+        body = ProductListResponse(
+            data=products,
+            meta=Meta(
+                pagination={
+                    "page": page,
+                    "pageSize": page_size,
+                    "pageCount": page_count,
+                    "total": total
+                }
+            )
+        ).model_dump_json(by_alias=True).encode("utf-8")
+        if cached:
+            product_list_cache.set(cache_key, body)
+        return body
+
+    if not cached:
+        # Nor can the version tell a read started before a write from one started after it
+        return load()
+
+    # The version is part of the key, so a request made after a write never joins a read started before it
+    timeout = deadline.remaining_ms() / 1000 if deadline else None
+    return product_flights.do(cache_key, load, timeout=timeout)
+
+def get_product_facets(
+    category: Optional[str] = Query(None),
+    tags: List[str] = Query([]),
+    min_price: Optional[float] = Query(None, alias="minPrice", ge=0),
+    max_price: Optional[float] = Query(None, alias="maxPrice", ge=0),
+    limit: int = Query(settings.FACET_DEFAULT_LIMIT, ge=1, le=100),
+    product_repository: ProductRepository = Depends(get_mongodb_repo(ProductRepository)),
+    deadline: Deadline = Depends(request_deadline("get_product_facets"))
+) -> Dict[str, Any]:
+    """
+    Count the categories, tags and price buckets of the products matching a filter.
+    Counts come from the in-memory facet index, which is built on first use (or at warm-up)
+    and kept up to date as products change. Until the first build is done, requests are
+    answered with 503 (see require_index).
+
+    Args:
+        category (Optional[str]): Exact category.
+        tags (List[str]): Tags the products must all have.
+        min_price (Optional[float]): Inclusive lower price bound.
+        max_price (Optional[float]): Exclusive upper price bound.
+        limit (int): How many categories and tags to return, most frequent first.
+
+    Returns:
+        Dict[str, Any]: The total and the facet counts.
+    """
+    require_index("facet", facet_index, lambda: build_product_facets(product_repository), deadline)
+    return facet_index.facets(category=category, tags=tags, min_price=min_price,
+                              max_price=max_price, limit=limit)
+
+def rebuild_product_facets(
+    product_repository: ProductRepository = Depends(get_mongodb_repo(ProductRepository))
+) -> Dict[str, int]:
+    """
+    Rebuild the facet index from the products collection.
+
+    Returns:
+        Dict[str, int]: The number of products indexed.
+    """
+    return {"indexed": build_product_facets(product_repository, force=True)}
+
+def build_product_facets(product_repository: ProductRepository, force: bool = False) -> int:
+    """
+    Build the facet index from the products collection. Concurrent builds share one scan.
+
+    Args:
+        product_repository (ProductRepository): The repository to scan.
+        force (bool): Rebuild even if the index is already built.
+
+    Returns:
+        int: The number of products indexed.
+    """
+    def build() -> int:
+        if facet_index.built and not force:
+            return len(facet_index)
+        return facet_index.rebuild(product_repository.iter_facet_fields())
+
+    return product_flights.do(f"facets:build:{force}", build)
+
+def get_product_suggestions(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(settings.SUGGEST_DEFAULT_LIMIT, ge=1, le=50),
+    product_repository: ProductRepository = Depends(get_mongodb_repo(ProductRepository)),
+    order_repository: OrderRepository = Depends(get_mongodb_repo(OrderRepository)),
+    deadline: Deadline = Depends(request_deadline("get_product_suggestions"))
+) -> Dict[str, Any]:
+    """
+    Suggest products and tags for what a user typed so far, most popular first.
+    Suggestions come from the in-memory suggest index, which is built on first use (or at warm-up)
+    and kept up to date as products change. Until the first build is done, requests are
+    answered with 503 (see require_index).
+
+    Args:
+        q (str): The text typed so far. It matches the start of a name, of a later word of a name, or of a tag.
+        limit (int): The number of suggestions.
+
+    Returns:
+        Dict[str, Any]: The suggestions.
+    """
+    require_index("suggest", suggest_index,
+                  lambda: build_product_suggestions(product_repository, order_repository), deadline)
+    return {"data": suggest_index.suggest(q, limit)}
+
+def build_product_suggestions(product_repository: ProductRepository, order_repository: OrderRepository,
+                              force: bool = False) -> int:
+    """
+    Build the suggest index from the products collection, ranked by quantity sold and number of reviews.
+    Concurrent builds share one scan.
+
+    Args:
+        product_repository (ProductRepository): The repository to scan.
+        order_repository (OrderRepository): The repository to count sold quantities from.
+        force (bool): Rebuild even if the index is already built.
+
+    Returns:
+        int: The number of entries indexed.
+    """
+    def build() -> int:
+        if suggest_index.built and not force:
+            return 0
+        return suggest_index.rebuild(product_repository.iter_suggest_fields(), order_repository.get_sold_quantities())
+
+    return product_flights.do(f"suggest:build:{force}", build)
@@ -0,0 +1,12 @@
+from typing import List, Optional
+from pydantic import BaseModel
+
+
+class Suggestion(BaseModel):
+    type: str
+    text: str
+    productId: Optional[str] = None
+    score: float
+
+class ProductSuggestResponse(BaseModel):
+    data: List[Suggestion]
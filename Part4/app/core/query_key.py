@@ -0,0 +1,31 @@
+import json
+from typing import Any, Dict, List, Optional
+
+
+def query_key(
+    resource: str,
+    filter: Optional[Dict[str, Any]] = None,
+    sort: Optional[List[tuple]] = None,
+    page: Optional[int] = None,
+    page_size: Optional[int] = None
+) -> str:
+    """
+    Build a normalized key for a read query, so that equivalent requests
+    (e.g. the same filters given in another order) map to the same key.
+
+    Args:
+        resource (str): The resource being read, e.g. "products".
+        filter (Optional[Dict[str, Any]]): The MongoDB filter.
+        sort (Optional[List[tuple]]): The (field, direction) sort pairs.
+        page (Optional[int]): The page number.
+        page_size (Optional[int]): The page size.
+
+    Returns:
+        str: A stable string key.
+    """
+    return json.dumps(
+        [resource, filter or {}, [list(pair) for pair in sort or []], page, page_size],
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
@@ -0,0 +1,17 @@
+from typing import List
+from pydantic import BaseModel
+
+
+class CoPurchasedProduct(BaseModel):
+    productId: str
+    count: int
+
+class FrequentlyBoughtTogetherResponse(BaseModel):
+    data: List[CoPurchasedProduct]
+
+class SimilarProduct(BaseModel):
+    productId: str
+    score: float
+
+class SimilarProductsResponse(BaseModel):
+    data: List[SimilarProduct]
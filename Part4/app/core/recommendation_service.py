@@ -0,0 +1,81 @@
+from typing import Any, Dict, Optional
+
+from fastapi import Depends, Query
+from app.core.config import settings
+from app.core.deadline import Deadline, request_deadline
+from app.core.dependencies import get_mongodb_repo
+from app.core.product_service import product_flights, require_index, validate_object_id
+from app.core.similarity_index import similarity_index
+from app.repository.product_repository import ProductRepository
+from app.repository.recommendation_repository import RecommendationRepository
+
+
+def get_frequently_bought_together(
+    product_id: str,
+    limit: int = Query(10, ge=1, le=settings.CO_PURCHASE_TOP_K),
+    recommendation_repository: RecommendationRepository = Depends(get_mongodb_repo(RecommendationRepository)),
+    deadline: Deadline = Depends(request_deadline("get_frequently_bought_together"))
+) -> Dict[str, Any]:
+    """
+    Get the products most often ordered together with a product, as precomputed by the co-purchase job.
+
+    Args:
+        product_id (str): The ID of the product.
+        limit (int): The number of products to return.
+
+    Returns:
+        Dict[str, Any]: Product IDs and how many orders contained both products, most co-purchased first.
+        Empty for products never ordered with another one.
+    """
+    validate_object_id(product_id)
+    return {"data": recommendation_repository.get_neighbours(product_id, limit, deadline=deadline)}
+
+def get_similar_products(
+    product_id: str,
+    limit: int = Query(10, ge=1, le=50),
+    product_repository: ProductRepository = Depends(get_mongodb_repo(ProductRepository)),
+    deadline: Deadline = Depends(request_deadline("get_similar_products"))
+) -> Optional[Dict[str, Any]]:
+    """
+    Get the products whose tags and categories are most similar to a product's, from the in-memory
+    similarity index, which is built on first use (or at warm-up) and kept up to date as products change.
+    Until the first build is done, requests are answered with 503 (see require_index).
+
+    Args:
+        product_id (str): The ID of the product.
+        limit (int): The number of products to return.
+
+    Returns:
+        Optional[Dict[str, Any]]: Product IDs and Jaccard similarities, most similar first.
+        None if the product is not indexed: unknown, or without tags and categories.
+    """
+    validate_object_id(product_id)
+    require_index("similarity", similarity_index, lambda: build_similarity_index(product_repository), deadline)
+    similar = similarity_index.similar(product_id, limit)
+    return {"data": similar} if similar is not None else None
+
+def build_similarity_index(product_repository: ProductRepository, force: bool = False) -> int:
+    """
+    Build the similarity index: load the snapshot file, if any, then reconcile it with the products
+    collection, so only products changed since the snapshot get new signatures. The result is saved
+    back to the snapshot file. Concurrent builds share one scan.
+
+    Args:
+        product_repository (ProductRepository): The repository to scan.
+        force (bool): Rebuild even if the index is already built.
+
+    Returns:
+        int: The number of products indexed.
+    """
+    def build() -> int:
+        if similarity_index.built and not force:
+            return len(similarity_index)
+        path = settings.SIMILARITY_SNAPSHOT_PATH
+        if path and not similarity_index.built:
+            print(f"Similarity snapshot loaded: {similarity_index.load(path)} product(s)")
+        indexed = similarity_index.rebuild(product_repository.iter_facet_fields())
+        if path:
+            similarity_index.save(path)
+        return indexed
+
+    return product_flights.do(f"similar:build:{force}", build)
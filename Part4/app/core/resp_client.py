@@ -0,0 +1,109 @@
+import socket
+import threading
+from typing import Any, Optional
+from urllib.parse import urlparse
+
+
+class RespError(Exception):
+    """
+    Raised when the server answers a command with an error reply.
+    """
+
+
+class RespClient:
+    """
+    A minimal client for servers speaking the Redis serialization protocol (RESP2).
+
+    Only what the response cache needs is implemented. Each thread keeps its own
+    connection, because the services run in the threadpool and RESP connections
+    cannot be shared between concurrent commands.
+    """
+    def __init__(self, host: str = "localhost", port: int = 6379, db: int = 0, timeout: float = 0.1):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.timeout = timeout
+        self._local = threading.local()
+
+    @classmethod
+    def from_url(cls, url: str, timeout: float = 0.1) -> "RespClient":
+        """
+        Create a client from a URL such as "redis://localhost:6379/0".
+        """
+        parsed = urlparse(url)
+        db = int(parsed.path.lstrip("/") or 0)
+        return cls(parsed.hostname or "localhost", parsed.port or 6379, db, timeout)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            conn = self._local.conn = (sock, sock.makefile("rb"))
+            if self.db:
+                self.execute("SELECT", self.db)
+        return conn
+
+    def _disconnect(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            conn[1].close()
+            conn[0].close()
+
+    def execute(self, *args: Any) -> Any:
+        """
+        Send a command and read its reply.
+
+        Raises:
+            RespError: If the server replies with an error.
+            OSError: If the connection fails. The connection is dropped and
+                re-opened by the next command.
+        """
+        sock, reader = self._connection()
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        try:
+            sock.sendall(b"".join(parts))
+            return self._read_reply(reader)
+        except (OSError, ValueError):
+            self._disconnect()
+            raise
+
+    def _read_reply(self, reader) -> Any:
+        line = reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise ConnectionError("Connection closed by server")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode("utf-8")
+        if kind == b"-":
+            raise RespError(payload.decode("utf-8"))
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length == -1:
+                return None
+            data = reader.read(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            length = int(payload)
+            if length == -1:
+                return None
+            return [self._read_reply(reader) for _ in range(length)]
+        raise ValueError(f"Unknown RESP reply type {kind!r}")
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.execute("GET", key)
+
+    def set(self, key: str, value: bytes, ttl_ms: Optional[int] = None) -> None:
+        if ttl_ms:
+            self.execute("SET", key, value, "PX", ttl_ms)
+        else:
+            self.execute("SET", key, value)
+
+    def close(self) -> None:
+        self._disconnect()
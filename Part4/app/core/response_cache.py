@@ -0,0 +1,194 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.resp_client import RespClient, RespError
+
+
+class InProcessCache:
+    """
+    A thread-safe LRU cache of serialized responses with a TTL.
+
+    When full, a new key evicts the least recently used one, unless an admission policy
+    is given and rejects it: `admission(candidate, victim)` decides whether the new key is
+    worth more than the one it would evict.
+    """
+    def __init__(self, max_entries: int, ttl_seconds: float,
+                 admission: Optional[Callable[[str, str], bool]] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.admission = admission
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> bool:
+        """
+        Returns:
+            bool: Whether the value was cached, False if the admission policy rejected it.
+        """
+        with self._lock:
+            if key not in self._entries and len(self._entries) >= self.max_entries and self.admission:
+                victim = next(iter(self._entries))
+                if not self.admission(key, victim):
+                    return False
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return True
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SharedCache:
+    """
+    A cache tier shared by all instances, on a server speaking the Redis protocol.
+
+    The shared tier is an optimization only: any failure is counted and treated as a miss,
+    so an unavailable server never fails a request. After a failure, the tier is skipped
+    for `backoff_seconds`, so requests do not each wait for the connect timeout while the
+    server is down.
+    """
+    def __init__(self, client: RespClient, ttl_seconds: float, prefix: str = "rc:", backoff_seconds: float = 10):
+        self.client = client
+        self.ttl_ms = int(ttl_seconds * 1000)
+        self.prefix = prefix
+        self.backoff_seconds = backoff_seconds
+        self._lock = threading.Lock()
+        self._skip_until = 0.0
+
+    def _available(self) -> bool:
+        if time.monotonic() < self._skip_until:
+            metrics.increment("response_cache_skipped", "shared")
+            return False
+        return True
+
+    def _failed(self, command: str, error: Exception) -> None:
+        metrics.increment("response_cache_errors", "shared")
+        with self._lock:
+            now = time.monotonic()
+            reopened = now >= self._skip_until
+            self._skip_until = now + self.backoff_seconds
+        # Reported once per backoff period, not once per request
+        if reopened:
+            print(f"Shared response cache {command} failed, skipping it for {self.backoff_seconds}s: {error}")
+
+    def get(self, key: str) -> Optional[bytes]:
+        if not self._available():
+            return None
+        try:
+            return self.client.get(self.prefix + key)
+        except (OSError, RespError, ValueError) as e:
+            self._failed("GET", e)
+            return None
+
+    def set(self, key: str, value: bytes) -> None:
+        if not self._available():
+            return
+        try:
+            self.client.set(self.prefix + key, value, ttl_ms=self.ttl_ms)
+        except (OSError, RespError, ValueError) as e:
+            self._failed("SET", e)
+
+
+class ResponseCache:
+    """
+    A two-tier cache of serialized response bytes: in-process first, then the optional shared tier.
+
+    Entries are never invalidated in place. Callers put the version of the data they
+    read into the key, and writes bump that version, so a page cached before a write
+    can no longer be looked up after it. Stale entries simply age out.
+    """
+    def __init__(self, name: str, local: InProcessCache, shared: Optional[SharedCache] = None):
+        self.name = name
+        self.local = local
+        self.shared = shared
+        metrics.register_gauge("response_cache_hit_ratio", name, self.hit_ratio)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Get a cached response body.
+
+        Args:
+            key (str): The versioned, normalized key of the response.
+
+        Returns:
+            Optional[bytes]: The cached body, None on a miss.
+        """
+        value = self.local.get(key)
+        if value is not None:
+            metrics.increment("response_cache_hits", f"{self.name}.local")
+            return value
+        if self.shared is not None:
+            value = self.shared.get(key)
+            if value is not None:
+                metrics.increment("response_cache_hits", f"{self.name}.shared")
+                self.local.set(key, value)
+                return value
+        metrics.increment("response_cache_misses", self.name)
+        return None
+
+    def set(self, key: str, value: bytes) -> None:
+        """
+        Store a response body in every tier.
+        """
+        if not self.local.set(key, value):
+            metrics.increment("response_cache_rejected", self.name)
+        if self.shared is not None:
+            self.shared.set(key, value)
+
+    def hit_ratio(self) -> float:
+        """
+        Returns:
+            float: The share of lookups served from either tier.
+        """
+        hits = (metrics.get("response_cache_hits", f"{self.name}.local")
+                + metrics.get("response_cache_hits", f"{self.name}.shared"))
+        lookups = hits + metrics.get("response_cache_misses", self.name)
+        return hits / lookups if lookups else 0.0
+
+
+def create_response_cache(name: str, admission: Optional[Callable[[str, str], bool]] = None) -> ResponseCache:
+    """
+    Create a response cache from the settings. The shared tier is only used
+    when `RESPONSE_CACHE_REDIS_URL` is set.
+
+    Args:
+        name (str): The cache name, used in metrics.
+        admission (Optional[Callable[[str, str], bool]]): The admission policy of the in-process tier.
+    """
+    local = InProcessCache(settings.RESPONSE_CACHE_MAX_ENTRIES, settings.RESPONSE_CACHE_TTL_SECONDS, admission)
+    shared = None
+    if settings.RESPONSE_CACHE_REDIS_URL:
+        shared = SharedCache(
+            RespClient.from_url(settings.RESPONSE_CACHE_REDIS_URL,
+                                timeout=settings.RESPONSE_CACHE_REDIS_TIMEOUT_MS / 1000),
+            settings.RESPONSE_CACHE_TTL_SECONDS,
+            prefix=f"{settings.RESPONSE_CACHE_KEY_PREFIX}{name}:",
+            backoff_seconds=settings.RESPONSE_CACHE_REDIS_BACKOFF_SECONDS
+        )
+    return ResponseCache(name, local, shared)
@@ -0,0 +1,10 @@
+from typing import List
+from pydantic import BaseModel
+
+from app.core.meta import CursorMeta
+from app.models.review import ReviewModel
+
+
+class ReviewListResponse(BaseModel):
+    data: List[ReviewModel]
+    meta: CursorMeta
@@ -0,0 +1,99 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+from bson import ObjectId
+from fastapi import Body, Depends, HTTPException, Query, status
+from app.core.config import settings
+from app.core.create_review_command import CreateReviewCommand
+from app.core.deadline import Deadline, request_deadline
+from app.core.dependencies import get_mongodb_repo
+from app.core.meta import CursorMeta
+from app.core.product_events import product_events
+from app.core.product_service import validate_object_id
+from app.core.review_list_query import ReviewListResponse
+from app.models.review import ReviewModel
+from app.repository.review_repository import ReviewConflict, ReviewRepository
+
+
+def list_product_reviews(
+    product_id: str,
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(settings.REVIEWS_DEFAULT_PAGE_SIZE, ge=1, le=100),
+    review_repository: ReviewRepository = Depends(get_mongodb_repo(ReviewRepository)),
+    deadline: Deadline = Depends(request_deadline("list_product_reviews"))
+):
+    """
+    List the reviews of a product, newest first, with cursor pagination.
+
+    Args:
+        product_id (str): The ID of the product.
+        cursor (Optional[str]): The nextCursor of the previous page.
+        limit (int): The page size.
+
+    Returns:
+        The reviews and the cursor of the next page, None if the product does not exist.
+    """
+    validate_object_id(product_id)
+    if cursor is not None and not ObjectId.is_valid(cursor):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor."
+        )
+    result = review_repository.get_reviews(
+        product_id,
+        cursor=ObjectId(cursor) if cursor else None,
+        limit=limit,
+        deadline=deadline
+    )
+    if result is None:
+        return None
+    reviews, has_more = result
+    return ReviewListResponse(
+        data=reviews,
+        meta=CursorMeta(
+            pagination={
+                "limit": limit,
+                "nextCursor": str(reviews[-1].reviewId) if has_more else None
+            }
+        )
+    )
+
+def create_product_review(
+    product_id: str,
+    command: CreateReviewCommand = Body(..., ),
+    review_repository: ReviewRepository = Depends(get_mongodb_repo(ReviewRepository))
+):
+    """
+    Add a review to a product, updating its rating and reviewCount.
+
+    Args:
+        product_id (str): The ID of the reviewed product.
+        command (CreateReviewCommand): The review.
+
+    Returns:
+        The created review, None if the product does not exist.
+    """
+    validate_object_id(product_id)
+    review = ReviewModel(
+        reviewAuthor=command.reviewAuthor,
+        stars=command.stars,
+        reviewText=command.reviewText,
+        createdAt=datetime.now(timezone.utc),
+    )
+    try:
+        product = review_repository.add_review(
+            product_id,
+            review,
+            embedded_limit=settings.REVIEWS_EMBEDDED_LIMIT,
+            retries=settings.REVIEW_WRITE_RETRIES
+        )
+    except ReviewConflict:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="The product is being reviewed concurrently, please retry."
+        )
+    if product is None:
+        return None
+    # The rating shows on listing pages: the catalog projector updates them and bumps their versions
+    product_events.publish_upsert(product)
+    return review
@@ -0,0 +1,283 @@
+import hashlib
+import os
+import threading
+from collections import defaultdict
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.product_events import product_events
+
+# Universal hashing modulo a Mersenne prime; features are reduced below it first, so
+# a * feature + b stays within 64 bits
+_PRIME = np.uint64((1 << 31) - 1)
+_SNAPSHOT_VERSION = 1
+# Features are joined with a separator that cannot appear in a tag or category we index
+_SEPARATOR = "\x1f"
+
+
+def product_features(product: Dict[str, Any]) -> FrozenSet[str]:
+    """
+    The set compared between products: their tags and categories, case folded.
+    """
+    return frozenset(
+        [f"tag:{tag.casefold()}" for tag in product.get("tags") or () if tag] +
+        [f"category:{category.casefold()}" for category in product.get("categories") or () if category]
+    )
+
+
+class SimilarityIndex:
+    """
+    MinHash signatures of each product's tags and categories, with LSH buckets.
+
+    The Jaccard similarity of two feature sets is the probability that their MinHash values
+    agree. Signatures are cut into `bands` bands of rows; products sharing any band are
+    candidates, so a query only compares a product with the few candidates of its buckets,
+    never with the whole catalog. Candidates are ranked by their exact Jaccard similarity.
+    """
+    def __init__(self, num_perm: int = 64, bands: int = 16, max_candidates: int = 1000, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.max_candidates = max_candidates
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, int(_PRIME), size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, int(_PRIME), size=num_perm, dtype=np.uint64)
+        self._lock = threading.RLock()
+        self.built = False
+        self.changes = 0
+        self._feature_hashes: Dict[str, int] = {}
+        self._product_ids: List[Optional[str]] = []
+        self._features: List[FrozenSet[str]] = []
+        self._signatures = np.zeros((0, num_perm), dtype=np.uint32)
+        self._slots: Dict[str, int] = {}
+        self._free: List[int] = []
+        self._buckets: List[Dict[bytes, Set[int]]] = [defaultdict(set) for _ in range(bands)]
+        # Products changed while a rebuild computes signatures, which its older scan must not overwrite
+        self._touched: Optional[Set[str]] = None
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _hash_feature(self, feature: str) -> int:
+        value = self._feature_hashes.get(feature)
+        if value is None:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            value = self._feature_hashes[feature] = int.from_bytes(digest, "little") % int(_PRIME)
+        return value
+
+    def signatures(self, feature_sets: List[FrozenSet[str]]) -> np.ndarray:
+        """
+        Compute the MinHash signatures of non-empty feature sets, all at once.
+
+        Returns:
+            np.ndarray: One row of `num_perm` values per feature set.
+        """
+        lengths = np.fromiter((len(features) for features in feature_sets), dtype=np.int64, count=len(feature_sets))
+        hashes = np.fromiter((self._hash_feature(feature) for features in feature_sets for feature in features),
+                             dtype=np.uint64, count=int(lengths.sum()))
+        permuted = (self._a[:, None] * hashes[None, :] + self._b[:, None]) % _PRIME
+        starts = np.r_[0, np.cumsum(lengths)[:-1]]
+        return np.minimum.reduceat(permuted, starts, axis=1).T.astype(np.uint32)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+
+    def _add(self, product_id: str, features: FrozenSet[str], signature: np.ndarray) -> None:
+        if self._free:
+            slot = self._free.pop()
+            self._product_ids[slot], self._features[slot] = product_id, features
+        else:
+            slot = len(self._product_ids)
+            self._product_ids.append(product_id)
+            self._features.append(features)
+            if slot >= len(self._signatures):
+                grown = np.zeros((max(1024, slot * 2), self.num_perm), dtype=np.uint32)
+                grown[:len(self._signatures)] = self._signatures
+                self._signatures = grown
+        self._signatures[slot] = signature
+        self._slots[product_id] = slot
+        for band, key in enumerate(self._band_keys(signature)):
+            self._buckets[band][key].add(slot)
+
+    def _remove(self, product_id: str) -> None:
+        slot = self._slots.pop(product_id, None)
+        if slot is None:
+            return
+        for band, key in enumerate(self._band_keys(self._signatures[slot])):
+            bucket = self._buckets[band][key]
+            bucket.discard(slot)
+            if not bucket:
+                del self._buckets[band][key]
+        self._product_ids[slot], self._features[slot] = None, frozenset()
+        self._free.append(slot)
+
+    def _changed(self, products: Dict[str, FrozenSet[str]]) -> List[Tuple[str, FrozenSet[str]]]:
+        return [(product_id, features) for product_id, features in products.items()
+                if product_id not in self._slots or self._features[self._slots[product_id]] != features]
+
+    def _sign(self, changed: List[Tuple[str, FrozenSet[str]]], batch_size: int = 10000) -> List[Tuple[str, FrozenSet[str], Optional[np.ndarray]]]:
+        signed: List[Tuple[str, FrozenSet[str], Optional[np.ndarray]]] = [
+            (product_id, features, None) for product_id, features in changed if not features
+        ]
+        indexed = [(product_id, features) for product_id, features in changed if features]
+        for start in range(0, len(indexed), batch_size):
+            batch = indexed[start:start + batch_size]
+            signatures = self.signatures([features for _, features in batch])
+            signed.extend((product_id, features, signature) for (product_id, features), signature in zip(batch, signatures))
+        return signed
+
+    def _replace(self, signed: List[Tuple[str, FrozenSet[str], Optional[np.ndarray]]]) -> None:
+        for product_id, features, signature in signed:
+            self._remove(product_id)
+            if signature is not None:
+                self._add(product_id, features, signature)
+        self.changes += len(signed)
+
+    def rebuild(self, products: Iterable[Dict[str, Any]]) -> int:
+        """
+        Index every product, dropping products that are not in `products`.
+        Products whose features did not change (e.g. since a loaded snapshot) keep their signature.
+        Signatures are computed outside the lock, so queries are served meanwhile.
+
+        Args:
+            products (Iterable[Dict[str, Any]]): Product documents with at least _id, tags and categories.
+
+        Returns:
+            int: The number of products indexed.
+        """
+        # Track changes from before the scan, as the scan may read a product before it changes
+        with self._lock:
+            self._touched = set()
+        try:
+            features = {str(product["_id"]): product_features(product) for product in products}
+            with self._lock:
+                changed = self._changed(features)
+            signed = self._sign(changed)
+        finally:
+            with self._lock:
+                touched, self._touched = self._touched, None
+        with self._lock:
+            removed = [product_id for product_id in self._slots
+                       if product_id not in features and product_id not in touched]
+            for product_id in removed:
+                self._remove(product_id)
+            self._replace([item for item in signed if item[0] not in touched])
+            self.changes += len(removed)
+            self.built = True
+            return len(self._slots)
+
+    def upsert(self, product: Dict[str, Any]) -> None:
+        """
+        Index an inserted or updated product.
+        """
+        product_id = str(product["_id"])
+        with self._lock:
+            if self._touched is not None:
+                self._touched.add(product_id)
+            self._replace(self._sign(self._changed({product_id: product_features(product)})))
+
+    def remove(self, product_id: str) -> None:
+        """
+        Remove a deleted product.
+        """
+        with self._lock:
+            if self._touched is not None:
+                self._touched.add(product_id)
+            if product_id in self._slots:
+                self._remove(product_id)
+                self.changes += 1
+
+    def similar(self, product_id: str, limit: int = 10) -> Optional[List[Dict[str, Any]]]:
+        """
+        Find the products whose tags and categories are most similar to a product's.
+
+        Args:
+            product_id (str): The ID of the product.
+            limit (int): The number of products to return.
+
+        Returns:
+            Optional[List[Dict[str, Any]]]: Product IDs and Jaccard similarities, most similar first.
+            None if the product is not indexed (unknown, or without tags and categories).
+        """
+        with self._lock:
+            slot = self._slots.get(product_id)
+            if slot is None:
+                return None
+            features = self._features[slot]
+            candidates: Set[int] = set()
+            for band, key in enumerate(self._band_keys(self._signatures[slot])):
+                for candidate in self._buckets[band].get(key, ()):
+                    candidates.add(candidate)
+                    if len(candidates) > self.max_candidates:
+                        break
+                if len(candidates) > self.max_candidates:
+                    break
+            candidates.discard(slot)
+            scored = [
+                (len(features & self._features[candidate]) / len(features | self._features[candidate]),
+                 self._product_ids[candidate])
+                for candidate in candidates
+            ]
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [{"productId": other, "score": round(score, 4)} for score, other in scored[:limit]]
+
+    def save(self, path: str) -> int:
+        """
+        Write the signatures and features to a snapshot file, replacing it atomically.
+
+        Returns:
+            int: The number of products saved.
+        """
+        with self._lock:
+            slots = sorted(self._slots.values())
+            product_ids = np.array([self._product_ids[slot] for slot in slots], dtype=str)
+            features = np.array([_SEPARATOR.join(sorted(self._features[slot])) for slot in slots], dtype=str)
+            signatures = self._signatures[slots]
+            changes = self.changes
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "wb") as snapshot:
+            np.savez(snapshot, version=_SNAPSHOT_VERSION, params=np.array([self.num_perm, self.bands, self.seed]),
+                     product_ids=product_ids, features=features, signatures=signatures)
+        os.replace(temporary_path, path)
+        with self._lock:
+            if self.changes == changes:
+                self.changes = 0
+        return len(slots)
+
+    def load(self, path: str) -> int:
+        """
+        Load a snapshot written with the same parameters, replacing the current contents.
+        The index is not marked built: it should then be reconciled with the products collection.
+
+        Returns:
+            int: The number of products loaded, 0 if there is no compatible snapshot.
+        """
+        if not os.path.exists(path):
+            return 0
+        with np.load(path) as snapshot:
+            if int(snapshot["version"]) != _SNAPSHOT_VERSION or \
+                    snapshot["params"].tolist() != [self.num_perm, self.bands, self.seed]:
+                print(f"Ignoring similarity snapshot {path} written with other parameters")
+                return 0
+            product_ids, features, signatures = snapshot["product_ids"], snapshot["features"], snapshot["signatures"]
+        with self._lock:
+            for product_id in list(self._slots):
+                self._remove(product_id)
+            for product_id, joined, signature in zip(product_ids.tolist(), features.tolist(), signatures):
+                self._add(product_id, frozenset(joined.split(_SEPARATOR)), signature)
+            self.changes = 0
+            return len(self._slots)
+
+# Create a global similarity index, kept up to date with product changes
+similarity_index = SimilarityIndex(
+    num_perm=settings.SIMILARITY_NUM_PERM,
+    bands=settings.SIMILARITY_BANDS,
+    max_candidates=settings.SIMILARITY_MAX_CANDIDATES
+)
+product_events.subscribe(similarity_index.upsert, similarity_index.remove)
@@ -0,0 +1,97 @@
+import threading
+import time
+from typing import Callable, Dict, Generic, Optional, TypeVar
+
+from pymongo.errors import ExecutionTimeout
+
+from app.core.deadline import ClientDisconnected, DeadlineExceeded
+from app.core.metrics import metrics
+
+T = TypeVar("T")
+
+# Errors raised because of the request that happened to lead a call, not because of the call itself
+LEADER_REQUEST_ERRORS = (ClientDisconnected, DeadlineExceeded, ExecutionTimeout)
+
+
+class _Call(Generic[T]):
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[T] = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Coalesce identical concurrent calls into one.
+
+    The first caller for a key (the leader) runs the function; callers arriving with the
+    same key while it is in flight wait for it and share its result, or its error.
+    Errors that belong to the leader's request rather than to the call (its deadline ran
+    out, or its client went away) are not shared: the followers run the call again.
+    Nothing is kept once the call finishes, so this is not a cache.
+    It is thread-based because the services run in the threadpool.
+    """
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        metrics.register_gauge("single_flight_coalescing_ratio", name, self.coalescing_ratio)
+
+    def do(self, key: str, fn: Callable[[], T], timeout: Optional[float] = None) -> T:
+        """
+        Run `fn`, or wait for the identical call already in flight.
+
+        Args:
+            key (str): The normalized key of the call.
+            fn (Callable[[], T]): The function to run if no identical call is in flight.
+                It should use the caller's own deadline.
+            timeout (Optional[float]): How long a follower waits for the leader, in seconds.
+
+        Returns:
+            T: The result of the call.
+
+        Raises:
+            DeadlineExceeded: If a follower gives up waiting before the leader finishes.
+        """
+        expires_at = time.monotonic() + timeout if timeout is not None else None
+        metrics.increment("single_flight_calls", self.name)
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+            if leader:
+                break
+
+            metrics.increment("single_flight_coalesced", self.name)
+            remaining = None if expires_at is None else max(0.0, expires_at - time.monotonic())
+            if not call.done.wait(remaining):
+                raise DeadlineExceeded()
+            if call.error is None:
+                return call.result
+            if not isinstance(call.error, LEADER_REQUEST_ERRORS):
+                raise call.error
+            # The leader's request was abandoned, not the call: run it again with this caller's
+            # deadline. The call it joined did not serve it, so it is not counted as coalesced.
+            metrics.increment("single_flight_coalesced", self.name, -1)
+            metrics.increment("single_flight_retries", self.name)
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def coalescing_ratio(self) -> float:
+        """
+        Returns:
+            float: The share of calls that were served by another call in flight.
+        """
+        calls = metrics.get("single_flight_calls", self.name)
+        return metrics.get("single_flight_coalesced", self.name) / calls if calls else 0.0
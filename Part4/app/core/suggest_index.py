@@ -0,0 +1,341 @@
+import bisect
+import sys
+import threading
+import unicodedata
+from collections import Counter
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.product_events import product_events
+
+# Sorts after every character of a normalized term, so prefix + _MAX_CHAR bounds a prefix range
+_MAX_CHAR = "\U0010ffff"
+_TAG_REF_PREFIX = "tag:"
+
+
+def normalize(text: str) -> str:
+    """
+    Normalize text for prefix matching: accents removed, case folded, and every run of
+    non-alphanumeric characters collapsed to one space.
+    """
+    decomposed = unicodedata.normalize("NFKD", text)
+    folded = "".join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+    return " ".join("".join(char if char.isalnum() else " " for char in folded).split())
+
+
+def _name_terms(name: str, max_words: int) -> List[str]:
+    # The whole name and the suffixes starting at its next words, so "galaxy" finds "Samsung Galaxy S24"
+    words = normalize(name).split()
+    return [" ".join(words[i:]) for i in range(min(len(words), max_words))]
+
+
+class _Product(NamedTuple):
+    name: str
+    tags: Tuple[str, ...]
+    score: float
+
+
+class _SortedTerms:
+    """
+    An immutable sorted array of (term, ref) entries with a score per entry.
+
+    A prefix is a contiguous range of the array, found with two binary searches. The top
+    entries of a range are selected with a numpy partition over its scores, except for
+    ranges larger than `heavy_range`, whose top entries are precomputed at build time.
+    """
+    def __init__(self, entries: List[Tuple[str, str, float]], top_k: int, heavy_range: int):
+        entries.sort()
+        self.terms = [term for term, _, _ in entries]
+        self.refs = [ref for _, ref, _ in entries]
+        self.scores = np.fromiter((score for _, _, score in entries), dtype=np.float64, count=len(entries))
+        self.top_k = top_k
+        self.heavy_range = heavy_range
+        self.heavy: Dict[str, np.ndarray] = {}
+        if len(self.terms) > heavy_range:
+            self._precompute("", 0, len(self.terms))
+
+    def range(self, prefix: str) -> Tuple[int, int]:
+        return bisect.bisect_left(self.terms, prefix), bisect.bisect_left(self.terms, prefix + _MAX_CHAR)
+
+    def _top_of_range(self, lo: int, hi: int, count: int) -> np.ndarray:
+        if hi - lo <= count:
+            indexes = np.arange(lo, hi)
+        else:
+            indexes = lo + np.argpartition(-self.scores[lo:hi], count)[:count]
+        return indexes[np.argsort(-self.scores[indexes], kind="stable")]
+
+    def _precompute(self, prefix: str, lo: int, hi: int) -> None:
+        # Every prefix of a heavy prefix is heavy, so heavy prefixes form a tree walked from ""
+        self.heavy[prefix] = self._top_of_range(lo, hi, self.top_k)
+        depth = len(prefix)
+        i = bisect.bisect_right(self.terms, prefix, lo, hi)
+        while i < hi:
+            child = self.terms[i][:depth + 1]
+            child_hi = bisect.bisect_left(self.terms, child + _MAX_CHAR, i, hi)
+            if child_hi - i > self.heavy_range:
+                self._precompute(child, i, child_hi)
+            i = child_hi
+
+    def top(self, prefix: str, count: int) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: The indexes of the best scored entries starting with `prefix`, best first.
+        """
+        lo, hi = self.range(prefix)
+        if hi - lo > self.heavy_range and count <= self.top_k and prefix in self.heavy:
+            return self.heavy[prefix]
+        return self._top_of_range(lo, hi, count)
+
+
+class SuggestIndex:
+    """
+    In-memory prefix index of normalized product names and tags, ranked by popularity.
+
+    The bulk of the entries is an immutable sorted array, built at startup. Product changes
+    go to a small sorted delta, and hide the product's entries in the array until the next
+    merge, which rebuilds the array in the background once the delta grows past `delta_limit`.
+    Sales only change a product's score: its entries stay in the array, and it is added to the
+    delta once, so later sales of the same product cost a dictionary update until the merge.
+    Entries with the lowest scores are left out when the index would exceed its memory budget.
+    """
+    def __init__(self, memory_budget_bytes: int, max_words: int = 4, top_k: int = 32,
+                 heavy_range: int = 2048, delta_limit: int = 10000):
+        self.memory_budget_bytes = memory_budget_bytes
+        self.max_words = max_words
+        self.top_k = top_k
+        self.heavy_range = heavy_range
+        self.delta_limit = delta_limit
+        self._lock = threading.RLock()
+        self._merging = False
+        self.built = False
+        self.estimated_bytes = 0
+        self.dropped_entries = 0
+        self._products: Dict[str, _Product] = {}
+        self._sold: Dict[str, float] = {}
+        self._tag_counts: Counter = Counter()
+        self._base = _SortedTerms([], top_k, heavy_range)
+        self._base_tags: Set[str] = set()
+        # Products changed since the base was built, with the number of changes of each
+        self._dirty: Dict[str, int] = {}
+        # Products whose score changed since the base was built, with the number of sales of each
+        self._rescored: Dict[str, int] = {}
+        self._delta: List[Tuple[str, str]] = []
+        self._delta_terms: Dict[str, List[str]] = {}
+        metrics.register_gauge("suggest_index_bytes", "total", lambda: self.estimated_bytes)
+
+    def _score(self, product_id: str, review_count: int) -> float:
+        return self._sold.get(product_id, 0) + review_count
+
+    def _entries(self, products: Dict[str, _Product], tag_counts: Counter) -> List[Tuple[str, str, float]]:
+        entries = []
+        for product_id, product in products.items():
+            for term in _name_terms(product.name, self.max_words):
+                entries.append((term, product_id, product.score))
+        for tag, count in tag_counts.items():
+            term = normalize(tag)
+            if term and count > 0:
+                entries.append((term, _TAG_REF_PREFIX + tag, float(count)))
+        return entries
+
+    def _fit_budget(self, entries: List[Tuple[str, str, float]], fixed_bytes: int) -> List[Tuple[str, str, float]]:
+        # A term string, a list slot for it and for its (shared) ref, and its score
+        entry_bytes = [sys.getsizeof(term) + 24 for term, _, _ in entries]
+        budget = self.memory_budget_bytes - fixed_bytes
+        if sum(entry_bytes) <= budget:
+            self.estimated_bytes = fixed_bytes + sum(entry_bytes)
+            self.dropped_entries = 0
+            return entries
+        kept, used = [], 0
+        for i in sorted(range(len(entries)), key=lambda i: -entries[i][2]):
+            if used + entry_bytes[i] > budget:
+                continue
+            kept.append(entries[i])
+            used += entry_bytes[i]
+        self.estimated_bytes = fixed_bytes + used
+        self.dropped_entries = len(entries) - len(kept)
+        print(f"Suggest index over its memory budget, left out {self.dropped_entries} entries")
+        return kept
+
+    def _build_base(self, products: Dict[str, _Product], tag_counts: Counter) -> Tuple[_SortedTerms, Set[str]]:
+        fixed_bytes = sum(sys.getsizeof(product.name) + 200 for product in products.values())
+        entries = self._fit_budget(self._entries(products, tag_counts), fixed_bytes)
+        tags = {ref[len(_TAG_REF_PREFIX):] for _, ref, _ in entries if ref.startswith(_TAG_REF_PREFIX)}
+        return _SortedTerms(entries, self.top_k, self.heavy_range), tags
+
+    def rebuild(self, products: Iterable[Dict[str, Any]], sold: Dict[str, float]) -> int:
+        """
+        Rebuild the whole index.
+
+        Args:
+            products (Iterable[Dict[str, Any]]): Product documents with at least _id, name, tags and reviewCount.
+            sold (Dict[str, float]): The quantity sold of each product ID.
+
+        Returns:
+            int: The number of entries indexed.
+        """
+        self._sold = dict(sold)
+        indexed: Dict[str, _Product] = {}
+        tag_counts: Counter = Counter()
+        for product in products:
+            product_id = str(product["_id"])
+            tags = tuple(sorted(set(product.get("tags") or ())))
+            indexed[product_id] = _Product(product.get("name") or "", tags,
+                                           self._score(product_id, product.get("reviewCount") or 0))
+            tag_counts.update(tags)
+        base, base_tags = self._build_base(indexed, tag_counts)
+        with self._lock:
+            self._products = indexed
+            self._tag_counts = tag_counts
+            self._base, self._base_tags = base, base_tags
+            self._dirty, self._rescored, self._delta, self._delta_terms = {}, {}, [], {}
+            self.built = True
+            return len(base.terms)
+
+    def _remove_delta(self, ref: str) -> None:
+        for term in self._delta_terms.pop(ref, ()):
+            i = bisect.bisect_left(self._delta, (term, ref))
+            if i < len(self._delta) and self._delta[i] == (term, ref):
+                del self._delta[i]
+
+    def _add_delta(self, ref: str, terms: List[str]) -> None:
+        for term in terms:
+            bisect.insort(self._delta, (term, ref))
+        self._delta_terms[ref] = terms
+
+    def _update_tags(self, old: Tuple[str, ...], new: Tuple[str, ...]) -> None:
+        self._tag_counts.subtract(old)
+        self._tag_counts.update(new)
+        for tag in set(new) - set(old) - self._base_tags:
+            ref = _TAG_REF_PREFIX + tag
+            if ref not in self._delta_terms and normalize(tag):
+                self._add_delta(ref, [normalize(tag)])
+
+    def _changed(self, product_id: str, product: Optional[_Product]) -> None:
+        previous = self._products.pop(product_id, None)
+        self._remove_delta(product_id)
+        self._rescored.pop(product_id, None)
+        self._dirty[product_id] = self._dirty.get(product_id, 0) + 1
+        if product is not None:
+            self._products[product_id] = product
+            self._add_delta(product_id, _name_terms(product.name, self.max_words))
+        self._update_tags(previous.tags if previous else (), product.tags if product else ())
+        self._merge_if_large()
+
+    def _merge_if_large(self) -> None:
+        if len(self._dirty) + len(self._rescored) > self.delta_limit and not self._merging:
+            self._merging = True
+            threading.Thread(target=self._merge, name="suggest-merge", daemon=True).start()
+
+    def upsert(self, product: Dict[str, Any]) -> None:
+        """
+        Index an inserted or updated product.
+        """
+        product_id = str(product["_id"])
+        tags = tuple(sorted(set(product.get("tags") or ())))
+        with self._lock:
+            indexed = _Product(product.get("name") or "", tags,
+                               self._score(product_id, product.get("reviewCount") or 0))
+            if self._products.get(product_id) != indexed:
+                self._changed(product_id, indexed)
+
+    def remove(self, product_id: str) -> None:
+        """
+        Remove a deleted product.
+        """
+        with self._lock:
+            if product_id in self._products:
+                self._changed(product_id, None)
+
+    def add_sold(self, product_id: str, quantity: float) -> None:
+        """
+        Count sold units of a product towards its popularity.
+        """
+        with self._lock:
+            self._sold[product_id] = self._sold.get(product_id, 0) + quantity
+            product = self._products.get(product_id)
+            if product is None:
+                return
+            self._products[product_id] = product._replace(score=product.score + quantity)
+            # The delta entries rank the product by its new score, above its stale array entries
+            if product_id not in self._delta_terms:
+                self._add_delta(product_id, _name_terms(product.name, self.max_words))
+            if product_id not in self._dirty:
+                self._rescored[product_id] = self._rescored.get(product_id, 0) + 1
+                self._merge_if_large()
+
+    def _merge(self) -> None:
+        try:
+            with self._lock:
+                products = dict(self._products)
+                tag_counts = Counter(self._tag_counts)
+                merged_changes = dict(self._dirty)
+                merged_sales = dict(self._rescored)
+            base, base_tags = self._build_base(products, tag_counts)
+            with self._lock:
+                self._base, self._base_tags = base, base_tags
+                # Changes made while building stay in the delta
+                for product_id, changes in merged_changes.items():
+                    if self._dirty.get(product_id) == changes:
+                        del self._dirty[product_id]
+                        self._remove_delta(product_id)
+                for product_id, sales in merged_sales.items():
+                    if self._rescored.get(product_id) == sales:
+                        del self._rescored[product_id]
+                        self._remove_delta(product_id)
+                for ref in [ref for ref in self._delta_terms if ref.startswith(_TAG_REF_PREFIX)]:
+                    if ref[len(_TAG_REF_PREFIX):] in base_tags:
+                        self._remove_delta(ref)
+        finally:
+            self._merging = False
+
+    def _resolve(self, ref: str) -> Optional[Dict[str, Any]]:
+        if ref.startswith(_TAG_REF_PREFIX):
+            tag = ref[len(_TAG_REF_PREFIX):]
+            count = self._tag_counts.get(tag, 0)
+            return {"type": "tag", "text": tag, "productId": None, "score": float(count)} if count > 0 else None
+        product = self._products.get(ref)
+        if product is None:
+            return None
+        return {"type": "product", "text": product.name, "productId": ref, "score": product.score}
+
+    def suggest(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Suggest products and tags whose normalized name (or a word suffix of it) starts with the query.
+
+        Args:
+            query (str): What the user typed so far.
+            limit (int): The number of suggestions.
+
+        Returns:
+            List[Dict[str, Any]]: Suggestions with their type, text, product ID and score, most popular first.
+        """
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        with self._lock:
+            base, dirty = self._base, self._dirty
+            refs: List[str] = []
+            # Leave room for entries hidden by the delta and for duplicates of a product
+            for count in (limit * 2, self.top_k * 4, len(base.terms)):
+                refs = [base.refs[i] for i in base.top(prefix, count) if base.refs[i] not in dirty]
+                if len(set(refs)) >= limit or count >= len(base.terms):
+                    break
+            lo = bisect.bisect_left(self._delta, (prefix,))
+            hi = bisect.bisect_left(self._delta, (prefix + _MAX_CHAR,))
+            refs.extend(ref for _, ref in self._delta[lo:hi])
+
+            suggestions: Dict[str, Dict[str, Any]] = {}
+            for ref in refs:
+                if ref not in suggestions:
+                    suggestion = self._resolve(ref)
+                    if suggestion is not None:
+                        suggestions[ref] = suggestion
+        return sorted(suggestions.values(), key=lambda suggestion: -suggestion["score"])[:limit]
+
+# Create a global suggest index, kept up to date with product changes
+suggest_index = SuggestIndex(settings.SUGGEST_MEMORY_BUDGET_MB * 1024 * 1024,
+                             max_words=settings.SUGGEST_MAX_WORDS_PER_NAME)
+product_events.subscribe(suggest_index.upsert, suggest_index.remove)
@@ -0,0 +1,237 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Optional, Set
+
+from bson import ObjectId
+from fastapi import FastAPI
+from pymongo import MongoClient
+
+from app.core.catalog_projection import catalog_projector
+from app.core.config import settings
+from app.core.order_list_query import OrderListResponse
+from app.core.part4_products_query import ensure_indexes as ensure_part4_indexes
+from app.core.product_list_query import ProductListResponse
+from app.core.product_service import build_product_facets, build_product_filter, build_product_suggestions, load_product_page
+from app.core.product_service import product_cache, product_cache_key, serialize_product
+from app.core.query_key import query_key
+from app.core.recommendation_service import build_similarity_index
+from app.models.order import OrderModel
+from app.models.product import ProductModel
+from app.repository.catalog_repository import CatalogRepository
+from app.repository.order_repository import OrderRepository
+from app.repository.product_repository import ProductRepository
+from app.repository.review_repository import ReviewRepository
+from app.repository.version_repository import VersionRepository, listing_version_name
+
+
+class Readiness:
+    """
+    Tracks whether this instance is ready to take traffic.
+
+    Unlike the health check, which only tells that the process is up, readiness is
+    reported once the startup warm-up has completed or timed out, and its required steps
+    have finished: those the instance cannot serve correctly without, even after the timeout.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.ready = False
+        self.reason: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.steps: Dict[str, Any] = {}
+        self.pending: Set[str] = set()
+        # The reason of a mark_ready call made while required steps were pending
+        self._deferred_reason: Optional[str] = None
+
+    def start(self, required: Iterable[str] = ()) -> None:
+        with self._lock:
+            self.ready = False
+            self.reason = None
+            self.started_at = time.monotonic()
+            self.steps = {}
+            self.pending = set(required)
+            self._deferred_reason = None
+
+    def record(self, step: str, result: Any) -> None:
+        with self._lock:
+            self.steps[step] = result
+
+    def mark_ready(self, reason: str) -> None:
+        """
+        Mark the instance ready, or once the required steps have finished. Only the first
+        call counts, so a warm-up finishing after its timeout does not overwrite the reason.
+
+        Args:
+            reason (str): "completed", "timeout" or "disabled".
+        """
+        with self._lock:
+            if self.ready:
+                return
+            if self.pending:
+                self._deferred_reason = self._deferred_reason or reason
+                return
+            self.ready = True
+            self.reason = reason
+
+    def finish(self, step: str) -> None:
+        """
+        Record that a required step has finished, successfully or not.
+
+        Args:
+            step (str): The name of the step.
+        """
+        with self._lock:
+            self.pending.discard(step)
+            if not self.pending and not self.ready and self._deferred_reason:
+                self.ready = True
+                self.reason = self._deferred_reason
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "status": "ready" if self.ready else "warming_up",
+                "reason": self.reason,
+                "steps": dict(self.steps),
+                "pending": sorted(self.pending),
+            }
+
+# Create a global readiness state
+readiness = Readiness()
+
+
+def open_connections(mongo_client: MongoClient, target: int) -> int:
+    """
+    Grow the connection pool towards `target` by running that many pings concurrently.
+    Each concurrent ping checks out its own connection, so the pool does not have to
+    grow from MinPoolSize under real traffic.
+
+    Returns:
+        int: The number of successful pings.
+    """
+    with ThreadPoolExecutor(max_workers=target) as pool:
+        results = list(pool.map(lambda _: mongo_client.admin.command("ping"), range(target)))
+    return sum(1 for result in results if result.get("ok"))
+
+
+def precompile_schemas(app: FastAPI) -> int:
+    """
+    Build the OpenAPI document and the JSON schemas of the response models, which are
+    otherwise built lazily by the first request that needs them.
+
+    Returns:
+        int: The number of models compiled.
+    """
+    app.openapi()
+    models = (ProductModel, ProductListResponse, OrderModel, OrderListResponse)
+    for model in models:
+        model.model_json_schema(by_alias=True)
+    return len(models)
+
+
+def prefetch_top_products(mongo_client: MongoClient, limit: int) -> int:
+    """
+    Read the most ordered products, so their documents are in MongoDB's cache, and put them
+    in the product cache under the keys real requests use.
+
+    Returns:
+        int: The number of products found.
+    """
+    product_repository = ProductRepository(mongo_client)
+    product_ids = OrderRepository(mongo_client).get_top_product_ids(limit)
+    found = 0
+    for product_id in product_ids:
+        if readiness.ready:
+            break
+        if not ObjectId.is_valid(product_id):
+            continue
+        product = product_repository.get_by_id(product_id)
+        if product:
+            product_cache.set(product_cache_key(product_id), serialize_product(product_id, product))
+            found += 1
+    return found
+
+
+def prefetch_category_pages(mongo_client: MongoClient, limit: int, pages: int, page_size: int) -> int:
+    """
+    Load the first pages of the unfiltered listing and of the largest categories into the
+    response cache, under the same keys real requests use.
+
+    Returns:
+        int: The number of pages cached.
+    """
+    product_repository = ProductRepository(mongo_client)
+    catalog_repository = CatalogRepository(mongo_client)
+    version_repository = VersionRepository(mongo_client)
+    cached = 0
+    for category in [None] + product_repository.get_top_categories(limit):
+        filter_query = build_product_filter(category=category)
+        version = version_repository.get_version(listing_version_name("products", category))
+        for page in range(1, pages + 1):
+            if readiness.ready:
+                return cached
+            key = query_key("products", filter_query, None, page, page_size)
+            load_product_page(catalog_repository, f"{version}:{key}", filter_query, None, page, page_size)
+            cached += 1
+    return cached
+
+
+def _run_step(name: str, step: Callable[[], Any]) -> None:
+    started_at = time.monotonic()
+    try:
+        result = step()
+        readiness.record(name, {"result": result, "seconds": round(time.monotonic() - started_at, 3)})
+    except Exception as e:
+        # A failed step only means a colder start, it must not keep the instance out of rotation
+        print(f"Warm-up step {name} failed: {e}")
+        readiness.record(name, {"error": str(e)})
+
+
+def run_warmup(app: FastAPI, mongo_client: MongoClient) -> None:
+    """
+    Run every warm-up step, then mark the instance ready.
+
+    Args:
+        app (FastAPI): The FastAPI application instance.
+        mongo_client (MongoClient): The application's MongoDB client.
+    """
+    print('Warming up...')
+    # Listings read the products collection until the catalog is backfilled
+    try:
+        _run_step("catalog", lambda: catalog_projector.sync(mongo_client))
+    finally:
+        readiness.finish("catalog")
+    _run_step("catalog_indexes", lambda: len(CatalogRepository(mongo_client).ensure_indexes()))
+    _run_step("review_indexes", lambda: len(ReviewRepository(mongo_client).ensure_indexes()))
+    _run_step("part4_indexes", lambda: len(ensure_part4_indexes(mongo_client[settings.MONGODB_DATABASE])))
+    _run_step("connections", lambda: open_connections(mongo_client, settings.WARMUP_CONNECTIONS))
+    _run_step("schemas", lambda: precompile_schemas(app))
+    _run_step("products", lambda: prefetch_top_products(mongo_client, settings.WARMUP_TOP_PRODUCTS))
+    _run_step("category_pages", lambda: prefetch_category_pages(
+        mongo_client,
+        settings.WARMUP_TOP_CATEGORIES,
+        settings.WARMUP_PAGES_PER_CATEGORY,
+        settings.WARMUP_PAGE_SIZE,
+    ))
+    _run_step("facets", lambda: build_product_facets(ProductRepository(mongo_client)))
+    _run_step("suggest", lambda: build_product_suggestions(ProductRepository(mongo_client), OrderRepository(mongo_client)))
+    _run_step("similarity", lambda: build_similarity_index(ProductRepository(mongo_client)))
+    readiness.mark_ready("completed")
+    print(f'Warm-up finished: {readiness.reason}')
+
+
+def start_warmup(app: FastAPI, mongo_client: MongoClient) -> threading.Thread:
+    """
+    Start the warm-up in the background, so the process is live while it runs.
+    The instance is marked ready after `WARMUP_TIMEOUT_SECONDS` even if the warm-up is not done,
+    but not before the catalog backfill has finished.
+
+    Returns:
+        threading.Thread: The warm-up thread.
+    """
+    readiness.start(required=("catalog",))
+    timer = threading.Timer(settings.WARMUP_TIMEOUT_SECONDS, readiness.mark_ready, args=("timeout",))
+    timer.daemon = True
+    timer.start()
+    thread = threading.Thread(target=run_warmup, args=(app, mongo_client), name="warmup", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,69 @@
+"""
+Migration: convert dates stored as ISO strings to BSON dates.
+
+Orders used to be written through `jsonable_encoder`, which stored `createdAt` as a string.
+String dates cannot be range-queried or indexed as dates, so this converts them in place
+and then indexes `orders.createdAt`. Conversion runs on the server with an update pipeline,
+so documents are not round-tripped through the application. It is idempotent.
+
+Usage:
+    python -m app.migrations.string_dates_to_bson [--dry-run]
+"""
+import sys
+from typing import Dict, List, Tuple
+
+from pymongo import DESCENDING, MongoClient
+from pymongo.database import Database
+
+from app.core.config import settings
+
+# (collection, field) pairs that may hold string dates
+DATE_FIELDS: List[Tuple[str, str]] = [
+    ("orders", "createdAt"),
+    ("products", "createdAt"),
+    ("products", "lastUpdatedAt"),
+]
+
+
+def migrate(database: Database, dry_run: bool = False) -> Dict[str, int]:
+    """
+    Convert string dates to BSON dates.
+
+    Args:
+        database (Database): The application database.
+        dry_run (bool): Only count the documents that would be converted.
+
+    Returns:
+        Dict[str, int]: The number of documents converted (or to convert) per "collection.field".
+    """
+    results = {}
+    for collection_name, field in DATE_FIELDS:
+        collection = database[collection_name]
+        query = {field: {"$type": "string"}}
+        if dry_run:
+            results[f"{collection_name}.{field}"] = collection.count_documents(query)
+            continue
+        result = collection.update_many(
+            query,
+            [{"$set": {field: {"$dateFromString": {"dateString": f"${field}"}}}}]
+        )
+        results[f"{collection_name}.{field}"] = result.modified_count
+
+    if not dry_run:
+        database.orders.create_index([("createdAt", DESCENDING)], name="createdAt_-1")
+    return results
+
+
+def main():
+    dry_run = "--dry-run" in sys.argv
+    client = MongoClient(settings.MONGODB_URL)
+    try:
+        results = migrate(client[settings.MONGODB_DATABASE], dry_run=dry_run)
+    finally:
+        client.close()
+    for name, count in results.items():
+        print(f"{name}: {count} document(s) {'to convert' if dry_run else 'converted'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+from bson import ObjectId
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from datetime import datetime
+
+from app.models.mongo_timestamp import MongoTimestamp
+from app.models.py_object_id import PyObjectId
+
+class CatalogProductModel(BaseModel):
+    """
+    The lean copy of a product kept in the product_catalog collection for listing pages.
+    It has the same _id as the product, and only the fields listings display or filter on.
+    """
+    id: PyObjectId = Field(alias="_id")
+    name: str
+    shortDescription: Optional[str] = None
+    thumbnails: Optional[List[str]] = None
+    categories: Optional[List[str]] = None
+    tags: Optional[List[str]] = None
+    price: Optional[float] = None
+    inventoryCount: int
+    rating: Optional[float] = None
+    reviewCount: int = 0
+    createdAt: datetime
+    lastUpdatedAt: Optional[MongoTimestamp] = None
+
+    class Config:
+        allow_population_by_field_name = True
+        arbitrary_types_allowed = True
+        json_encoders = {ObjectId: str}
@@ -1,5 +1,45 @@
-from pydantic import BaseModel
+from datetime import datetime, timezone
+from typing import Any
+
+from bson import Timestamp
+from pydantic import BaseModel, SerializationInfo, SerializerFunctionWrapHandler, model_serializer, model_validator
+
+from app.core.bson_codec import is_bson_context
 
 class MongoTimestamp(BaseModel):
     t: int
-    i: int
\ No newline at end of file
+    i: int
+
+    @model_validator(mode="before")
+    @classmethod
+    def from_bson(cls, value: Any) -> Any:
+        """
+        Accept BSON Timestamps and datetimes as they come back from MongoDB.
+        A datetime keeps its microseconds as the ordinal, so ordering is preserved.
+        """
+        if isinstance(value, Timestamp):
+            return {"t": value.time, "i": value.inc}
+        if isinstance(value, datetime):
+            if value.tzinfo is None:
+                value = value.replace(tzinfo=timezone.utc)
+            return {"t": int(value.timestamp()), "i": value.microsecond}
+        return value
+
+    @model_serializer(mode="wrap")
+    def to_bson(self, handler: SerializerFunctionWrapHandler, info: SerializationInfo) -> Any:
+        """
+        Dump as a BSON Timestamp when converting for MongoDB, as {t, i} otherwise.
+        """
+        if is_bson_context(info):
+            return Timestamp(self.t, self.i)
+        return handler(self)
+
+    def as_datetime(self) -> datetime:
+        """
+        Returns:
+            datetime: The timestamp as an aware UTC datetime, with second precision.
+        """
+        return datetime.fromtimestamp(self.t, tz=timezone.utc)
+
+    def __str__(self) -> str:
+        return f"{self.t}.{self.i}"
@@ -21,7 +21,7 @@ class ShippingAddressModel(BaseModel):
     country: str
 
 class OrderModel(BaseModel):
-    id: PyObjectId = Field(alias="_id", default_factory=PyObjectId)
+    id: PyObjectId = Field(alias="_id", default_factory=ObjectId)
     customerId: PyObjectId
     orderItems: List[OrderItemModel]
     subtotal: float
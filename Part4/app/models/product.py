@@ -5,6 +5,7 @@ from datetime import datetime
 
 from app.models.mongo_timestamp import MongoTimestamp
 from app.models.py_object_id import PyObjectId
+from app.models.review import ReviewModel
 
 class ProductModel(BaseModel):
     id: PyObjectId = Field(alias="_id")
@@ -17,8 +18,12 @@ class ProductModel(BaseModel):
     tags: Optional[List[str]] = None
     price: Optional[float] = None
     inventoryCount: int
+    # The most recent reviews, newest first. Older ones are in the reviews collection.
+    reviews: Optional[List[ReviewModel]] = None
+    rating: Optional[float] = None
+    reviewCount: int = 0
     createdAt: datetime
-    # lastUpdatedAt: MongoTimestamp
+    lastUpdatedAt: Optional[MongoTimestamp] = None
 
     class Config:
         allow_population_by_field_name = True
@@ -18,8 +18,9 @@ class PyObjectId(str):
                     core_schema.no_info_plain_validator_function(cls.validate),
                 ])
             ]),
+            # Only JSON gets strings, python dumps keep the ObjectId for MongoDB
             serialization=core_schema.plain_serializer_function_ser_schema(
-                lambda x: str(x)
+                lambda x: str(x), when_used="json"
             ),
         )
 
@@ -0,0 +1,18 @@
+from bson import ObjectId
+from pydantic import BaseModel, Field
+from typing import Optional
+from datetime import datetime
+
+from app.models.py_object_id import PyObjectId
+
+class ReviewModel(BaseModel):
+    reviewId: PyObjectId = Field(default_factory=ObjectId)
+    reviewAuthor: str
+    stars: int = Field(ge=1, le=5)
+    reviewText: Optional[str] = None
+    createdAt: datetime
+
+    class Config:
+        allow_population_by_field_name = True
+        arbitrary_types_allowed = True
+        json_encoders = {ObjectId: str}
@@ -1,5 +1,7 @@
+from typing import Any, Dict, Optional
 from pymongo import MongoClient
 from app.core.config import settings
+from app.core.deadline import Deadline
 
 
 
@@ -27,4 +29,36 @@ class BaseRepository:
         Returns:
             MongoClient: The MongoDB client instance.
         """
-        return self._mongo
\ No newline at end of file
+        return self._mongo
+
+    @staticmethod
+    def _max_time_ms(deadline: Optional[Deadline]) -> Optional[int]:
+        """
+        Get the `maxTimeMS` to pass to the next MongoDB call.
+
+        Args:
+            deadline (Optional[Deadline]): The deadline of the current request, if any.
+
+        Returns:
+            Optional[int]: The remaining budget in milliseconds, or None for no limit.
+        """
+        if deadline is None:
+            return None
+        return deadline.max_time_ms
+
+    @classmethod
+    def _max_time_options(cls, deadline: Optional[Deadline]) -> Dict[str, Any]:
+        """
+        Get the `maxTimeMS` option for command helpers such as `count_documents`
+        and `aggregate`, which send their keyword arguments to the server as is.
+
+        Args:
+            deadline (Optional[Deadline]): The deadline of the current request, if any.
+
+        Returns:
+            Dict[str, Any]: The options to pass as keyword arguments, empty for no limit.
+        """
+        max_time_ms = cls._max_time_ms(deadline)
+        if max_time_ms is None:
+            return {}
+        return {"maxTimeMS": max_time_ms}
\ No newline at end of file
@@ -0,0 +1,267 @@
+from pymongo import ASCENDING, MongoClient, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.core.bson_codec import from_bson
+from app.core.deadline import Deadline
+from app.models.catalog_product import CatalogProductModel
+from app.repository.base_repository import BaseRepository
+
+# The product fields copied to the catalog, besides _id
+CATALOG_FIELDS: Tuple[str, ...] = (
+    "name",
+    "shortDescription",
+    "thumbnails",
+    "categories",
+    "tags",
+    "price",
+    "inventoryCount",
+    "rating",
+    "reviewCount",
+    "createdAt",
+    "lastUpdatedAt",
+)
+
+# Indexes backing the listing filters and sorts
+CATALOG_INDEXES: List[List[Tuple[str, int]]] = [
+    [("categories", ASCENDING), ("price", ASCENDING)],
+    [("tags", ASCENDING)],
+    [("price", ASCENDING)],
+    [("name", ASCENDING)],
+    [("createdAt", ASCENDING)],
+]
+
+
+def project_catalog(product: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Project a product document onto its catalog document.
+    Fields missing from the product are left out, as `$project` does.
+
+    Args:
+        product (Dict[str, Any]): The product document, as stored.
+
+    Returns:
+        Dict[str, Any]: The catalog document.
+    """
+    document = {"_id": product["_id"]}
+    for field in CATALOG_FIELDS:
+        if field in product:
+            document[field] = product[field]
+    return document
+
+
+class CatalogRepository(BaseRepository):
+    """
+    CatalogRepository provides methods to interact with the product_catalog collection,
+    a read model of the products collection holding only what listing pages need.
+    """
+    collection_name = "product_catalog"
+
+    def __init__(self, mongo: MongoClient):
+        self._mongo = mongo
+        super().__init__(mongo)
+        self.collection = self.database.product_catalog
+
+    def get_all(
+        self,
+        filter: Optional[Dict[str, Any]] = None,
+        skip: int = 0,
+        limit: int = 10,
+        sort: Optional[List[tuple]] = None,
+        deadline: Optional[Deadline] = None,
+        from_products: bool = False
+    ):
+        """
+        Retrieve catalog products with optional filtering, pagination, and sorting.
+        With `from_products`, the catalog fields are read from the products collection
+        instead, for when the catalog cannot be trusted to be up to date.
+
+        Returns:
+            Tuple[List[CatalogProductModel], int]: List of catalog products and total count.
+        """
+        query = filter or {}
+        if from_products:
+            collection = self.database.products
+            cursor = collection.find(query, {field: 1 for field in CATALOG_FIELDS},
+                                     max_time_ms=self._max_time_ms(deadline))
+        else:
+            collection = self.collection
+            cursor = collection.find(query, max_time_ms=self._max_time_ms(deadline))
+        if sort:
+            cursor = cursor.sort(sort)
+        cursor = cursor.skip(skip).limit(limit)
+        products = [from_bson(CatalogProductModel, doc) for doc in cursor]
+        total = collection.count_documents(query, **self._max_time_options(deadline))
+        return products, total
+
+    def upsert(self, product: Dict[str, Any]) -> Optional[List[str]]:
+        """
+        Write the catalog document of an inserted or updated product.
+        A product change delivered late (e.g. by the change stream after a direct write)
+        does not overwrite a catalog document with a newer lastUpdatedAt.
+
+        Args:
+            product (Dict[str, Any]): The product document, as stored.
+
+        Returns:
+            Optional[List[str]]: The categories the catalog document had before, empty if it
+            was inserted. None if it was not written because it is newer.
+        """
+        document = project_catalog(product)
+        query: Dict[str, Any] = {"_id": document["_id"]}
+        if document.get("lastUpdatedAt") is not None:
+            query["$or"] = [
+                {"lastUpdatedAt": {"$lte": document["lastUpdatedAt"]}},
+                {"lastUpdatedAt": None},
+            ]
+        try:
+            previous = self.collection.find_one_and_replace(
+                query, document, projection={"categories": 1}, upsert=True,
+                return_document=ReturnDocument.BEFORE
+            )
+        except DuplicateKeyError:
+            # The catalog document exists and is newer, so the upsert tried to insert a second one
+            return None
+        return list(previous.get("categories") or ()) if previous else []
+
+    def delete(self, product_id: Any) -> List[str]:
+        """
+        Delete the catalog document of a deleted product.
+
+        Args:
+            product_id (Any): The product's _id.
+
+        Returns:
+            List[str]: The categories of the deleted catalog document, empty if there was none.
+        """
+        previous = self.collection.find_one_and_delete({"_id": product_id}, projection={"categories": 1})
+        return list(previous.get("categories") or ()) if previous else []
+
+    def ensure_indexes(self) -> List[str]:
+        """
+        Create the catalog indexes if they do not exist.
+
+        Returns:
+            List[str]: The index names.
+        """
+        return [self.collection.create_index(keys) for keys in CATALOG_INDEXES]
+
+    def rebuild(self) -> int:
+        """
+        Rebuild the catalog from the products collection.
+        The projection runs on the server into a staging collection, which then replaces the
+        catalog in a single rename, so listings never see a partially built catalog.
+
+        Returns:
+            int: The number of catalog documents.
+        """
+        staging_name = f"{self.collection_name}_rebuild"
+        self.database.products.aggregate([
+            {"$project": {field: 1 for field in CATALOG_FIELDS}},
+            {"$out": staging_name},
+        ])
+        staging = self.database[staging_name]
+        for keys in CATALOG_INDEXES:
+            staging.create_index(keys)
+        count = staging.estimated_document_count()
+        staging.rename(self.collection_name, dropTarget=True)
+        return count
+
+    def is_stale(self) -> bool:
+        """
+        Tell cheaply whether the catalog is empty or out of date: it holds a different number
+        of documents than the products collection, or not the last update of the most recently
+        updated product.
+
+        Returns:
+            bool: Whether the catalog should be rebuilt.
+        """
+        if self.collection.estimated_document_count() != self.database.products.estimated_document_count():
+            return True
+        newest = self.database.products.find_one({}, {"lastUpdatedAt": 1}, sort=[("lastUpdatedAt", -1)])
+        if newest is None:
+            return False
+        entry = self.collection.find_one({"_id": newest["_id"]}, {"lastUpdatedAt": 1})
+        return entry is None or entry.get("lastUpdatedAt") != newest.get("lastUpdatedAt")
+
+    def refresh(self, product_ids: Iterable[Any]) -> List[str]:
+        """
+        Project some products onto the catalog again, from their current documents, and delete
+        the catalog documents of those that no longer exist.
+
+        Args:
+            product_ids (Iterable[Any]): The _ids of the products.
+
+        Returns:
+            List[str]: The old and new categories of the refreshed products.
+        """
+        product_ids = list(product_ids)
+        categories: List[str] = []
+        found = set()
+        for product in self.database.products.find({"_id": {"$in": product_ids}}):
+            found.add(product["_id"])
+            categories.extend(self.upsert(product) or ())
+            categories.extend(product.get("categories") or ())
+        for product_id in product_ids:
+            if product_id not in found:
+                categories.extend(self.delete(product_id))
+        return categories
+
+    def categories(self) -> List[str]:
+        """
+        Returns:
+            List[str]: Every category of the catalog.
+        """
+        return list(self.collection.distinct("categories"))
+
+    @staticmethod
+    def _sorted_by_id(collection, projection: Optional[Dict[str, int]] = None) -> Iterator[Dict[str, Any]]:
+        return iter(collection.find({}, projection).sort("_id", ASCENDING))
+
+    def check_consistency(self, repair: bool = False, sample_size: int = 10) -> Dict[str, Any]:
+        """
+        Compare the catalog with the products collection.
+        Both collections are read in _id order and merged, so memory use is constant.
+
+        Args:
+            repair (bool): Also rewrite missing and stale catalog documents and delete orphaned ones.
+            sample_size (int): How many _ids to report per kind of inconsistency.
+
+        Returns:
+            Dict[str, Any]: The number of products checked, the counts of missing, stale and
+            orphaned catalog documents, and a sample of their _ids.
+        """
+        report: Dict[str, Any] = {"checked": 0, "missing": 0, "stale": 0, "orphaned": 0, "samples": {}}
+
+        def found(kind: str, product_id: Any) -> None:
+            report[kind] += 1
+            samples = report["samples"].setdefault(kind, [])
+            if len(samples) < sample_size:
+                samples.append(str(product_id))
+
+        products = self._sorted_by_id(self.database.products, {field: 1 for field in CATALOG_FIELDS})
+        catalog = self._sorted_by_id(self.collection)
+        product = next(products, None)
+        entry = next(catalog, None)
+        while product is not None or entry is not None:
+            if entry is None or (product is not None and product["_id"] < entry["_id"]):
+                report["checked"] += 1
+                found("missing", product["_id"])
+                if repair:
+                    self.collection.replace_one({"_id": product["_id"]}, project_catalog(product), upsert=True)
+                product = next(products, None)
+            elif product is None or entry["_id"] < product["_id"]:
+                found("orphaned", entry["_id"])
+                if repair:
+                    self.delete(entry["_id"])
+                entry = next(catalog, None)
+            else:
+                report["checked"] += 1
+                expected = project_catalog(product)
+                if entry != expected:
+                    found("stale", product["_id"])
+                    if repair:
+                        self.collection.replace_one({"_id": product["_id"]}, expected, upsert=True)
+                product = next(products, None)
+                entry = next(catalog, None)
+        return report
@@ -1,7 +1,8 @@
 from bson import ObjectId
 from pymongo import MongoClient
-from typing import Dict, Any, List, Optional
-from fastapi.encoders import jsonable_encoder
+from typing import Dict, Any, Iterator, List, Optional
+from app.core.bson_codec import from_bson, to_bson
+from app.core.deadline import Deadline
 from app.models.order import OrderModel
 from app.repository.base_repository import BaseRepository
 
@@ -19,7 +20,8 @@ class OrderRepository(BaseRepository):
         filter: Optional[Dict[str, Any]] = None,
         skip: int = 0,
         limit: int = 10,
-        sort: Optional[List[tuple]] = None
+        sort: Optional[List[tuple]] = None,
+        deadline: Optional[Deadline] = None
     ):
         """
         Retrieve orders from the orders collection with optional filtering, pagination, and sorting.
@@ -28,27 +30,31 @@ class OrderRepository(BaseRepository):
             Tuple[List[OrderModel], int]: List of orders and total count.
         """
         query = filter or {}
-        cursor = self.database.orders.find(query)
+        cursor = self.database.orders.find(query, max_time_ms=self._max_time_ms(deadline))
         if sort:
             cursor = cursor.sort(sort)
         cursor = cursor.skip(skip).limit(limit)
-        orders = [OrderModel(**doc) for doc in cursor]
-        total = self.database.orders.count_documents(query)
+        orders = [from_bson(OrderModel, doc) for doc in cursor]
+        total = self.database.orders.count_documents(query, **self._max_time_options(deadline))
         return orders, total
 
-    def get_by_id(self, order_id: str) -> Optional[OrderModel]:
+    def get_by_id(self, order_id: str, deadline: Optional[Deadline] = None) -> Optional[OrderModel]:
         """
         Retrieve an order by its ID.
 
         Args:
             order_id (str): The ID of the order to retrieve.
+            deadline (Optional[Deadline]): The deadline of the current request, if any.
 
         Returns:
             Optional[OrderModel]: The order if found, otherwise None.
         """
-        order = self.database.orders.find_one({"_id": ObjectId(order_id)})
+        order = self.database.orders.find_one(
+            {"_id": ObjectId(order_id)},
+            max_time_ms=self._max_time_ms(deadline)
+        )
         if order:
-            return OrderModel(**order)
+            return from_bson(OrderModel, order)
         return None
     
     def create_new_order(self, order_data: OrderModel) -> OrderModel:
@@ -61,26 +67,71 @@ class OrderRepository(BaseRepository):
         Returns:
             OrderModel: The created order.
         """
-        #order_data.id = ObjectId()
-        model_in_json = jsonable_encoder(order_data)
-        
-        model_in_json["_id"] = ObjectId() 
-        if "customerId" in model_in_json and not isinstance(model_in_json["customerId"], ObjectId):
-            model_in_json["customerId"] = ObjectId(model_in_json["customerId"])
-
-        result = self.database.orders.insert_one(model_in_json)
+        # Written with native BSON types: ObjectIds, and dates that can be range-queried
+        document = to_bson(order_data)
+
+        result = self.database.orders.insert_one(document)
         created_order = self.database.orders.find_one({"_id": result.inserted_id})
-        return OrderModel(**created_order)
+        return from_bson(OrderModel, created_order)
 
-    def get_orders_by_customer_id(self, customer_id: str) -> List[OrderModel]:
+    def get_orders_by_customer_id(self, customer_id: str, deadline: Optional[Deadline] = None) -> List[OrderModel]:
         """
         Retrieve all orders for a specific customer by their ID.
 
         Args:
             customer_id (str): The ID of the customer.
+            deadline (Optional[Deadline]): The deadline of the current request, if any.
 
         Returns:
             List[OrderModel]: List of orders for the specified customer.
         """
-        orders = self.database.orders.find({"customerId": ObjectId(customer_id)})
-        return [OrderModel(**order) for order in orders]
\ No newline at end of file
+        orders = self.database.orders.find(
+            {"customerId": ObjectId(customer_id)},
+            max_time_ms=self._max_time_ms(deadline)
+        )
+        return [from_bson(OrderModel, order) for order in orders]
+
+    def get_top_product_ids(self, limit: int = 100) -> List[str]:
+        """
+        Retrieve the IDs of the most ordered products, by quantity.
+
+        Args:
+            limit (int): The number of product IDs to return.
+
+        Returns:
+            List[str]: Product IDs, most ordered first.
+        """
+        pipeline = [
+            {"$unwind": "$orderItems"},
+            {"$group": {"_id": "$orderItems.productId", "quantity": {"$sum": "$orderItems.quantity"}}},
+            {"$sort": {"quantity": -1, "_id": 1}},
+            {"$limit": limit},
+        ]
+        return [str(doc["_id"]) for doc in self.database.orders.aggregate(pipeline)]
+
+    def get_sold_quantities(self) -> Dict[str, int]:
+        """
+        Retrieve the quantity ordered of every product.
+
+        Returns:
+            Dict[str, int]: Quantities by product ID.
+        """
+        pipeline = [
+            {"$unwind": "$orderItems"},
+            {"$group": {"_id": "$orderItems.productId", "quantity": {"$sum": "$orderItems.quantity"}}},
+        ]
+        return {str(doc["_id"]): doc["quantity"] for doc in self.database.orders.aggregate(pipeline)}
+
+    def iter_order_items(self, after_id: Optional[Any] = None, batch_size: int = 5000) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over the product IDs of every order, in _id order.
+
+        Args:
+            after_id (Optional[Any]): Only iterate over orders with a greater _id.
+            batch_size (int): The number of orders fetched per round trip.
+
+        Returns:
+            Iterator[Dict[str, Any]]: Documents with _id and orderItems.productId only.
+        """
+        query = {"_id": {"$gt": after_id}} if after_id is not None else {}
+        return iter(self.database.orders.find(query, {"orderItems.productId": 1}, batch_size=batch_size).sort("_id", 1))
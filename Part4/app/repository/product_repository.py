@@ -1,7 +1,10 @@
 from bson import ObjectId
 from pymongo import MongoClient
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterator, List, Optional
 
+from app.core.bson_codec import from_bson
+from app.core.deadline import Deadline
+from app.models.mongo_timestamp import MongoTimestamp
 from app.models.product import ProductModel
 from app.repository.base_repository import BaseRepository
 
@@ -19,7 +22,8 @@ class ProductRepository(BaseRepository):
         filter: Optional[Dict[str, Any]] = None,
         skip: int = 0,
         limit: int = 10,
-        sort: Optional[List[tuple]] = None
+        sort: Optional[List[tuple]] = None,
+        deadline: Optional[Deadline] = None
     ):
         """
         Retrieve products from the products collection with optional filtering, pagination, and sorting.
@@ -28,25 +32,85 @@ class ProductRepository(BaseRepository):
             Tuple[List[ProductModel], int]: List of products and total count.
         """
         query = filter or {}
-        cursor = self.database.products.find(query)
+        cursor = self.database.products.find(query, max_time_ms=self._max_time_ms(deadline))
         if sort:
             cursor = cursor.sort(sort)
         cursor = cursor.skip(skip).limit(limit)
-        products = [ProductModel(**doc) for doc in cursor]
-        total = self.database.products.count_documents(query)
+        products = [from_bson(ProductModel, doc) for doc in cursor]
+        total = self.database.products.count_documents(query, **self._max_time_options(deadline))
         return products, total
     
-    def get_by_id(self, product_id: str) -> Optional[ProductModel]:
+    def get_by_id(self, product_id: str, deadline: Optional[Deadline] = None) -> Optional[ProductModel]:
         """
         Retrieve a product by its ID.
 
         Args:
             product_id (str): The ID of the product to retrieve.
+            deadline (Optional[Deadline]): The deadline of the current request, if any.
 
         Returns:
             Optional[ProductModel]: The product if found, otherwise None.
         """
-        product = self.database.products.find_one({"_id": ObjectId(product_id)})
+        product = self.database.products.find_one(
+            {"_id": ObjectId(product_id)},
+            max_time_ms=self._max_time_ms(deadline)
+        )
         if product:
-            return ProductModel(**product)
-        return None
\ No newline at end of file
+            return from_bson(ProductModel, product)
+        return None
+
+    def get_last_updated_at(self, product_id: str, deadline: Optional[Deadline] = None) -> Optional[MongoTimestamp]:
+        """
+        Retrieve only the lastUpdatedAt of a product, to validate cached copies without loading the document.
+
+        Args:
+            product_id (str): The ID of the product.
+            deadline (Optional[Deadline]): The deadline of the current request, if any.
+
+        Returns:
+            Optional[MongoTimestamp]: The last update time, None if the product or the field does not exist.
+        """
+        product = self.database.products.find_one(
+            {"_id": ObjectId(product_id)},
+            {"lastUpdatedAt": 1},
+            max_time_ms=self._max_time_ms(deadline)
+        )
+        if product and product.get("lastUpdatedAt") is not None:
+            return MongoTimestamp.model_validate(product["lastUpdatedAt"])
+        return None
+
+    def get_top_categories(self, limit: int = 10) -> List[str]:
+        """
+        Retrieve the categories with the most products.
+
+        Args:
+            limit (int): The number of categories to return.
+
+        Returns:
+            List[str]: Category names, largest first.
+        """
+        pipeline = [
+            {"$unwind": "$categories"},
+            {"$group": {"_id": "$categories", "count": {"$sum": 1}}},
+            {"$sort": {"count": -1, "_id": 1}},
+            {"$limit": limit},
+        ]
+        return [doc["_id"] for doc in self.database.products.aggregate(pipeline)]
+
+    def iter_facet_fields(self) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over the fields of every product that facets are counted on.
+
+        Returns:
+            Iterator[Dict[str, Any]]: Documents with _id, categories, tags and price only.
+        """
+        return self.database.products.find({}, {"categories": 1, "tags": 1, "price": 1})
+
+    def iter_suggest_fields(self) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over the fields of every product that suggestions are built from.
+
+        Returns:
+            Iterator[Dict[str, Any]]: Documents with _id, name, tags and reviewCount only.
+        """
+        return self.database.products.find({}, {"name": 1, "tags": 1, "reviewCount": 1})
@@ -0,0 +1,127 @@
+from datetime import datetime, timezone
+from pymongo import MongoClient, ReplaceOne
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.core.deadline import Deadline
+from app.repository.base_repository import BaseRepository
+
+
+class RecommendationRepository(BaseRepository):
+    """
+    RecommendationRepository provides methods to interact with the product_neighbours collection,
+    which holds the most co-purchased products of each product under the product's ID,
+    so a product's recommendations are a single lookup by _id.
+    """
+    collection_name = "product_neighbours"
+
+    def __init__(self, mongo: MongoClient, batch_size: int = 1000):
+        self._mongo = mongo
+        super().__init__(mongo)
+        self.collection = self.database.product_neighbours
+        self.batch_size = batch_size
+
+    def get_neighbours(self, product_id: str, limit: int, deadline: Optional[Deadline] = None) -> List[Dict[str, Any]]:
+        """
+        Get the most co-purchased products of a product.
+
+        Args:
+            product_id (str): The ID of the product.
+            limit (int): The number of neighbours to return.
+            deadline (Optional[Deadline]): The deadline of the current request, if any.
+
+        Returns:
+            List[Dict[str, Any]]: Product IDs and co-purchase counts, most co-purchased first.
+        """
+        doc = self.collection.find_one(
+            {"_id": product_id},
+            {"neighbours": {"$slice": limit}},
+            max_time_ms=self._max_time_ms(deadline)
+        )
+        return doc["neighbours"] if doc else []
+
+    def _write(self, collection, neighbours: Iterable[Tuple[str, List[Dict[str, Any]]]]) -> int:
+        written = 0
+        batch = []
+        updated_at = datetime.now(timezone.utc)
+        for product_id, product_neighbours in neighbours:
+            batch.append(ReplaceOne(
+                {"_id": product_id},
+                {"_id": product_id, "neighbours": product_neighbours, "updatedAt": updated_at},
+                upsert=True
+            ))
+            if len(batch) >= self.batch_size:
+                collection.bulk_write(batch, ordered=False)
+                written += len(batch)
+                batch = []
+        if batch:
+            collection.bulk_write(batch, ordered=False)
+            written += len(batch)
+        return written
+
+    def replace_neighbours(self, neighbours: Iterable[Tuple[str, List[Dict[str, Any]]]]) -> int:
+        """
+        Replace every product's neighbours. They are written to a staging collection, which
+        then replaces product_neighbours in a single rename, so readers never see a partial run.
+
+        Args:
+            neighbours (Iterable[Tuple[str, List[Dict[str, Any]]]]): Product IDs and their neighbours.
+
+        Returns:
+            int: The number of products written.
+        """
+        staging = self.database[f"{self.collection_name}_rebuild"]
+        staging.drop()
+        written = self._write(staging, neighbours)
+        if written:
+            staging.rename(self.collection_name, dropTarget=True)
+        else:
+            self.collection.delete_many({})
+        return written
+
+    def merge_neighbours(self, neighbours: Iterable[Tuple[str, List[Dict[str, Any]]]], top_k: int) -> int:
+        """
+        Add co-purchase counts to the stored neighbours, keeping the top_k of each product.
+
+        Args:
+            neighbours (Iterable[Tuple[str, List[Dict[str, Any]]]]): Product IDs and their additional counts.
+            top_k (int): The number of neighbours to keep per product.
+
+        Returns:
+            int: The number of products written.
+        """
+        def merged(batch: List[Tuple[str, List[Dict[str, Any]]]]):
+            stored = {
+                doc["_id"]: doc["neighbours"]
+                for doc in self.collection.find({"_id": {"$in": [product_id for product_id, _ in batch]}})
+            }
+            for product_id, additions in batch:
+                counts: Dict[str, int] = {}
+                for neighbour in stored.get(product_id, []) + additions:
+                    counts[neighbour["productId"]] = counts.get(neighbour["productId"], 0) + neighbour["count"]
+                top = sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:top_k]
+                yield product_id, [{"productId": neighbour, "count": count} for neighbour, count in top]
+
+        written = 0
+        batch = []
+        for item in neighbours:
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                written += self._write(self.collection, merged(batch))
+                batch = []
+        if batch:
+            written += self._write(self.collection, merged(batch))
+        return written
+
+    def get_last_counted_order_id(self) -> Optional[Any]:
+        """
+        Get the _id of the last order counted by the co-purchase job, None if it never ran.
+        """
+        doc = self.database.job_runs.find_one({"_id": "co_purchase"})
+        return doc["lastOrderId"] if doc else None
+
+    def set_last_counted_order_id(self, order_id: Any) -> None:
+        self.database.job_runs.update_one(
+            {"_id": "co_purchase"},
+            {"$set": {"lastOrderId": order_id, "finishedAt": datetime.now(timezone.utc)}},
+            upsert=True
+        )
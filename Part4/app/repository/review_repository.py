@@ -0,0 +1,153 @@
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, MongoClient, ReplaceOne, ReturnDocument
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.bson_codec import from_bson, to_bson
+from app.core.deadline import Deadline
+from app.models.review import ReviewModel
+from app.repository.base_repository import BaseRepository
+
+
+class ReviewConflict(Exception):
+    """
+    Raised when a review cannot be added because the product kept changing concurrently.
+    """
+
+
+class ReviewRepository(BaseRepository):
+    """
+    ReviewRepository stores product reviews with the subset pattern: the most recent
+    reviews are embedded in the product, newest first, and older ones are moved to the
+    reviews collection. The product also keeps reviewCount, ratingTotal and rating, so the
+    rating is maintained without ever rescanning reviews.
+    """
+    def __init__(self, mongo: MongoClient):
+        self._mongo = mongo
+        super().__init__(mongo)
+
+    def ensure_indexes(self) -> List[str]:
+        """
+        Create the index that review pages of the archive are read with.
+
+        Returns:
+            List[str]: The index names.
+        """
+        return [self.database.reviews.create_index([("productId", ASCENDING), ("_id", DESCENDING)])]
+
+    def _archive(self, product_id: ObjectId, reviews: List[Dict[str, Any]]) -> None:
+        requests = []
+        for review in reviews:
+            document = {key: value for key, value in review.items() if key != "reviewId"}
+            requests.append(ReplaceOne(
+                {"_id": review["reviewId"]},
+                {"_id": review["reviewId"], "productId": product_id, **document},
+                upsert=True
+            ))
+        self.database.reviews.bulk_write(requests, ordered=False)
+
+    def add_review(self, product_id: str, review: ReviewModel, embedded_limit: int, retries: int) -> Optional[Dict[str, Any]]:
+        """
+        Add a review to a product and update its rating in a single atomic update.
+
+        The update is conditional on reviewCount being unchanged since the product was read
+        (optimistic concurrency), and is retried if another review got in first. Reviews that
+        no longer fit in the embedded slice are archived before the update, so a failure
+        leaves them in both places, where reads skip the archived copy, rather than in neither.
+        Products rated before ratingTotal was kept get it backfilled from rating and reviewCount.
+
+        Args:
+            product_id (str): The ID of the reviewed product.
+            review (ReviewModel): The new review.
+            embedded_limit (int): How many reviews the product embeds.
+            retries (int): How many times to try the conditional update.
+
+        Returns:
+            Optional[Dict[str, Any]]: The updated product document, None if the product does not exist.
+
+        Raises:
+            ReviewConflict: If every try lost to a concurrent review.
+        """
+        _id = ObjectId(product_id)
+        document = to_bson(review)
+        for _ in range(retries):
+            product = self.database.products.find_one(
+                {"_id": _id},
+                {"reviews": 1, "reviewCount": 1, "ratingTotal": 1, "rating": 1}
+            )
+            if product is None:
+                return None
+            embedded = product.get("reviews") or []
+            review_count = product.get("reviewCount") or 0
+            rating_total = product.get("ratingTotal")
+            backfilled = rating_total is None
+            if backfilled:
+                rating_total = (product.get("rating") or 0) * review_count
+
+            if len(embedded) >= embedded_limit:
+                newest_first = sorted(embedded + [document], key=lambda item: item["reviewId"], reverse=True)
+                self._archive(_id, newest_first[embedded_limit:])
+
+            rating = round((rating_total + review.stars) / (review_count + 1), 2)
+            totals: Dict[str, Any] = {"ratingTotal": rating_total + review.stars} if backfilled else {}
+            updated = self.database.products.find_one_and_update(
+                {"_id": _id, "reviewCount": review_count if review_count else {"$in": [0, None]}},
+                {
+                    "$push": {"reviews": {"$each": [document], "$sort": {"reviewId": -1}, "$slice": embedded_limit}},
+                    "$inc": {"reviewCount": 1, **({} if backfilled else {"ratingTotal": review.stars})},
+                    "$set": {"rating": rating, **totals},
+                    "$currentDate": {"lastUpdatedAt": {"$type": "timestamp"}},
+                },
+                return_document=ReturnDocument.AFTER
+            )
+            if updated is not None:
+                return updated
+        raise ReviewConflict(f"Product {product_id} changed concurrently {retries} times")
+
+    def get_reviews(
+        self,
+        product_id: str,
+        cursor: Optional[ObjectId] = None,
+        limit: int = 10,
+        deadline: Optional[Deadline] = None
+    ) -> Optional[Tuple[List[ReviewModel], bool]]:
+        """
+        Retrieve a page of a product's reviews, newest first.
+        The page is taken from the embedded reviews first, and only falls through to the
+        reviews collection once the embedded ones are exhausted.
+
+        Args:
+            product_id (str): The ID of the product.
+            cursor (Optional[ObjectId]): The reviewId of the last review of the previous page.
+            limit (int): The page size.
+            deadline (Optional[Deadline]): The deadline of the current request, if any.
+
+        Returns:
+            Optional[Tuple[List[ReviewModel], bool]]: The reviews and whether there are more,
+            None if the product does not exist.
+        """
+        _id = ObjectId(product_id)
+        product = self.database.products.find_one(
+            {"_id": _id},
+            {"reviews": 1, "reviewCount": 1},
+            max_time_ms=self._max_time_ms(deadline)
+        )
+        if product is None:
+            return None
+        embedded = product.get("reviews") or []
+        # One more than the page size tells whether there is a next page
+        page = [review for review in embedded if cursor is None or review["reviewId"] < cursor][:limit + 1]
+
+        archived_count = (product.get("reviewCount") or 0) - len(embedded)
+        if len(page) <= limit and archived_count > 0:
+            # Archived reviews are all older than the embedded ones
+            upper_bound = embedded[-1]["reviewId"] if embedded else None
+            if cursor is not None and (upper_bound is None or cursor < upper_bound):
+                upper_bound = cursor
+            query: Dict[str, Any] = {"productId": _id}
+            if upper_bound is not None:
+                query["_id"] = {"$lt": upper_bound}
+            archived = self.database.reviews.find(query, max_time_ms=self._max_time_ms(deadline)) \
+                .sort("_id", DESCENDING).limit(limit + 1 - len(page))
+            page += [{**review, "reviewId": review["_id"]} for review in archived]
+
+        return [from_bson(ReviewModel, review) for review in page[:limit]], len(page) > limit
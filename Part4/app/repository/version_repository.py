@@ -0,0 +1,82 @@
+from pymongo import MongoClient, ReturnDocument
+from typing import Iterable, List, Optional
+
+from app.core.deadline import Deadline
+from app.repository.base_repository import BaseRepository
+
+def listing_version_name(collection: str, category: Optional[str] = None) -> str:
+    """
+    Get the name of the version that a listing depends on.
+    Listings filtered by category only depend on that category, so writes to
+    other categories do not invalidate them.
+
+    Args:
+        collection (str): The listed collection, e.g. "products".
+        category (Optional[str]): The category filter of the listing, if any.
+
+    Returns:
+        str: The version name, e.g. "products" or "products:category:phones".
+    """
+    if category:
+        return f"{collection}:category:{category}"
+    return collection
+
+
+class VersionRepository(BaseRepository):
+    """
+    VersionRepository keeps a change counter per collection in the collection_versions collection.
+    Every write to a collection bumps its version, so readers can tell whether anything
+    changed with a single lookup by _id instead of re-running their query.
+    """
+    def __init__(self, mongo: MongoClient):
+        self._mongo = mongo
+        super().__init__(mongo)
+
+    def get_version(self, name: str, deadline: Optional[Deadline] = None) -> int:
+        """
+        Get the current version of a collection.
+
+        Args:
+            name (str): The name of the versioned collection, e.g. "products".
+            deadline (Optional[Deadline]): The deadline of the current request, if any.
+
+        Returns:
+            int: The current version, 0 if the collection was never written to.
+        """
+        doc = self.database.collection_versions.find_one(
+            {"_id": name},
+            max_time_ms=self._max_time_ms(deadline)
+        )
+        return doc["version"] if doc else 0
+
+    def bump(self, name: str) -> int:
+        """
+        Increment the version of a collection after a write.
+
+        Args:
+            name (str): The name of the versioned collection, e.g. "orders".
+
+        Returns:
+            int: The new version.
+        """
+        doc = self.database.collection_versions.find_one_and_update(
+            {"_id": name},
+            {"$inc": {"version": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return doc["version"]
+
+    def bump_products(self, categories: Iterable[str] = ()) -> List[int]:
+        """
+        Increment the versions that product listings depend on after a product write:
+        the products collection and every category the product was or is in.
+
+        Args:
+            categories (Iterable[str]): The old and new categories of the written product.
+
+        Returns:
+            List[int]: The new versions, the collection version first.
+        """
+        names = ["products"] + [listing_version_name("products", category) for category in set(categories)]
+        return [self.bump(name) for name in names]
\ No newline at end of file
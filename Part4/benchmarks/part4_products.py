@@ -0,0 +1,108 @@
+"""
+Benchmark of the Part4 products endpoint strategies, "facet" and "concurrent",
+across collection sizes and page depths.
+
+Each size is loaded into a scratch database (dropped afterwards unless --keep), with
+the same indexes the application creates at warm-up. Every (strategy, page) pair is run
+--repeat times for one category; "concurrent (cold count)" clears the count cache before
+each run, so it shows the cost without cache hits.
+
+Usage:
+    python -m benchmarks.part4_products [--sizes 10000,100000,1000000] [--pages 1,10,100,1000]
+                                        [--page-size 10] [--repeat 20] [--keep]
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from typing import Awaitable, Callable, Dict, List
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient
+
+from app.core.config import settings
+from app.core.deadline import Deadline
+from app.core.part4_products_query import _count_cache, ensure_indexes, fetch_page_concurrent, fetch_page_facet
+
+CATEGORIES = [f"Category {i}" for i in range(20)]
+BENCH_DATABASE = f"{settings.MONGODB_DATABASE}_bench"
+
+
+def load_products(database, size: int, batch_size: int = 10000) -> None:
+    database.products.drop()
+    rng = random.Random(size)
+    for start in range(0, size, batch_size):
+        database.products.insert_many([
+            {
+                "name": f"Product {rng.randrange(10 ** 9):09d}",
+                "price": round(rng.uniform(1, 1000), 2),
+                "description": "Benchmark product",
+                "category": rng.choice(CATEGORIES),
+                "inventory_count": rng.randrange(1000),
+            }
+            for _ in range(start, min(start + batch_size, size))
+        ], ordered=False)
+    ensure_indexes(database)
+
+
+async def measure(run: Callable[[], Awaitable], repeat: int, before: Callable[[], None] = lambda: None) -> Dict[str, float]:
+    timings: List[float] = []
+    for _ in range(repeat):
+        before()
+        started_at = time.perf_counter()
+        await run()
+        timings.append((time.perf_counter() - started_at) * 1000)
+    timings.sort()
+    return {
+        "median": statistics.median(timings),
+        "p95": timings[max(0, int(len(timings) * 0.95) - 1)],
+    }
+
+
+async def benchmark(args) -> None:
+    sync_client = MongoClient(settings.MONGODB_URL)
+    client = AsyncIOMotorClient(settings.MONGODB_URL)
+    database = sync_client[BENCH_DATABASE]
+    collection = client[BENCH_DATABASE].products
+    category = CATEGORIES[0]
+    try:
+        print(f"{'size':>10} {'page':>6} {'strategy':<26} {'median ms':>10} {'p95 ms':>10}")
+        for size in args.sizes:
+            load_products(database, size)
+            for page in args.pages:
+                runs = {
+                    "facet": (lambda: fetch_page_facet(collection, category, page, args.page_size, Deadline(600000)),
+                              lambda: None),
+                    "concurrent": (lambda: fetch_page_concurrent(collection, category, page, args.page_size, Deadline(600000)),
+                                   lambda: None),
+                    "concurrent (cold count)": (lambda: fetch_page_concurrent(collection, category, page, args.page_size, Deadline(600000)),
+                                                _count_cache.clear),
+                }
+                for strategy, (run, before) in runs.items():
+                    # One untimed run, so every strategy starts with the same warm working set
+                    await run()
+                    result = await measure(run, args.repeat, before)
+                    print(f"{size:>10} {page:>6} {strategy:<26} {result['median']:>10.2f} {result['p95']:>10.2f}")
+    finally:
+        if not args.keep:
+            sync_client.drop_database(BENCH_DATABASE)
+        client.close()
+        sync_client.close()
+
+
+def main():
+    def int_list(value: str) -> List[int]:
+        return [int(item) for item in value.split(",")]
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int_list, default=[10000, 100000, 1000000])
+    parser.add_argument("--pages", type=int_list, default=[1, 10, 100, 1000])
+    parser.add_argument("--page-size", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch database")
+    asyncio.run(benchmark(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@ from fastapi.testclient import TestClient
 from unittest.mock import MagicMock, patch
 from app.core.product_service import get_product_by_id, list_products
 from app.main import app
+from app.models.catalog_product import CatalogProductModel
 from app.models.product import ProductModel
 from app.core.product_list_query import ProductListResponse
 from app.core.database import get_mongodb
@@ -13,10 +14,10 @@ client = TestClient(app)
 def mock_product_list_response():
     return ProductListResponse(
         data=[
-            ProductModel(
+            CatalogProductModel(
                 _id="682cbe0431d6a6922c7cf38f",
                 name="Test Product",
-                description="A test product",
+                shortDescription="A test product",
                 inventoryCount=10,
                 createdAt="2024-01-01T00:00:00Z"
             )
@@ -52,7 +53,7 @@ def test_read_products_success():
     assert "data" in data
     assert isinstance(data["data"], list)
     assert data["data"][0]["name"] == "Test Product"
-    assert data["data"][0]["description"] == "A test product"
+    assert data["data"][0]["shortDescription"] == "A test product"
     assert data["data"][0]["inventoryCount"] == 10
     assert data["data"][0]["createdAt"] == "2024-01-01T00:00:00Z"
     assert data["meta"]["pagination"]["total"] == 1
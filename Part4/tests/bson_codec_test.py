@@ -0,0 +1,81 @@
+from bson import ObjectId, Timestamp
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+from app.core.bson_codec import from_bson, to_bson
+from app.core.config import settings
+from app.migrations.string_dates_to_bson import migrate
+from app.models.order import OrderModel, ShippingAddressModel
+from app.models.product import ProductModel
+from app.repository.order_repository import OrderRepository
+
+def make_order():
+    return OrderModel(
+        customerId="777cbe0431d6a6922c7cf38f",
+        orderItems=[
+            {
+                "productId": "123456",
+                "productName": "Test Product",
+                "quantity": 2,
+                "unitPrice": 50.0,
+                "totalPrice": 100.0
+            }
+        ],
+        subtotal=100.0,
+        tax=10.0,
+        shipping_cost=0.0,
+        total=110.0,
+        status="pending",
+        shipping_address=ShippingAddressModel(
+            customerName="John Doe",
+            addressLine1="123 Main St",
+            city="New York",
+            country="USA"
+        ),
+        createdAt="2024-01-01T00:00:00Z"
+    )
+
+def test_to_bson_keeps_native_types():
+    document = to_bson(make_order())
+    assert isinstance(document["_id"], ObjectId)
+    assert document["customerId"] == ObjectId("777cbe0431d6a6922c7cf38f")
+    assert document["createdAt"] == datetime(2024, 1, 1, tzinfo=timezone.utc)
+    assert document["orderItems"][0]["productId"] == "123456"
+
+def test_timestamps_round_trip():
+    product = ProductModel(
+        _id="682cbe0431d6a6922c7cf38f",
+        name="Test Product",
+        description="A test product",
+        inventoryCount=10,
+        createdAt="2024-01-01T00:00:00Z",
+        lastUpdatedAt=Timestamp(1717200000, 3)
+    )
+    document = to_bson(product)
+    assert document["lastUpdatedAt"] == Timestamp(1717200000, 3)
+    assert from_bson(ProductModel, document) == product
+    # JSON still gets strings and {t, i}
+    assert product.model_dump(mode="json", by_alias=True)["_id"] == "682cbe0431d6a6922c7cf38f"
+    assert product.model_dump(mode="json")["lastUpdatedAt"] == {"t": 1717200000, "i": 3}
+
+def test_create_new_order_writes_native_bson():
+    mongo_client = MagicMock()
+    orders = mongo_client[settings.MONGODB_DATABASE].orders
+    orders.find_one.side_effect = lambda query: inserted[0]
+    inserted = []
+    orders.insert_one.side_effect = lambda document: inserted.append(document) or MagicMock(inserted_id=document["_id"])
+
+    created = OrderRepository(mongo_client).create_new_order(make_order())
+    assert isinstance(inserted[0]["_id"], ObjectId)
+    assert isinstance(inserted[0]["customerId"], ObjectId)
+    assert isinstance(inserted[0]["createdAt"], datetime)
+    assert str(created.id) == str(inserted[0]["_id"])
+
+def test_migration_converts_string_dates_on_the_server():
+    database = MagicMock()
+    database.__getitem__.return_value.update_many.return_value.modified_count = 2
+    results = migrate(database)
+    assert results["orders.createdAt"] == 2
+    query, pipeline = database.__getitem__.return_value.update_many.call_args_list[0].args
+    assert query == {"createdAt": {"$type": "string"}}
+    assert pipeline == [{"$set": {"createdAt": {"$dateFromString": {"dateString": "$createdAt"}}}}]
+    database.orders.create_index.assert_called_once()
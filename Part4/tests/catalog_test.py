@@ -0,0 +1,137 @@
+from bson import ObjectId, Timestamp
+from datetime import datetime
+from unittest.mock import MagicMock
+from pymongo.errors import DuplicateKeyError
+from app.core.catalog_projection import catalog_projector
+from app.core.config import settings
+from app.core.product_events import product_events
+from app.repository.catalog_repository import CatalogRepository, project_catalog
+
+def product(product_id, **fields):
+    return {
+        "_id": product_id,
+        "name": "Test Product",
+        "description": "Not in the catalog",
+        "images": ["not-in-the-catalog.png"],
+        "inventoryCount": 10,
+        "createdAt": datetime(2024, 1, 1),
+        **fields,
+    }
+
+def test_project_catalog_keeps_only_listing_fields():
+    product_id = ObjectId()
+    document = project_catalog(product(product_id, price=9.5, rating=4.5, reviewCount=2))
+    assert document == {
+        "_id": product_id,
+        "name": "Test Product",
+        "inventoryCount": 10,
+        "createdAt": datetime(2024, 1, 1),
+        "price": 9.5,
+        "rating": 4.5,
+        "reviewCount": 2,
+    }
+
+def test_product_changes_are_projected_onto_the_catalog():
+    mongo_client = MagicMock()
+    database = mongo_client[settings.MONGODB_DATABASE]
+    catalog = database.product_catalog
+    catalog.find_one_and_replace.return_value = {"categories": ["phones"]}
+    catalog.find_one_and_delete.return_value = {"categories": ["tablets"]}
+    database.collection_versions.find_one_and_update.return_value = {"version": 1}
+    catalog_projector.bind(mongo_client)
+
+    def bumped():
+        names = [call.args[0]["_id"] for call in database.collection_versions.find_one_and_update.call_args_list]
+        database.collection_versions.find_one_and_update.reset_mock()
+        return sorted(names)
+
+    try:
+        product_id = ObjectId()
+        product_events.publish_upsert(product(product_id, categories=["tablets"],
+                                              lastUpdatedAt=Timestamp(1717200000, 1)))
+        query, document = catalog.find_one_and_replace.call_args.args
+        assert query["_id"] == product_id
+        # An older change does not overwrite a newer catalog document
+        assert query["$or"][0] == {"lastUpdatedAt": {"$lte": Timestamp(1717200000, 1)}}
+        assert "description" not in document
+        assert catalog.find_one_and_replace.call_args.kwargs["upsert"]
+        # Listings of the old and the new category are invalidated
+        assert bumped() == ["products", "products:category:phones", "products:category:tablets"]
+
+        catalog.find_one_and_replace.side_effect = DuplicateKeyError("E11000")
+        product_events.publish_upsert(product(product_id, lastUpdatedAt=Timestamp(1717100000, 1)))
+        assert bumped() == []
+
+        product_events.publish_delete(str(product_id))
+        assert catalog.find_one_and_delete.call_args.args == ({"_id": product_id},)
+        assert bumped() == ["products", "products:category:tablets"]
+    finally:
+        catalog_projector.bind(None)
+
+def test_check_consistency_reports_and_repairs_drift():
+    ids = sorted(ObjectId() for _ in range(4))
+    products = [product(ids[0]), product(ids[1]), product(ids[2], price=5.0)]
+    entries = [project_catalog(products[0]), project_catalog(product(ids[2], price=4.0)), project_catalog(product(ids[3]))]
+
+    mongo_client = MagicMock()
+    database = mongo_client[settings.MONGODB_DATABASE]
+    database.products.find.return_value.sort.return_value = iter(products)
+    database.product_catalog.find.return_value.sort.return_value = iter(entries)
+
+    report = CatalogRepository(mongo_client).check_consistency(repair=True)
+    assert report["checked"] == 3
+    assert report["samples"] == {"missing": [str(ids[1])], "stale": [str(ids[2])], "orphaned": [str(ids[3])]}
+    assert database.product_catalog.replace_one.call_count == 2
+    assert database.product_catalog.find_one_and_delete.call_args.args == ({"_id": ids[3]},)
+
+def test_listings_read_products_until_the_catalog_is_current(monkeypatch):
+    mongo_client = MagicMock()
+    database = mongo_client[settings.MONGODB_DATABASE]
+    repository = CatalogRepository(mongo_client)
+    database.products.find.return_value.skip.return_value.limit.return_value = [product(ObjectId())]
+    database.products.count_documents.return_value = 1
+
+    products, total = repository.get_all(from_products=True)
+    assert total == 1 and products[0].name == "Test Product"
+    # Only the catalog fields are read from the products
+    assert set(database.products.find.call_args.args[1]) == {"name", "shortDescription", "thumbnails", "categories",
+        "tags", "price", "inventoryCount", "rating", "reviewCount", "createdAt", "lastUpdatedAt"}
+    database.product_catalog.find.assert_not_called()
+
+    monkeypatch.setattr(product_events, "watching", False)
+    assert not catalog_projector.current
+
+def test_sync_backfills_a_stale_catalog():
+    mongo_client = MagicMock()
+    database = mongo_client[settings.MONGODB_DATABASE]
+    catalog = database.product_catalog
+    changed_id = ObjectId()
+    catalog_projector.synced = False
+    catalog_projector.bind(mongo_client)
+    try:
+        # Up to date: same count, and the most recent update is in the catalog
+        database.products.estimated_document_count.return_value = 2
+        catalog.estimated_document_count.return_value = 2
+        database.products.find_one.return_value = {"_id": changed_id, "lastUpdatedAt": datetime(2024, 2, 1)}
+        catalog.find_one.return_value = {"_id": changed_id, "lastUpdatedAt": datetime(2024, 2, 1)}
+        assert catalog_projector.sync(mongo_client) == 0
+        database.products.aggregate.assert_not_called()
+        assert catalog_projector.synced
+
+        # Empty: rebuilt, and a product changed during the rebuild is projected again
+        catalog.estimated_document_count.return_value = 0
+        database["product_catalog_rebuild"].estimated_document_count.return_value = 2
+
+        def rebuild(pipeline):
+            catalog_projector.on_upsert(product(changed_id, categories=["phones"]))
+
+        database.products.aggregate.side_effect = rebuild
+        database.products.find.return_value = [product(changed_id, categories=["tablets"])]
+        catalog.distinct.return_value = ["phones", "tablets"]
+        assert catalog_projector.sync(mongo_client) == 2
+        assert database.products.find.call_args.args == ({"_id": {"$in": [changed_id]}},)
+        assert catalog.find_one_and_replace.call_args.args[1]["categories"] == ["tablets"]
+        bumped = {call.args[0]["_id"] for call in database.collection_versions.find_one_and_update.call_args_list}
+        assert {"products", "products:category:phones", "products:category:tablets"} <= bumped
+    finally:
+        catalog_projector.bind(None)
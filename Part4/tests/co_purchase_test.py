@@ -0,0 +1,95 @@
+import random
+from collections import Counter
+from itertools import permutations
+
+from bson import ObjectId
+from fastapi.testclient import TestClient
+from unittest.mock import MagicMock
+from app.main import app
+from app.core.co_purchase import CoPurchaseCounter, run_co_purchase_job
+from app.core.config import settings
+from app.core.dependencies import _get_mongo_client
+
+client = TestClient(app)
+
+ORDERS = [
+    {"_id": ObjectId(), "orderItems": [{"productId": "a"}, {"productId": "b"}, {"productId": "c"}]},
+    {"_id": ObjectId(), "orderItems": [{"productId": "a"}, {"productId": "b"}, {"productId": "b"}]},
+    {"_id": ObjectId(), "orderItems": [{"productId": "c"}]},
+    {"_id": ObjectId(), "orderItems": [{"productId": "b"}, {"productId": "d"}]},
+]
+
+def test_counter_keeps_top_neighbours(tmp_path):
+    counter = CoPurchaseCounter(str(tmp_path), memory_budget_bytes=10 ** 6, partitions=4, max_items_per_order=50)
+    for order in ORDERS:
+        counter.add(item["productId"] for item in order["orderItems"])
+    neighbours = dict(counter.top_neighbours(top_k=2))
+    assert counter.orders == 4
+    assert neighbours["b"] == [{"productId": "a", "count": 2}, {"productId": "c", "count": 1}]
+    assert neighbours["d"] == [{"productId": "b", "count": 1}]
+    assert "e" not in neighbours
+    assert list(tmp_path.iterdir()) == []
+
+def test_counter_matches_exact_counts_when_spilling_and_splitting(tmp_path):
+    rng = random.Random(7)
+    orders = [rng.sample(range(200), rng.randint(1, 6)) for _ in range(2000)]
+    expected = Counter(pair for order in orders for pair in permutations(map(str, order), 2))
+    # A budget of a few hundred pairs forces many flushes and re-splits of the partitions
+    counter = CoPurchaseCounter(str(tmp_path), memory_budget_bytes=20000, partitions=2, max_items_per_order=50)
+    for order in orders:
+        counter.add(order)
+    products = set()
+    for product_id, neighbours in counter.top_neighbours(top_k=3):
+        products.add(product_id)
+        counts = sorted((count for (product, _), count in expected.items() if product == product_id), reverse=True)
+        assert [neighbour["count"] for neighbour in neighbours] == counts[:3]
+        assert all(expected[(product_id, neighbour["productId"])] == neighbour["count"] for neighbour in neighbours)
+    assert products == {product for product, _ in expected}
+
+def test_full_run_replaces_neighbours_through_staging():
+    mongo_client = MagicMock()
+    database = mongo_client[settings.MONGODB_DATABASE]
+    database.job_runs.find_one.return_value = None
+    database.orders.find.return_value.sort.return_value = ORDERS
+    report = run_co_purchase_job(mongo_client)
+    assert report == {"full": True, "orders": 4, "products": 4}
+    staging = database["product_neighbours_rebuild"]
+    staging.rename.assert_called_once_with("product_neighbours", dropTarget=True)
+    database.job_runs.update_one.assert_called_once()
+    assert database.job_runs.update_one.call_args[0][1]["$set"]["lastOrderId"] == ORDERS[-1]["_id"]
+
+def test_incremental_run_merges_new_orders():
+    mongo_client = MagicMock()
+    database = mongo_client[settings.MONGODB_DATABASE]
+    database.job_runs.find_one.return_value = {"_id": "co_purchase", "lastOrderId": ORDERS[0]["_id"]}
+    database.orders.find.return_value.sort.return_value = ORDERS[1:2]
+    database.product_neighbours.find.return_value = [
+        {"_id": "a", "neighbours": [{"productId": "c", "count": 1}, {"productId": "b", "count": 1}]}
+    ]
+    report = run_co_purchase_job(mongo_client)
+    assert report == {"full": False, "orders": 1, "products": 2}
+    assert database.orders.find.call_args[0][0] == {"_id": {"$gt": ORDERS[0]["_id"]}}
+    writes = {
+        request._filter["_id"]: request._doc["neighbours"]
+        for request in database.product_neighbours.bulk_write.call_args[0][0]
+    }
+    assert writes["a"] == [{"productId": "b", "count": 2}, {"productId": "c", "count": 1}]
+    assert writes["b"] == [{"productId": "a", "count": 1}]
+
+def test_read_frequently_bought_together():
+    product_id = str(ObjectId())
+    mongo_client = MagicMock()
+    mongo_client[settings.MONGODB_DATABASE].product_neighbours.find_one.return_value = {
+        "_id": product_id, "neighbours": [{"productId": "a", "count": 3}]
+    }
+    app.dependency_overrides[_get_mongo_client] = lambda: mongo_client
+    response = client.get(f"/api/v1/products/{product_id}/frequently-bought-together", params={"limit": 5})
+    assert response.status_code == 200
+    assert response.json() == {"data": [{"productId": "a", "count": 3}]}
+    query, projection = mongo_client[settings.MONGODB_DATABASE].product_neighbours.find_one.call_args[0]
+    assert query == {"_id": product_id} and projection == {"neighbours": {"$slice": 5}}
+
+    mongo_client[settings.MONGODB_DATABASE].product_neighbours.find_one.return_value = None
+    response = client.get(f"/api/v1/products/{product_id}/frequently-bought-together")
+    assert response.json() == {"data": []}
+    app.dependency_overrides = {}
@@ -0,0 +1,142 @@
+from bson import ObjectId, Timestamp
+from datetime import datetime
+from fastapi.testclient import TestClient
+from unittest.mock import MagicMock
+from app.main import app
+from app.core.catalog_projection import catalog_projector
+from app.core.config import settings
+from app.core.dependencies import _get_mongo_client
+from app.core.product_events import product_events
+from app.core.product_service import product_cache, product_list_cache
+
+client = TestClient(app)
+
+PRODUCT_ID = "682cbe0431d6a6922c7cf38f"
+
+def mock_mongo_client(last_updated_at=Timestamp(1717200000, 3)):
+    product_list_cache.local.clear()
+    product_cache.clear()
+    mongo_client = MagicMock()
+    database = mongo_client[settings.MONGODB_DATABASE]
+    product = {
+        "_id": ObjectId(PRODUCT_ID),
+        "name": "Test Product",
+        "description": "A test product",
+        "inventoryCount": 10,
+        "createdAt": datetime(2024, 1, 1),
+    }
+    if last_updated_at is not None:
+        product["lastUpdatedAt"] = last_updated_at
+
+    def find_one(query, projection=None, **kwargs):
+        if projection:
+            return {key: value for key, value in product.items() if key == "_id" or key in projection}
+        return product
+
+    database.products.find_one.side_effect = find_one
+    database.product_catalog.find.return_value.skip.return_value.limit.return_value = [product]
+    database.product_catalog.count_documents.return_value = 1
+    database.collection_versions.find_one.return_value = {"_id": "products", "version": 7}
+    return mongo_client
+
+def test_read_product_returns_strong_etag_and_cache_control():
+    app.dependency_overrides[_get_mongo_client] = mock_mongo_client
+    response = client.get(f"/api/v1/products/{PRODUCT_ID}")
+    assert response.status_code == 200
+    assert not response.headers["ETag"].startswith("W/")
+    assert response.headers["Last-Modified"] == "Sat, 01 Jun 2024 00:00:00 GMT"
+    assert response.headers["Cache-Control"] == settings.CACHE_CONTROL_POLICIES["get_product_by_id"]
+    app.dependency_overrides = {}
+
+def test_read_product_not_modified_without_loading_document():
+    mongo_client = mock_mongo_client()
+    app.dependency_overrides[_get_mongo_client] = lambda: mongo_client
+    etag = client.get(f"/api/v1/products/{PRODUCT_ID}").headers["ETag"]
+    products = mongo_client[settings.MONGODB_DATABASE].products
+    products.find_one.reset_mock()
+    # As on another instance, which does not have the product cached
+    product_cache.clear()
+
+    response = client.get(f"/api/v1/products/{PRODUCT_ID}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+    # Only the projected lastUpdatedAt lookup was issued
+    assert products.find_one.call_count == 1
+    assert products.find_one.call_args.args[1] == {"lastUpdatedAt": 1}
+    app.dependency_overrides = {}
+
+def test_read_product_content_hash_etag_without_last_updated_at():
+    app.dependency_overrides[_get_mongo_client] = lambda: mock_mongo_client(last_updated_at=None)
+    etag = client.get(f"/api/v1/products/{PRODUCT_ID}").headers["ETag"]
+    response = client.get(f"/api/v1/products/{PRODUCT_ID}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert "Last-Modified" not in response.headers
+    app.dependency_overrides = {}
+
+def test_read_products_not_modified_without_querying():
+    mongo_client = mock_mongo_client()
+    app.dependency_overrides[_get_mongo_client] = lambda: mongo_client
+    first = client.get("/api/v1/products?category=phones")
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert etag.startswith("W/")
+
+    catalog = mongo_client[settings.MONGODB_DATABASE].product_catalog
+    catalog.find.reset_mock()
+    response = client.get("/api/v1/products?category=phones", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    catalog.find.assert_not_called()
+
+    # A write bumps the collection version, which changes the ETag
+    mongo_client[settings.MONGODB_DATABASE].collection_versions.find_one.return_value = {"_id": "products", "version": 8}
+    response = client.get("/api/v1/products?category=phones", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    app.dependency_overrides = {}
+
+def test_read_products_etag_follows_the_page_while_the_change_stream_is_not_watched(monkeypatch):
+    monkeypatch.setattr(product_events, "watching", False)
+    mongo_client = mock_mongo_client()
+    products = mongo_client[settings.MONGODB_DATABASE].products
+    products.find.return_value.skip.return_value.limit.return_value = [products.find_one({"_id": ObjectId(PRODUCT_ID)})]
+    products.count_documents.return_value = 1
+    app.dependency_overrides[_get_mongo_client] = lambda: mongo_client
+    etag = client.get("/api/v1/products?category=phones").headers["ETag"]
+    response = client.get("/api/v1/products?category=phones", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    # A write by another process does not bump the version, but changes the page
+    products.find.return_value.skip.return_value.limit.return_value = []
+    products.count_documents.return_value = 0
+    response = client.get("/api/v1/products?category=phones", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    app.dependency_overrides = {}
+
+def test_product_change_event_changes_listing_etag():
+    mongo_client = mock_mongo_client()
+    database = mongo_client[settings.MONGODB_DATABASE]
+    versions = {}
+
+    def bump(query, update, **kwargs):
+        versions[query["_id"]] = versions.get(query["_id"], 0) + 1
+        return {"version": versions[query["_id"]]}
+
+    database.collection_versions.find_one.side_effect = \
+        lambda query, **kwargs: {"version": versions[query["_id"]]} if query["_id"] in versions else None
+    database.collection_versions.find_one_and_update.side_effect = bump
+    database.product_catalog.find_one_and_replace.return_value = {"categories": ["phones"]}
+    app.dependency_overrides[_get_mongo_client] = lambda: mongo_client
+    catalog_projector.bind(mongo_client)
+    try:
+        etag = client.get("/api/v1/products?category=phones").headers["ETag"]
+        # A write by another process, delivered by the change stream watcher
+        product_events.publish_upsert({"_id": ObjectId(PRODUCT_ID), "name": "Renamed", "categories": ["phones"],
+                                       "lastUpdatedAt": Timestamp(1717300000, 1)})
+        response = client.get("/api/v1/products?category=phones", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+    finally:
+        catalog_projector.bind(None)
+        app.dependency_overrides = {}
@@ -0,0 +1,17 @@
+import pytest
+from app.core.catalog_projection import catalog_projector
+from app.core.config import settings
+from app.core.product_events import product_events
+
+
+@pytest.fixture(autouse=True)
+def similarity_snapshot_path(tmp_path, monkeypatch):
+    # Keep index snapshots written by warm-ups and builds out of the working tree
+    monkeypatch.setattr(settings, "SIMILARITY_SNAPSHOT_PATH", str(tmp_path / "similarity_index.npz"))
+
+
+@pytest.fixture(autouse=True)
+def current_catalog(monkeypatch):
+    # Listings are served from the catalog, as once it is backfilled and the change stream is watched
+    monkeypatch.setattr(catalog_projector, "synced", True)
+    monkeypatch.setattr(product_events, "watching", True)
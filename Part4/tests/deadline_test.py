@@ -0,0 +1,63 @@
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import MagicMock
+from pymongo.errors import ExecutionTimeout
+from app.main import app
+from app.core.config import settings
+from app.core.deadline import Deadline, DeadlineExceeded, resolve_budget_ms
+from app.core.dependencies import _get_mongo_client
+from app.core.product_service import product_list_cache
+from app.core.metrics import metrics
+
+client = TestClient(app)
+
+def mock_mongo_client():
+    product_list_cache.local.clear()
+    mongo_client = MagicMock()
+    catalog = mongo_client[settings.MONGODB_DATABASE].product_catalog
+    catalog.find.return_value.sort.return_value = catalog.find.return_value
+    catalog.find.return_value.skip.return_value.limit.return_value = []
+    catalog.count_documents.return_value = 0
+    mongo_client[settings.MONGODB_DATABASE].collection_versions.find_one.return_value = None
+    return mongo_client
+
+def test_resolve_budget_ms_uses_route_budget_and_header_override():
+    assert resolve_budget_ms("list_products") == settings.DEADLINE_ROUTE_BUDGETS_MS["list_products"]
+    assert resolve_budget_ms("unknown_route") == settings.DEADLINE_DEFAULT_MS
+    assert resolve_budget_ms("list_products", "150") == 150
+    assert resolve_budget_ms("list_products", str(settings.DEADLINE_MAX_MS * 10)) == settings.DEADLINE_MAX_MS
+
+def test_deadline_expires():
+    deadline = Deadline(0)
+    assert deadline.expired
+    with pytest.raises(DeadlineExceeded):
+        deadline.max_time_ms
+
+def test_list_products_passes_max_time_ms():
+    mongo_client = mock_mongo_client()
+    app.dependency_overrides[_get_mongo_client] = lambda: mongo_client
+    response = client.get("/api/v1/products", headers={settings.DEADLINE_HEADER: "500"})
+    assert response.status_code == 200
+    catalog = mongo_client[settings.MONGODB_DATABASE].product_catalog
+    max_time_ms = catalog.find.call_args.kwargs["max_time_ms"]
+    assert 0 < max_time_ms <= 500
+    assert 0 < catalog.count_documents.call_args.kwargs["maxTimeMS"] <= 500
+    app.dependency_overrides = {}
+
+def test_list_products_deadline_exceeded_is_counted():
+    metrics.reset()
+    mongo_client = mock_mongo_client()
+    mongo_client[settings.MONGODB_DATABASE].product_catalog.find.side_effect = ExecutionTimeout("operation exceeded time limit")
+    app.dependency_overrides[_get_mongo_client] = lambda: mongo_client
+    response = client.get("/api/v1/products")
+    assert response.status_code == 504
+    assert response.json()["detail"] == "Deadline exceeded"
+    assert metrics.get("deadline_exceeded", "list_products") == 1
+    assert metrics.get("errors", "list_products") == 0
+    app.dependency_overrides = {}
+
+def test_invalid_deadline_header():
+    app.dependency_overrides[_get_mongo_client] = mock_mongo_client
+    response = client.get("/api/v1/products", headers={settings.DEADLINE_HEADER: "soon"})
+    assert response.status_code == 400
+    app.dependency_overrides = {}
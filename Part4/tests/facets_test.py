@@ -0,0 +1,119 @@
+import threading
+from bson import ObjectId
+from fastapi.testclient import TestClient
+from unittest.mock import MagicMock
+from app.main import app
+from app.core.config import settings
+from app.core.dependencies import _get_mongo_client
+from app.core.facet_index import FacetIndex, facet_index
+from app.core.product_events import product_events
+from tests.single_flight_test import wait_until
+
+client = TestClient(app)
+
+PRODUCTS = [
+    {"_id": ObjectId(), "categories": ["phones"], "tags": ["sale", "new"], "price": 99.0},
+    {"_id": ObjectId(), "categories": ["phones"], "tags": ["sale"], "price": 499.0},
+    {"_id": ObjectId(), "categories": ["laptops"], "tags": ["new"], "price": 1299.0},
+    {"_id": ObjectId(), "categories": ["laptops", "phones"], "tags": [], "price": None},
+]
+
+def counts(facet):
+    return {item["value"]: item["count"] for item in facet}
+
+def mock_mongo_client():
+    facet_index.rebuild([])
+    facet_index.built = False
+    mongo_client = MagicMock()
+    mongo_client[settings.MONGODB_DATABASE].products.find.return_value = PRODUCTS
+    return mongo_client
+
+def test_read_facets_builds_index_on_first_use():
+    mongo_client = mock_mongo_client()
+    app.dependency_overrides[_get_mongo_client] = lambda: mongo_client
+    response = client.get("/api/v1/products/facets")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == 4
+    assert counts(data["categories"]) == {"phones": 3, "laptops": 2}
+    assert counts(data["tags"]) == {"sale": 2, "new": 2}
+    buckets = {bucket["min"]: bucket["count"] for bucket in data["priceBuckets"]}
+    assert buckets[50] == 1 and buckets[250] == 1 and buckets[1000] == 1
+    assert data["priceBuckets"][-1]["max"] is None
+
+    client.get("/api/v1/products/facets")
+    assert mongo_client[settings.MONGODB_DATABASE].products.find.call_count == 1
+    app.dependency_overrides = {}
+
+def test_read_facets_is_unavailable_while_the_index_builds():
+    mongo_client = mock_mongo_client()
+    release = threading.Event()
+
+    def find(*args, **kwargs):
+        release.wait(5)
+        return PRODUCTS
+
+    mongo_client[settings.MONGODB_DATABASE].products.find.side_effect = find
+    app.dependency_overrides[_get_mongo_client] = lambda: mongo_client
+    response = client.get("/api/v1/products/facets", headers={settings.DEADLINE_HEADER: "50"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(settings.INDEX_RETRY_AFTER_SECONDS)
+
+    release.set()
+    wait_until(lambda: facet_index.built)
+    assert client.get("/api/v1/products/facets").json()["total"] == 4
+    assert mongo_client[settings.MONGODB_DATABASE].products.find.call_count == 1
+    app.dependency_overrides = {}
+
+def test_read_facets_with_filter():
+    mongo_client = mock_mongo_client()
+    app.dependency_overrides[_get_mongo_client] = lambda: mongo_client
+    response = client.get("/api/v1/products/facets", params={"category": "phones", "tags": "sale", "maxPrice": 400})
+    data = response.json()
+    assert data["total"] == 1
+    assert counts(data["tags"]) == {"sale": 1, "new": 1}
+    app.dependency_overrides = {}
+
+def test_facets_follow_product_changes():
+    mongo_client = mock_mongo_client()
+    app.dependency_overrides[_get_mongo_client] = lambda: mongo_client
+    client.get("/api/v1/products/facets")
+
+    product_events.publish_upsert({**PRODUCTS[0], "categories": ["tablets"], "price": 30.0})
+    product_events.publish_delete(str(PRODUCTS[2]["_id"]))
+    data = client.get("/api/v1/products/facets").json()
+    assert data["total"] == 3
+    assert counts(data["categories"]) == {"phones": 2, "tablets": 1, "laptops": 1}
+    assert counts(data["tags"]) == {"sale": 2, "new": 1}
+
+    response = client.post("/api/v1/products/facets/rebuild")
+    assert response.json() == {"indexed": 4}
+    assert counts(client.get("/api/v1/products/facets").json()["categories"]) == {"phones": 3, "laptops": 2}
+    app.dependency_overrides = {}
+
+def test_filtered_counts_match_after_compaction():
+    index = FacetIndex([0, 100])
+    index.rebuild([])
+    product_id = ObjectId()
+    for price in range(3000):
+        index.upsert({"_id": product_id, "categories": ["c"], "tags": ["t"], "price": float(price % 200)})
+    assert index._alive.size < 3000
+    facets = index.facets(category="c", min_price=100)
+    assert facets["total"] == 1
+    assert [bucket["count"] for bucket in facets["priceBuckets"]] == [0, 1]
+
+def test_changes_during_a_rebuild_are_kept():
+    index = FacetIndex([0, 100])
+    added = {"_id": ObjectId(), "categories": ["tablets"], "tags": [], "price": 10.0}
+
+    def scan():
+        yield PRODUCTS[0]
+        # Applied while the scan runs, after it read the first product and before it reads the second
+        index.upsert(dict(PRODUCTS[0], categories=["laptops"]))
+        index.remove(str(PRODUCTS[1]["_id"]))
+        index.upsert(added)
+        yield from PRODUCTS[1:]
+
+    assert index.rebuild(scan()) == 4
+    data = index.facets()
+    assert counts(data["categories"]) == {"laptops": 3, "phones": 1, "tablets": 1}
@@ -0,0 +1,75 @@
+import pytest
+from bson import ObjectId
+from datetime import datetime, timezone
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from unittest.mock import MagicMock
+from app.main import app
+from app.core.config import settings
+from app.core.dependencies import _get_mongo_client
+from app.core.filter_query import ORDER_FILTERS, PRODUCT_FILTERS, compile_filter, merge_filters, parse_filters
+from app.core.product_service import product_list_cache
+
+client = TestClient(app)
+
+def test_parse_filters_coerces_values_from_the_model():
+    query = parse_filters(PRODUCT_FILTERS, [
+        ("filter[price][$gte]", "100"),
+        ("filter[price][$lt]", "200.5"),
+        ("filter[tags][$in]", "sale,new"),
+        ("filter[createdAt][$lt]", "2024-01-01T00:00:00Z"),
+        ("filter[categories]", "phones"),
+        ("pagination[page]", "2"),
+    ])
+    assert query == {
+        "price": {"$gte": 100.0, "$lt": 200.5},
+        "tags": {"$in": ["sale", "new"]},
+        "createdAt": {"$lt": datetime(2024, 1, 1, tzinfo=timezone.utc)},
+        "categories": {"$eq": "phones"},
+    }
+
+def test_parse_filters_converts_object_ids():
+    query = parse_filters(ORDER_FILTERS, [("filter[customerId][$in]", "777cbe0431d6a6922c7cf38f")])
+    assert query == {"customerId": {"$in": [ObjectId("777cbe0431d6a6922c7cf38f")]}}
+
+@pytest.mark.parametrize("params", [
+    [("filter[description]", "x")],
+    [("filter[price][$regex]", "1")],
+    [("filter[price][$gte]", "cheap")],
+    [("filter[price]]", "1")],
+    [("filter[price][$gte]", "1"), ("filter[price][$gte]", "2")],
+])
+def test_parse_filters_rejects_invalid_filters(params):
+    with pytest.raises(HTTPException) as error:
+        parse_filters(PRODUCT_FILTERS, params)
+    assert error.value.status_code == 400
+
+def test_plans_are_cached_by_shape():
+    compile_filter.cache_clear()
+    parse_filters(PRODUCT_FILTERS, [("filter[price][$gte]", "1")])
+    parse_filters(PRODUCT_FILTERS, [("filter[price][$gte]", "2")])
+    info = compile_filter.cache_info()
+    assert info.misses == 1
+    assert info.hits == 1
+
+def test_merge_filters():
+    assert merge_filters({"a": 1}, {}) == {"a": 1}
+    assert merge_filters({"a": 1}, {"b": 2}) == {"a": 1, "b": 2}
+    assert merge_filters({"a": 1}, {"a": {"$ne": 2}}) == {"$and": [{"a": 1}, {"a": {"$ne": 2}}]}
+
+def test_list_products_applies_filters():
+    product_list_cache.local.clear()
+    mongo_client = MagicMock()
+    database = mongo_client[settings.MONGODB_DATABASE]
+    database.product_catalog.find.return_value.skip.return_value.limit.return_value = []
+    database.product_catalog.count_documents.return_value = 0
+    database.collection_versions.find_one.return_value = None
+    app.dependency_overrides[_get_mongo_client] = lambda: mongo_client
+
+    response = client.get("/api/v1/products?category=phones&filter[price][$gte]=100")
+    assert response.status_code == 200
+    assert database.product_catalog.find.call_args.args[0] == {"categories": "phones", "price": {"$gte": 100.0}}
+
+    response = client.get("/api/v1/products?filter[secret]=1")
+    assert response.status_code == 400
+    app.dependency_overrides = {}
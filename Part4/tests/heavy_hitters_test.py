@@ -0,0 +1,92 @@
+from bson import Timestamp
+from fastapi.testclient import TestClient
+from app.main import app
+from app.core.config import settings
+from app.core.dependencies import _get_mongo_client
+from app.core.heavy_hitters import CountMinSketch, HeavyHitters, SpaceSaving, tiny_lfu_admission
+from app.core.product_events import product_events
+from app.core.product_service import product_cache, product_cache_key
+from app.core.response_cache import InProcessCache
+from tests.conditional_test import PRODUCT_ID, mock_mongo_client
+
+client = TestClient(app)
+
+def test_count_min_sketch_estimates_and_ages():
+    sketch = CountMinSketch(width=1024, depth=4, sample_size=1000)
+    for _ in range(100):
+        sketch.add("hot")
+    sketch.add("cold")
+    assert sketch.estimate("hot") >= 100
+    assert sketch.estimate("cold") >= 1
+    assert sketch.estimate("never") <= 1
+    for i in range(899):
+        sketch.add(f"tail-{i}")
+    # The 1000th addition halved every counter
+    assert 50 <= sketch.estimate("hot") < 100
+
+def test_space_saving_keeps_heavy_hitters():
+    top = SpaceSaving(capacity=3)
+    for i in range(100):
+        top.add("hot")
+        top.add(f"tail-{i}")
+    keys = [item["key"] for item in top.top(1)]
+    assert keys == ["hot"]
+    assert top.top(1)[0]["count"] >= 100
+
+def test_tiny_lfu_admission_rejects_one_off_keys():
+    tracker = HeavyHitters("test", width=1024, depth=4, sample_size=10000, top_capacity=10)
+    cache = InProcessCache(max_entries=1, ttl_seconds=60, admission=tiny_lfu_admission(tracker))
+    for _ in range(5):
+        tracker.record("hot")
+    assert cache.set("hot", b"1")
+    tracker.record("one-off")
+    assert not cache.set("one-off", b"2")
+    assert cache.get("hot") == b"1"
+    for _ in range(10):
+        tracker.record("new-hot")
+    assert cache.set("new-hot", b"3")
+    assert cache.get("hot") is None
+
+def test_product_cache_serves_until_the_product_changes():
+    mongo_client = mock_mongo_client()
+    app.dependency_overrides[_get_mongo_client] = lambda: mongo_client
+    products = mongo_client[settings.MONGODB_DATABASE].products
+    assert client.get(f"/api/v1/products/{PRODUCT_ID}").status_code == 200
+    assert client.get(f"/api/v1/products/{PRODUCT_ID}").status_code == 200
+    assert products.find_one.call_count == 1
+    assert product_cache.get(product_cache_key(PRODUCT_ID)) is not None
+
+    product_events.publish_delete(PRODUCT_ID)
+    assert client.get(f"/api/v1/products/{PRODUCT_ID}").status_code == 200
+    assert products.find_one.call_count == 2
+    app.dependency_overrides = {}
+
+def test_product_cache_revalidates_hits_without_the_change_stream(monkeypatch):
+    monkeypatch.setattr(product_events, "watching", False)
+    mongo_client = mock_mongo_client()
+    app.dependency_overrides[_get_mongo_client] = lambda: mongo_client
+    products = mongo_client[settings.MONGODB_DATABASE].products
+    first = client.get(f"/api/v1/products/{PRODUCT_ID}")
+    assert client.get(f"/api/v1/products/{PRODUCT_ID}").headers["ETag"] == first.headers["ETag"]
+    # The hit only fetched lastUpdatedAt
+    assert products.find_one.call_args.args[1] == {"lastUpdatedAt": 1}
+
+    # Updated by another process, without an event
+    products.find_one({})["lastUpdatedAt"] = Timestamp(1717300000, 1)
+    response = client.get(f"/api/v1/products/{PRODUCT_ID}")
+    assert response.headers["ETag"] != first.headers["ETag"]
+    assert product_cache.get(product_cache_key(PRODUCT_ID)).etag == response.headers["ETag"]
+    app.dependency_overrides = {}
+
+def test_read_hot_keys():
+    mongo_client = mock_mongo_client()
+    app.dependency_overrides[_get_mongo_client] = lambda: mongo_client
+    for _ in range(3):
+        client.get(f"/api/v1/products/{PRODUCT_ID}")
+    response = client.get("/api/v1/debug/hot-keys?limit=5")
+    assert response.status_code == 200
+    data = response.json()
+    assert set(data) >= {"get_product_by_id", "list_products"}
+    top = {item["key"]: item["count"] for item in data["get_product_by_id"]}
+    assert top[product_cache_key(PRODUCT_ID)] >= 3
+    app.dependency_overrides = {}
@@ -0,0 +1,85 @@
+import socketserver
+import threading
+import time
+
+
+class _RespHandler(socketserver.StreamRequestHandler):
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        count = int(line[1:-2])
+        args = []
+        for _ in range(count):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def handle(self):
+        while True:
+            args = self._read_command()
+            if args is None:
+                return
+            self.wfile.write(self.server.dispatch(args))
+
+
+class RespStandIn(socketserver.ThreadingTCPServer):
+    """
+    A local stand-in for a Redis server, implementing just the commands the app uses.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _RespHandler)
+        self.data = {}
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address
+        return f"redis://{host}:{port}/0"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+    def _get(self, key):
+        value = self.data.get(key)
+        if value is None:
+            return None
+        payload, expires_at = value
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.data[key]
+            return None
+        return payload
+
+    def dispatch(self, args) -> bytes:
+        command = args[0].upper()
+        with self.lock:
+            if command == b"PING":
+                return b"+PONG\r\n"
+            if command == b"SELECT":
+                return b"+OK\r\n"
+            if command == b"GET":
+                value = self._get(args[1])
+                return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+            if command == b"SET":
+                expires_at = None
+                if len(args) >= 5 and args[3].upper() == b"PX":
+                    expires_at = time.monotonic() + int(args[4]) / 1000
+                self.data[args[1]] = (args[2], expires_at)
+                return b"+OK\r\n"
+            if command == b"INCR":
+                value = int(self._get(args[1]) or 0) + 1
+                self.data[args[1]] = (str(value).encode(), None)
+                return b":%d\r\n" % value
+            if command == b"DEL":
+                removed = sum(1 for key in args[1:] if self.data.pop(key, None) is not None)
+                return b":%d\r\n" % removed
+        return b"-ERR unknown command\r\n"
@@ -0,0 +1,102 @@
+import time
+from fastapi.testclient import TestClient
+from unittest.mock import MagicMock
+from app.main import app
+from app.core.config import settings
+from app.core.dependencies import _get_mongo_client
+from app.core.metrics import metrics
+from app.core.product_events import product_events
+from app.core.product_service import product_list_cache
+from app.core.resp_client import RespClient
+from app.core.response_cache import InProcessCache, ResponseCache, SharedCache
+from tests.resp_stand_in import RespStandIn
+
+client = TestClient(app)
+
+def mock_mongo_client():
+    product_list_cache.local.clear()
+    mongo_client = MagicMock()
+    database = mongo_client[settings.MONGODB_DATABASE]
+    database.product_catalog.find.return_value.skip.return_value.limit.return_value = []
+    database.product_catalog.count_documents.return_value = 0
+    database.collection_versions.find_one.return_value = {"_id": "products:category:phones", "version": 1}
+    return mongo_client
+
+def test_in_process_cache_evicts_least_recently_used():
+    cache = InProcessCache(max_entries=2, ttl_seconds=60)
+    cache.set("a", b"1")
+    cache.set("b", b"2")
+    cache.get("a")
+    cache.set("c", b"3")
+    assert cache.get("a") == b"1"
+    assert cache.get("b") is None
+    assert cache.get("c") == b"3"
+
+def test_in_process_cache_expires_entries():
+    cache = InProcessCache(max_entries=2, ttl_seconds=0.01)
+    cache.set("a", b"1")
+    time.sleep(0.02)
+    assert cache.get("a") is None
+
+def test_shared_tier_is_shared_between_instances():
+    with RespStandIn() as server:
+        first = ResponseCache("test_shared_a", InProcessCache(10, 60), SharedCache(RespClient.from_url(server.url), 60))
+        second = ResponseCache("test_shared_b", InProcessCache(10, 60), SharedCache(RespClient.from_url(server.url), 60))
+        first.set("1:key", b'{"data":[]}')
+        assert second.get("1:key") == b'{"data":[]}'
+        # Populated into the local tier on a shared hit
+        assert second.local.get("1:key") == b'{"data":[]}'
+        assert second.get("2:key") is None
+
+def test_unavailable_shared_tier_is_a_miss(capsys):
+    with RespStandIn() as server:
+        url = server.url
+    shared = SharedCache(RespClient.from_url(url), 60)
+    shared.client = MagicMock(wraps=shared.client)
+    cache = ResponseCache("test_unavailable", InProcessCache(10, 60), shared)
+    cache.set("1:key", b"{}")
+    cache.local.clear()
+    assert cache.get("1:key") is None
+    # After the first failure the server is not tried again until the backoff is over
+    assert shared.client.set.call_count == 1
+    assert shared.client.get.call_count == 0
+    assert metrics.get("response_cache_skipped", "shared") >= 1
+    assert capsys.readouterr().out.count("Shared response cache") == 1
+
+    shared._skip_until = 0.0
+    assert cache.get("1:key") is None
+    assert shared.client.get.call_count == 1
+
+def test_list_products_is_served_from_cache_until_a_write():
+    mongo_client = mock_mongo_client()
+    app.dependency_overrides[_get_mongo_client] = lambda: mongo_client
+    database = mongo_client[settings.MONGODB_DATABASE]
+
+    first = client.get("/api/v1/products?category=phones")
+    second = client.get("/api/v1/products?category=phones")
+    assert first.status_code == second.status_code == 200
+    assert first.content == second.content
+    assert database.product_catalog.find.call_count == 1
+    # Only the category version is read, not the collection version
+    assert database.collection_versions.find_one.call_args.args[0] == {"_id": "products:category:phones"}
+
+    database.collection_versions.find_one.return_value = {"_id": "products:category:phones", "version": 2}
+    client.get("/api/v1/products?category=phones")
+    assert database.product_catalog.find.call_count == 2
+    app.dependency_overrides = {}
+
+def test_list_products_is_not_cached_while_the_change_stream_is_not_watched(monkeypatch):
+    monkeypatch.setattr(product_events, "watching", False)
+    mongo_client = mock_mongo_client()
+    app.dependency_overrides[_get_mongo_client] = lambda: mongo_client
+    database = mongo_client[settings.MONGODB_DATABASE]
+    database.products.find.return_value.skip.return_value.limit.return_value = []
+    database.products.count_documents.return_value = 0
+
+    # A write made by another process (e.g. the ETL) does not bump the version
+    for _ in range(2):
+        assert client.get("/api/v1/products?category=phones").status_code == 200
+    assert database.products.find.call_count == 2
+    database.product_catalog.find.assert_not_called()
+    assert len(product_list_cache.local) == 0
+    app.dependency_overrides = {}
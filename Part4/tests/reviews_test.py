@@ -0,0 +1,131 @@
+from bson import ObjectId
+from datetime import datetime, timezone
+from fastapi.testclient import TestClient
+from unittest.mock import MagicMock
+from app.main import app
+from app.core.catalog_projection import catalog_projector
+from app.core.config import settings
+from app.core.dependencies import _get_mongo_client
+
+client = TestClient(app)
+
+PRODUCT_ID = "682cbe0431d6a6922c7cf38f"
+
+def review(review_id, stars=4):
+    return {
+        "reviewId": review_id,
+        "reviewAuthor": "Giuseppe",
+        "stars": stars,
+        "reviewText": "Awesome product",
+        "createdAt": datetime(2024, 1, 1, tzinfo=timezone.utc),
+    }
+
+def mock_mongo_client(embedded, review_count, rating_total=0, **fields):
+    mongo_client = MagicMock()
+    database = mongo_client[settings.MONGODB_DATABASE]
+    database.products.find_one.return_value = {
+        "_id": ObjectId(PRODUCT_ID),
+        "reviews": embedded,
+        "reviewCount": review_count,
+        "ratingTotal": rating_total,
+        **fields,
+    }
+    database.products.find_one_and_update.return_value = {"_id": ObjectId(PRODUCT_ID), "categories": ["phones"]}
+    database.collection_versions.find_one_and_update.return_value = {"version": 1}
+    return mongo_client
+
+def test_create_review_updates_rating_and_archives_overflow(monkeypatch):
+    monkeypatch.setattr(settings, "REVIEWS_EMBEDDED_LIMIT", 2)
+    older, newer = sorted([ObjectId(), ObjectId()])
+    mongo_client = mock_mongo_client([review(newer), review(older)], review_count=12, rating_total=48)
+    app.dependency_overrides[_get_mongo_client] = lambda: mongo_client
+    database = mongo_client[settings.MONGODB_DATABASE]
+    database.product_catalog.find_one_and_replace.return_value = {"categories": ["phones"]}
+    catalog_projector.bind(mongo_client)
+
+    response = client.post(f"/api/v1/products/{PRODUCT_ID}/reviews",
+                           json={"reviewAuthor": "Lam", "stars": 5, "reviewText": "Great"})
+    catalog_projector.bind(None)
+    assert response.status_code == 201
+    assert response.json()["stars"] == 5
+
+    # The oldest embedded review is moved to the archive
+    (archived,), _ = database.reviews.bulk_write.call_args
+    assert [request._filter["_id"] for request in archived] == [older]
+
+    query, update = database.products.find_one_and_update.call_args.args
+    assert query["reviewCount"] == 12
+    assert update["$inc"] == {"reviewCount": 1, "ratingTotal": 5}
+    assert update["$set"] == {"rating": round(53 / 13, 2)}
+    assert update["$push"]["reviews"]["$slice"] == 2
+    # Listing pages show the rating, so their versions are bumped once the catalog is updated
+    assert database.product_catalog.find_one_and_replace.call_args.args[1]["categories"] == ["phones"]
+    bumped = [call.args[0]["_id"] for call in database.collection_versions.find_one_and_update.call_args_list]
+    assert bumped == ["products", "products:category:phones"]
+    app.dependency_overrides = {}
+
+def test_create_review_backfills_missing_rating_total():
+    mongo_client = mock_mongo_client([], review_count=4, rating=4.5)
+    del mongo_client[settings.MONGODB_DATABASE].products.find_one.return_value["ratingTotal"]
+    app.dependency_overrides[_get_mongo_client] = lambda: mongo_client
+
+    response = client.post(f"/api/v1/products/{PRODUCT_ID}/reviews",
+                           json={"reviewAuthor": "Lam", "stars": 2, "reviewText": "Meh"})
+    assert response.status_code == 201
+    _, update = mongo_client[settings.MONGODB_DATABASE].products.find_one_and_update.call_args.args
+    assert update["$inc"] == {"reviewCount": 1}
+    assert update["$set"] == {"rating": 4.0, "ratingTotal": 20.0}
+    app.dependency_overrides = {}
+
+def test_create_review_conflict():
+    mongo_client = mock_mongo_client([], review_count=0)
+    mongo_client[settings.MONGODB_DATABASE].products.find_one_and_update.return_value = None
+    app.dependency_overrides[_get_mongo_client] = lambda: mongo_client
+    response = client.post(f"/api/v1/products/{PRODUCT_ID}/reviews", json={"reviewAuthor": "Lam", "stars": 3})
+    assert response.status_code == 409
+    assert mongo_client[settings.MONGODB_DATABASE].products.find_one_and_update.call_count == settings.REVIEW_WRITE_RETRIES
+    app.dependency_overrides = {}
+
+def test_list_reviews_reads_embedded_then_archive():
+    ids = sorted(ObjectId() for _ in range(5))
+    mongo_client = mock_mongo_client([review(ids[4]), review(ids[3])], review_count=5)
+    reviews = mongo_client[settings.MONGODB_DATABASE].reviews
+    reviews.find.return_value.sort.return_value.limit.return_value = [
+        {"_id": review_id, **{key: value for key, value in review(review_id).items() if key != "reviewId"}}
+        for review_id in (ids[2], ids[1])
+    ]
+    app.dependency_overrides[_get_mongo_client] = lambda: mongo_client
+
+    response = client.get(f"/api/v1/products/{PRODUCT_ID}/reviews?limit=3")
+    assert response.status_code == 200
+    data = response.json()
+    assert [item["reviewId"] for item in data["data"]] == [str(ids[4]), str(ids[3]), str(ids[2])]
+    assert data["meta"]["pagination"]["nextCursor"] == str(ids[2])
+    query = reviews.find.call_args.args[0]
+    assert query == {"productId": ObjectId(PRODUCT_ID), "_id": {"$lt": ids[3]}}
+    assert reviews.find.return_value.sort.return_value.limit.call_args.args[0] == 2
+
+    reviews.find.return_value.sort.return_value.limit.return_value = [
+        {"_id": ids[1], **{key: value for key, value in review(ids[1]).items() if key != "reviewId"}}
+    ]
+    data = client.get(f"/api/v1/products/{PRODUCT_ID}/reviews?limit=3&cursor={ids[2]}").json()
+    assert [item["reviewId"] for item in data["data"]] == [str(ids[1])]
+    assert data["meta"]["pagination"]["nextCursor"] is None
+    assert reviews.find.call_args.args[0]["_id"] == {"$lt": ids[2]}
+    app.dependency_overrides = {}
+
+def test_list_reviews_does_not_query_archive_when_all_are_embedded():
+    mongo_client = mock_mongo_client([review(ObjectId())], review_count=1)
+    app.dependency_overrides[_get_mongo_client] = lambda: mongo_client
+    data = client.get(f"/api/v1/products/{PRODUCT_ID}/reviews").json()
+    assert len(data["data"]) == 1
+    mongo_client[settings.MONGODB_DATABASE].reviews.find.assert_not_called()
+    app.dependency_overrides = {}
+
+def test_list_reviews_product_not_found():
+    mongo_client = MagicMock()
+    mongo_client[settings.MONGODB_DATABASE].products.find_one.return_value = None
+    app.dependency_overrides[_get_mongo_client] = lambda: mongo_client
+    assert client.get(f"/api/v1/products/{PRODUCT_ID}/reviews").status_code == 404
+    assert client.get(f"/api/v1/products/{PRODUCT_ID}/reviews?cursor=nope").status_code == 400
+    app.dependency_overrides = {}
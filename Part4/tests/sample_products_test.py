@@ -0,0 +1,62 @@
+from contextlib import asynccontextmanager
+from fastapi.testclient import TestClient
+from unittest.mock import AsyncMock, MagicMock
+from app.main import app
+from app.core.metrics import metrics
+from app.core.mongodb_connection import MongoDBConnection
+from app.core.part4_products_query import CATEGORY_COLLATION, _count_cache
+
+client = TestClient(app)
+
+PRODUCTS = [{"_id": "682cbe0431d6a6922c7cf38f", "name": "Test Product", "category": "Phones"}]
+
+def mock_collection(monkeypatch):
+    _count_cache.clear()
+    collection = MagicMock()
+    cursor = collection.find.return_value.sort.return_value.skip.return_value.limit.return_value
+    cursor.to_list = AsyncMock(return_value=[dict(product) for product in PRODUCTS])
+    collection.count_documents = AsyncMock(return_value=31)
+    collection.aggregate.return_value.to_list = AsyncMock(
+        return_value=[{"metadata": [{"totalCount": 31}], "data": [dict(product) for product in PRODUCTS]}]
+    )
+
+    @asynccontextmanager
+    async def get_collection(db_name, collection_name):
+        yield collection
+
+    monkeypatch.setattr(MongoDBConnection, "get_collection", get_collection)
+    return collection
+
+def test_concurrent_strategy_uses_equality_match_and_caches_count(monkeypatch):
+    collection = mock_collection(monkeypatch)
+    metrics.reset()
+    params = {"category": "phones", "strategy": "concurrent", "pagination[page]": 3}
+    response = client.get("/api/v1/part4/products", params=params)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["meta"]["pagination"]["total"] == 31
+    assert data["meta"]["pagination"]["pageCount"] == 4
+    assert data["products"][0]["name"] == "Test Product"
+
+    query = collection.find.call_args.args[0]
+    assert query == {"category": "phones"}
+    assert collection.find.call_args.kwargs["collation"] == CATEGORY_COLLATION
+    collection.find.return_value.sort.return_value.skip.assert_called_with(20)
+    collection.aggregate.assert_not_called()
+
+    client.get("/api/v1/part4/products", params={**params, "category": "PHONES"})
+    assert collection.count_documents.await_count == 1
+    assert metrics.get("part4_count_cache", "hits") == 1
+
+def test_facet_strategy_is_the_default(monkeypatch):
+    collection = mock_collection(monkeypatch)
+    response = client.get("/api/v1/part4/products", params={"category": "phones"})
+    assert response.status_code == 200
+    assert response.json()["meta"]["pagination"]["total"] == 31
+    pipeline = collection.aggregate.call_args.args[0]
+    assert pipeline[0]["$match"]["category"]["$regex"] == "phones"
+    collection.find.assert_not_called()
+
+def test_unknown_strategy_is_rejected(monkeypatch):
+    mock_collection(monkeypatch)
+    assert client.get("/api/v1/part4/products", params={"strategy": "magic"}).status_code == 422
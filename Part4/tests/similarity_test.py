@@ -0,0 +1,125 @@
+import threading
+import numpy as np
+from bson import ObjectId
+from fastapi.testclient import TestClient
+from unittest.mock import MagicMock
+from app.main import app
+from app.core.config import settings
+from app.core.dependencies import _get_mongo_client
+from app.core.product_events import product_events
+from app.core.similarity_index import SimilarityIndex, product_features, similarity_index
+from tests.single_flight_test import wait_until
+
+client = TestClient(app)
+
+PRODUCTS = [
+    {"_id": ObjectId(), "categories": ["Phones"], "tags": ["android", "5g", "oled"]},
+    {"_id": ObjectId(), "categories": ["phones"], "tags": ["android", "5g", "OLED", "dual-sim"]},
+    {"_id": ObjectId(), "categories": ["phones"], "tags": ["ios", "5g"]},
+    {"_id": ObjectId(), "categories": ["kitchen"], "tags": ["knife"]},
+    {"_id": ObjectId(), "categories": [], "tags": []},
+]
+
+def product_ids(similar):
+    return [item["productId"] for item in similar]
+
+def test_minhash_estimates_jaccard():
+    index = SimilarityIndex(num_perm=256, bands=64)
+    first = frozenset(f"tag:{i}" for i in range(60))
+    second = frozenset(f"tag:{i}" for i in range(30, 90))
+    signatures = index.signatures([first, second])
+    assert abs(np.mean(signatures[0] == signatures[1]) - 1 / 3) < 0.1
+
+def test_similar_ranks_candidates_by_jaccard():
+    index = SimilarityIndex()
+    index.rebuild(PRODUCTS)
+    similar = index.similar(str(PRODUCTS[0]["_id"]))
+    assert product_ids(similar)[0] == str(PRODUCTS[1]["_id"])
+    assert similar[0]["score"] == 0.8
+    assert str(PRODUCTS[3]["_id"]) not in product_ids(similar)
+    assert index.similar(str(PRODUCTS[4]["_id"])) is None
+    assert product_features(PRODUCTS[1]) == {"category:phones", "tag:android", "tag:5g", "tag:oled", "tag:dual-sim"}
+
+def test_similar_follows_product_changes():
+    index = SimilarityIndex()
+    index.rebuild(PRODUCTS)
+    knife_id, new_id = str(PRODUCTS[3]["_id"]), ObjectId()
+    index.upsert({"_id": new_id, "categories": ["kitchen"], "tags": ["knife"]})
+    assert product_ids(index.similar(knife_id)) == [str(new_id)]
+    index.upsert({"_id": new_id, "categories": ["garden"], "tags": ["hose"]})
+    assert index.similar(knife_id) == []
+    index.remove(str(new_id))
+    assert index.similar(str(new_id)) is None
+    assert len(index) == 4
+
+def test_snapshot_round_trip_and_reconcile(tmp_path):
+    path = str(tmp_path / "snapshot.npz")
+    index = SimilarityIndex()
+    index.rebuild(PRODUCTS)
+    assert index.save(path) == 4 and index.changes == 0
+
+    loaded = SimilarityIndex()
+    assert loaded.load(path) == 4 and not loaded.built
+    assert loaded.similar(str(PRODUCTS[0]["_id"])) == index.similar(str(PRODUCTS[0]["_id"]))
+    # Reconciling drops products no longer in the collection and only re-signs changed ones
+    loaded.rebuild(PRODUCTS[:2] + [{**PRODUCTS[2], "tags": ["android", "5g", "oled"]}])
+    assert len(loaded) == 3 and loaded.changes == 2
+    assert loaded.similar(str(PRODUCTS[2]["_id"]))[0]["score"] == 1.0
+
+    assert SimilarityIndex(num_perm=32, bands=8).load(path) == 0
+
+def test_read_similar_products_builds_and_saves_index():
+    similarity_index.rebuild([])
+    similarity_index.built = False
+    mongo_client = MagicMock()
+    mongo_client[settings.MONGODB_DATABASE].products.find.return_value = PRODUCTS
+    app.dependency_overrides[_get_mongo_client] = lambda: mongo_client
+    response = client.get(f"/api/v1/products/{PRODUCTS[0]['_id']}/similar", params={"limit": 1})
+    assert response.status_code == 200
+    assert response.json() == {"data": [{"productId": str(PRODUCTS[1]["_id"]), "score": 0.8}]}
+    assert SimilarityIndex().load(settings.SIMILARITY_SNAPSHOT_PATH) == 4
+
+    response = client.get(f"/api/v1/products/{PRODUCTS[4]['_id']}/similar")
+    assert response.status_code == 404
+    app.dependency_overrides = {}
+
+def test_read_similar_products_is_unavailable_while_the_index_builds():
+    similarity_index.rebuild([])
+    similarity_index.built = False
+    release = threading.Event()
+    mongo_client = MagicMock()
+
+    def find(*args, **kwargs):
+        release.wait(5)
+        return PRODUCTS
+
+    mongo_client[settings.MONGODB_DATABASE].products.find.side_effect = find
+    app.dependency_overrides[_get_mongo_client] = lambda: mongo_client
+    response = client.get(f"/api/v1/products/{PRODUCTS[0]['_id']}/similar",
+                          headers={settings.DEADLINE_HEADER: "50"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(settings.INDEX_RETRY_AFTER_SECONDS)
+
+    release.set()
+    wait_until(lambda: similarity_index.built)
+    assert client.get(f"/api/v1/products/{PRODUCTS[0]['_id']}/similar").status_code == 200
+    app.dependency_overrides = {}
+    similarity_index.rebuild([])
+
+def test_rebuild_keeps_changes_made_during_the_scan():
+    index = SimilarityIndex(num_perm=32, bands=8)
+
+    def scan():
+        yield PRODUCTS[0]
+        # Changed after the scan read it
+        index.upsert({**PRODUCTS[0], "tags": PRODUCTS[1]["tags"], "categories": PRODUCTS[1]["categories"]})
+        yield from PRODUCTS[1:]
+
+    index.rebuild(scan())
+    assert index.similar(str(PRODUCTS[0]["_id"]))[0] == {"productId": str(PRODUCTS[1]["_id"]), "score": 1.0}
+
+def test_global_index_subscribed_to_product_events():
+    similarity_index.rebuild(PRODUCTS)
+    product_events.publish_delete(str(PRODUCTS[1]["_id"]))
+    assert str(PRODUCTS[1]["_id"]) not in product_ids(similarity_index.similar(str(PRODUCTS[0]["_id"])))
+    similarity_index.rebuild([])
@@ -0,0 +1,119 @@
+import threading
+import time
+import pytest
+from unittest.mock import MagicMock
+from app.core.deadline import DeadlineExceeded
+from app.core.metrics import metrics
+from app.core.product_service import load_product_page, product_list_cache
+from app.core.single_flight import SingleFlight
+
+def wait_until(condition, timeout=5):
+    expires_at = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < expires_at, "timed out waiting for the condition"
+        time.sleep(0.005)
+
+def test_identical_concurrent_calls_share_one_call():
+    flights = SingleFlight("test_shared")
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def load():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return b'{"data":[]}'
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flights.do("key", load)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flights.do("key", load))) for _ in range(4)]
+    for follower in followers:
+        follower.start()
+    # Wait until every follower has joined the call in flight
+    wait_until(lambda: metrics.get("single_flight_coalesced", "test_shared") == 4)
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert results == [b'{"data":[]}'] * 5
+    assert flights.coalescing_ratio() == pytest.approx(4 / 5)
+    assert metrics.snapshot()["single_flight_coalescing_ratio"]["test_shared"] == pytest.approx(4 / 5)
+
+def test_calls_are_not_cached_after_they_finish():
+    flights = SingleFlight("test_sequential")
+    assert flights.do("key", lambda: 1) == 1
+    assert flights.do("key", lambda: 2) == 2
+
+def test_errors_are_shared_and_not_kept():
+    flights = SingleFlight("test_errors")
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        flights.do("key", fail)
+    assert flights.do("key", lambda: "ok") == "ok"
+
+def test_leader_deadline_is_not_shared_with_followers():
+    flights = SingleFlight("test_leader_deadline")
+    started = threading.Event()
+    release = threading.Event()
+
+    def leader_load():
+        started.set()
+        release.wait(5)
+        raise DeadlineExceeded()
+
+    leader_errors, results = [], []
+
+    def lead():
+        try:
+            flights.do("key", leader_load)
+        except DeadlineExceeded as e:
+            leader_errors.append(e)
+
+    leader = threading.Thread(target=lead)
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flights.do("key", lambda: "ok", timeout=5)))
+                 for _ in range(3)]
+    for follower in followers:
+        follower.start()
+    wait_until(lambda: metrics.get("single_flight_coalesced", "test_leader_deadline") == 3)
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join(5)
+
+    # Only the leader's request fails; the followers run the call again with their own deadlines
+    assert len(leader_errors) == 1
+    assert results == ["ok"] * 3
+    assert metrics.get("single_flight_retries", "test_leader_deadline") >= 1
+
+def test_concurrent_listing_requests_share_one_query():
+    product_list_cache.local.clear()
+    catalog_repository = MagicMock()
+    release = threading.Event()
+
+    def get_all(**kwargs):
+        release.wait(5)
+        return [], 0
+
+    catalog_repository.get_all.side_effect = get_all
+    coalesced = metrics.get("single_flight_coalesced", "products")
+    bodies = []
+    requests = [threading.Thread(target=lambda: bodies.append(
+        load_product_page(catalog_repository, "1:single-flight-test", {}, None, 1, 10))) for _ in range(5)]
+    for request in requests:
+        request.start()
+    wait_until(lambda: metrics.get("single_flight_coalesced", "products") - coalesced == 4)
+    release.set()
+    for request in requests:
+        request.join(5)
+
+    assert catalog_repository.get_all.call_count == 1
+    assert len(bodies) == 5 and len(set(bodies)) == 1
+    product_list_cache.local.clear()
@@ -0,0 +1,148 @@
+import threading
+from bson import ObjectId
+from fastapi.testclient import TestClient
+from unittest.mock import MagicMock
+from app.main import app
+from app.core.config import settings
+from app.core.dependencies import _get_mongo_client
+from app.core.product_events import product_events
+from app.core.suggest_index import SuggestIndex, normalize, suggest_index
+from tests.single_flight_test import wait_until
+
+client = TestClient(app)
+
+PRODUCTS = [
+    {"_id": ObjectId(), "name": "Samsung Galaxy S24", "tags": ["phone", "android"], "reviewCount": 10},
+    {"_id": ObjectId(), "name": "Samsonite Suitcase", "tags": ["travel"], "reviewCount": 2},
+    {"_id": ObjectId(), "name": "Crème Brûlée Torch", "tags": ["kitchen"], "reviewCount": 0},
+]
+
+def texts(suggestions):
+    return [suggestion["text"] for suggestion in suggestions]
+
+def mock_mongo_client():
+    suggest_index.rebuild([], {})
+    suggest_index.built = False
+    mongo_client = MagicMock()
+    database = mongo_client[settings.MONGODB_DATABASE]
+    database.products.find.return_value = PRODUCTS
+    database.orders.aggregate.return_value = [{"_id": str(PRODUCTS[1]["_id"]), "quantity": 50}]
+    return mongo_client
+
+def test_read_suggestions_builds_index_on_first_use():
+    mongo_client = mock_mongo_client()
+    app.dependency_overrides[_get_mongo_client] = lambda: mongo_client
+    response = client.get("/api/v1/products/suggest", params={"q": "SAMS"})
+    assert response.status_code == 200
+    data = response.json()["data"]
+    # The suitcase sold more than the phone was reviewed
+    assert texts(data) == ["Samsonite Suitcase", "Samsung Galaxy S24"]
+    assert data[0]["productId"] == str(PRODUCTS[1]["_id"])
+
+    client.get("/api/v1/products/suggest", params={"q": "gal"})
+    assert mongo_client[settings.MONGODB_DATABASE].products.find.call_count == 1
+    app.dependency_overrides = {}
+
+def test_read_suggestions_is_unavailable_while_the_index_builds():
+    mongo_client = mock_mongo_client()
+    release = threading.Event()
+
+    def find(*args, **kwargs):
+        release.wait(5)
+        return PRODUCTS
+
+    mongo_client[settings.MONGODB_DATABASE].products.find.side_effect = find
+    app.dependency_overrides[_get_mongo_client] = lambda: mongo_client
+    response = client.get("/api/v1/products/suggest", params={"q": "sams"}, headers={settings.DEADLINE_HEADER: "50"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(settings.INDEX_RETRY_AFTER_SECONDS)
+
+    release.set()
+    wait_until(lambda: suggest_index.built)
+    assert len(client.get("/api/v1/products/suggest", params={"q": "sams"}).json()["data"]) == 2
+    app.dependency_overrides = {}
+
+def test_read_suggestions_requires_query():
+    mongo_client = mock_mongo_client()
+    app.dependency_overrides[_get_mongo_client] = lambda: mongo_client
+    response = client.get("/api/v1/products/suggest")
+    assert response.status_code == 422
+    app.dependency_overrides = {}
+
+def test_suggest_matches_later_words_tags_and_accents():
+    index = SuggestIndex(memory_budget_bytes=10 ** 7)
+    index.rebuild(PRODUCTS, {})
+    assert texts(index.suggest("galaxy s")) == ["Samsung Galaxy S24"]
+    assert texts(index.suggest("creme")) == ["Crème Brûlée Torch"]
+    assert index.suggest("trav") == [{"type": "tag", "text": "travel", "productId": None, "score": 1.0}]
+    assert normalize("  Crème-Brûlée!  ") == "creme brulee"
+    assert index.suggest("  ") == []
+
+def test_suggest_follows_product_changes():
+    index = SuggestIndex(memory_budget_bytes=10 ** 7)
+    index.rebuild(PRODUCTS, {})
+    product_id = str(PRODUCTS[0]["_id"])
+
+    index.upsert({**PRODUCTS[0], "name": "Pixel 9"})
+    assert index.suggest("samsung") == []
+    assert texts(index.suggest("pix")) == ["Pixel 9"]
+    buds_id = ObjectId()
+    index.upsert({"_id": buds_id, "name": "Pixel Buds", "tags": ["audio"], "reviewCount": 0})
+    assert texts(index.suggest("pix")) == ["Pixel 9", "Pixel Buds"]
+    assert texts(index.suggest("aud")) == ["audio"]
+
+    index.add_sold(str(buds_id), 20)
+    assert texts(index.suggest("pix")) == ["Pixel Buds", "Pixel 9"]
+
+    index.remove(product_id)
+    assert texts(index.suggest("pix")) == ["Pixel Buds"]
+    assert index.suggest("android") == []
+
+def test_suggest_merges_delta_in_background():
+    index = SuggestIndex(memory_budget_bytes=10 ** 7, delta_limit=1)
+    index.rebuild(PRODUCTS, {})
+    index.upsert({**PRODUCTS[0], "name": "Pixel 9"})
+    index.upsert({**PRODUCTS[1], "name": "Pixel Tablet"})
+    index._merge()
+    assert index._dirty == {} and index._delta == []
+    assert texts(index.suggest("pixel")) == ["Pixel 9", "Pixel Tablet"]
+
+def test_sales_are_batched_until_the_next_merge():
+    products = [{"_id": ObjectId(), "name": f"Widget {i}", "tags": [], "reviewCount": i} for i in range(10)]
+    index = SuggestIndex(memory_budget_bytes=10 ** 7, delta_limit=2)
+    index.rebuild(products, {})
+    base = index._base
+    for _ in range(100):
+        index.add_sold(str(products[0]["_id"]), 1)
+    # Only the score changed: the product is neither hidden nor merged
+    assert index._dirty == {} and index._base is base
+    assert index.suggest("widget", 1) == [
+        {"type": "product", "text": "Widget 0", "productId": str(products[0]["_id"]), "score": 100.0}]
+
+    index.add_sold(str(products[1]["_id"]), 1)
+    index._merge()
+    assert index._rescored == {} and index._delta == []
+    assert texts(index.suggest("widget", 2)) == ["Widget 0", "Widget 9"]
+
+def test_suggest_precomputes_large_prefixes():
+    products = [{"_id": ObjectId(), "name": f"Widget {i}", "tags": [], "reviewCount": i} for i in range(300)]
+    index = SuggestIndex(memory_budget_bytes=10 ** 8, heavy_range=64)
+    index.rebuild(products, {})
+    assert "wid" in index._base.heavy
+    assert texts(index.suggest("w", 3)) == ["Widget 299", "Widget 298", "Widget 297"]
+    assert texts(index.suggest("widget 1", 2)) == ["Widget 199", "Widget 198"]
+
+def test_suggest_keeps_most_popular_within_memory_budget():
+    products = [{"_id": ObjectId(), "name": f"Gadget {i}", "tags": [], "reviewCount": i} for i in range(100)]
+    index = SuggestIndex(memory_budget_bytes=30000, max_words=1)
+    index.rebuild(products, {})
+    assert 0 < index.dropped_entries < 100
+    assert index.estimated_bytes <= 30000
+    assert texts(index.suggest("gadget", 1)) == ["Gadget 99"]
+    assert index.suggest("gadget 0") == []
+
+def test_global_index_subscribed_to_product_events():
+    suggest_index.rebuild(PRODUCTS, {})
+    product_events.publish_upsert({**PRODUCTS[2], "name": "Blowtorch"})
+    assert texts(suggest_index.suggest("blow")) == ["Blowtorch"]
+    suggest_index.rebuild([], {})
@@ -0,0 +1,105 @@
+import time
+from bson import ObjectId, Timestamp
+from datetime import datetime
+from fastapi.testclient import TestClient
+from unittest.mock import MagicMock
+from app.main import app
+from app.core.config import settings
+from app.core.dependencies import _get_mongo_client
+from app.core.product_service import product_cache, product_cache_key, product_list_cache
+from app.core.warmup import readiness, run_warmup, start_warmup
+
+client = TestClient(app)
+
+def mock_mongo_client():
+    product_list_cache.local.clear()
+    mongo_client = MagicMock()
+    mongo_client.admin.command.return_value = {"ok": 1.0}
+    database = mongo_client[settings.MONGODB_DATABASE]
+    database.products.aggregate.return_value = [{"_id": "phones", "count": 3}]
+    database.product_catalog.find.return_value.skip.return_value.limit.return_value = []
+    database.product_catalog.count_documents.return_value = 0
+    database.products.find_one.return_value = None
+    database.orders.aggregate.return_value = [{"_id": "682cbe0431d6a6922c7cf38f", "quantity": 5}]
+    database.collection_versions.find_one.return_value = None
+    return mongo_client
+
+def test_readiness_is_unavailable_until_warmup_completes():
+    readiness.start()
+    response = client.get("/api/v1/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] == "warming_up"
+    # The health check is independent of the warm-up
+    assert client.get("/api/v1/").status_code == 200
+
+    run_warmup(app, mock_mongo_client())
+    response = client.get("/api/v1/ready")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["reason"] == "completed"
+    assert data["steps"]["connections"]["result"] == settings.WARMUP_CONNECTIONS
+    assert data["steps"]["category_pages"]["result"] == 2 * settings.WARMUP_PAGES_PER_CATEGORY
+
+def test_warmup_fills_the_keys_used_by_requests():
+    mongo_client = mock_mongo_client()
+    readiness.start()
+    run_warmup(app, mongo_client)
+
+    app.dependency_overrides[_get_mongo_client] = lambda: mongo_client
+    catalog = mongo_client[settings.MONGODB_DATABASE].product_catalog
+    catalog.find.reset_mock()
+    response = client.get("/api/v1/products?category=phones")
+    assert response.status_code == 200
+    catalog.find.assert_not_called()
+    app.dependency_overrides = {}
+
+def test_warmup_fills_the_product_cache():
+    mongo_client = mock_mongo_client()
+    product_id = "682cbe0431d6a6922c7cf38f"
+    products = mongo_client[settings.MONGODB_DATABASE].products
+    products.find_one.return_value = {"_id": ObjectId(product_id), "name": "Top Product", "description": "", "inventoryCount": 1,
+                                      "createdAt": datetime(2024, 1, 1), "lastUpdatedAt": Timestamp(1717200000, 1)}
+    product_cache.clear()
+    readiness.start()
+    run_warmup(app, mongo_client)
+    assert product_cache.get(product_cache_key(product_id)) is not None
+
+    app.dependency_overrides[_get_mongo_client] = lambda: mongo_client
+    products.find_one.reset_mock()
+    response = client.get(f"/api/v1/products/{product_id}")
+    assert response.status_code == 200
+    assert response.json()["name"] == "Top Product"
+    products.find_one.assert_not_called()
+    app.dependency_overrides = {}
+    product_cache.clear()
+
+def test_failed_step_does_not_block_readiness():
+    mongo_client = mock_mongo_client()
+    mongo_client.admin.command.side_effect = ConnectionError("no server")
+    readiness.start()
+    run_warmup(app, mongo_client)
+    assert readiness.ready
+    assert "error" in readiness.snapshot()["steps"]["connections"]
+
+def test_warmup_timeout_marks_ready(monkeypatch):
+    monkeypatch.setattr(settings, "WARMUP_TIMEOUT_SECONDS", 0)
+    mongo_client = mock_mongo_client()
+
+    def slow_ping(*args):
+        while not readiness.ready:
+            time.sleep(0.001)
+        return {"ok": 1.0}
+
+    mongo_client.admin.command.side_effect = slow_ping
+    thread = start_warmup(app, mongo_client)
+    thread.join(5)
+    assert readiness.ready
+    assert readiness.reason == "timeout"
+
+def test_readiness_waits_for_the_catalog_backfill():
+    readiness.start(required=("catalog",))
+    readiness.mark_ready("timeout")
+    assert not readiness.ready
+    assert readiness.snapshot()["pending"] == ["catalog"]
+    readiness.finish("catalog")
+    assert readiness.ready and readiness.reason == "timeout"
@@ -1,13 +1,51 @@
 import csv
-from itertools import chain
+import glob
+import hashlib
+import json
+import math
+import mmap
+import multiprocessing
+import os
+import pickle
+import queue
+import random
+import resource
+import shutil
+import tempfile
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
 from io import StringIO
+from itertools import islice
+import pyarrow as pa
+import pyarrow.compute as pc
+from pyarrow import csv as pa_csv
 import pymongo
 import dask.bag as db
 import sys
 
-def extract_from_api():
+# Marks the end of a stage's output in the streaming pipeline
+_DONE = object()
+
+
+class Offset:
+    """
+    Yielded by a resumable source after some of its records: the source can resume after
+    those records when called with `resume_from=value` (see run_etl_resumable).
+    """
+    __slots__ = ("value", "source")
+
+    def __init__(self, value, source=None):
+        self.value = value
+        self.source = source
+
+
+def extract_from_api(resume_from=None, page_size=1):
     """
-    Simulate extraction from an API.
+    Simulate extraction from a paginated API. After each page, an Offset holds the
+    token of the next page, from which extraction can resume.
     """
     print("Extracting data from API...")
     # For demonstration, we return hardcoded API data.
@@ -15,22 +53,32 @@ def extract_from_api():
         {"name": "apple iPhone 12", "price": "699.99", "category": "Electronics"},
         {"name": "samsung Galaxy S21", "price": "799.99", "category": "Electronics"}
     ]
-    # Use python generator to yield records one by one
-    # This is useful for large datasets to avoid memory issues.
-    for record in api_data:
-        yield record
+    # Here a page token is the position of the page's first record
+    page_token = int(resume_from or 0)
+    while page_token < len(api_data):
+        # Use python generator to yield records one by one
+        # This is useful for large datasets to avoid memory issues.
+        for record in api_data[page_token:page_token + page_size]:
+            yield record
+        page_token += page_size
+        yield Offset(str(page_token))
 
 
-def extract_from_csv(csv_file_path="products.csv"):
+def extract_from_csv(csv_file_path="products.csv", workers=None, resume_from=None):
     """
-    Extract product data from a CSV file.
+    Extract product data from a CSV file, or from the files matching a glob pattern,
+    parsed in parallel by `read_csv_parallel`. After each byte range, an Offset holds the
+    file and byte offset from which extraction can resume.
     """
     print("Extracting data from CSV...")
     try:
-        with open(csv_file_path, "r", newline='', encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                yield row
+        for chunk in read_csv_parallel(csv_file_path, workers, offsets=True, resume_from=resume_from):
+            if isinstance(chunk, pa.RecordBatch):
+                yield from chunk.to_pylist()
+            elif isinstance(chunk, Offset):
+                yield chunk
+            else:
+                yield from chunk
     except Exception as e:
         print(f"Error reading {csv_file_path}: {e}. Using sample CSV data.")
         sample_csv = """name,price,category
@@ -43,9 +91,10 @@ def extract_from_csv(csv_file_path="products.csv"):
             yield row
 
 
-def extract_from_db_simulation():
+def extract_from_db_simulation(resume_from=None):
     """
-    Simulate extraction from a database.
+    Simulate extraction from a database, reading rows in primary key order. After each row,
+    an Offset holds the watermark, the last key read: extraction resumes after it.
     """
     print("Extracting data from simulated database...")
     db_data = [
@@ -58,29 +107,240 @@ def extract_from_db_simulation():
     # Uncomment to raise an exception to simulate a database error
     # raise Exception("Simulated database error")
 
-    for record in db_data:
+    for key, record in enumerate(db_data, start=1):
+        if resume_from is not None and key <= resume_from:
+            continue
         yield record
+        yield Offset(key)
+
+def extract_synthetic(rows, distinct_keys=100000, seed=42):
+    """
+    Generate synthetic product records, to exercise the pipeline at scale.
+    Records repeat `distinct_keys` (name, category) pairs with varying prices and messy
+    whitespace and case, and about one in a thousand has an invalid price.
+    """
+    print(f"Extracting {rows} synthetic records...")
+    rng = random.Random(seed)
+    categories = ["Electronics", " accessories", "HOME ", "Garden", "toys"]
+    for i in range(rows):
+        key = rng.randrange(distinct_keys)
+        record = {
+            "name": f"  product {key} ",
+            "price": "n/a" if rng.random() < 0.001 else f"{rng.uniform(1, 1000):.2f}",
+            "category": categories[key % len(categories)],
+        }
+        if key % 3 == 0:
+            record["subcategory"] = f"Sub {key % 7}"
+        yield record
+
+class Source:
+    """
+    An extraction source: a generator function with its own timeout and retries.
+    `timeout` bounds the time spent extracting, excluding time blocked on a full buffer.
+    """
+    def __init__(self, name, extract, timeout=60.0, retries=2, backoff=0.5, args=(), kwargs=None):
+        self.name = name
+        self.extract = extract
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.args = args
+        self.kwargs = kwargs or {}
+
+    def resumed(self, offset):
+        """
+        This source, resuming from `offset` if there is one (see Offset).
+        """
+        if offset is None:
+            return self
+        return Source(self.name, self.extract, self.timeout, self.retries, self.backoff, self.args,
+                      dict(self.kwargs, resume_from=offset))
+
+    def with_timeout(self, timeout):
+        """
+        This source, with another timeout.
+        """
+        return Source(self.name, self.extract, timeout, self.retries, self.backoff, self.args, self.kwargs)
+
+
+class SourceMetrics:
+    """
+    Throughput and failures of one source during an extraction.
+    """
+    def __init__(self, name):
+        self.name = name
+        self.status = "running"
+        self.records = 0
+        self.attempts = 0
+        self.failures = 0
+        self.error = None
+        self.started_at = time.monotonic()
+        self.finished_at = None
+        # Time spent waiting for room in the buffer, which is not the source's latency
+        self.blocked_seconds = 0.0
+
+    def active_seconds(self):
+        return (self.finished_at or time.monotonic()) - self.started_at - self.blocked_seconds
+
+    def summary(self):
+        seconds = self.active_seconds()
+        return {
+            "status": self.status,
+            "records": self.records,
+            "attempts": self.attempts,
+            "failures": self.failures,
+            "seconds": round(seconds, 3),
+            "records_per_second": round(self.records / seconds) if seconds > 0 else None,
+            "error": self.error,
+        }
+
+
+# The sources extract_all reads from. Their timeouts can be changed with --source-timeouts.
+SOURCES = [
+    Source("api", extract_from_api, timeout=30),
+    Source("csv", extract_from_csv, timeout=120),
+    Source("db", extract_from_db_simulation, timeout=60),
+]
+
+def sources_with_timeouts(timeouts, sources=None):
+    """
+    The sources, SOURCES by default, with the timeouts given as "name=seconds,..." overridden.
+    """
+    sources = sources if sources is not None else SOURCES
+    overrides = {}
+    for item in filter(None, (timeouts or "").split(",")):
+        name, _, seconds = item.partition("=")
+        overrides[name.strip()] = float(seconds)
+    unknown = set(overrides) - {source.name for source in sources}
+    if unknown:
+        raise ValueError(f"Unknown sources in timeouts: {', '.join(sorted(unknown))}")
+    return [source.with_timeout(overrides[source.name]) if source.name in overrides else source
+            for source in sources]
 
-def safe_extract(gen_func, *args, **kwargs):
+def _extract_source(source, metrics, buffer, abandoned):
     """
-    Wrap an extraction function and catch any exceptions.
-    If an exception is raised, log the error and yield nothing.
+    Run one source in its own thread, putting (name, record) pairs on the shared buffer.
+    A failed attempt is retried with exponential backoff; records and offsets already emitted
+    by a previous attempt are skipped, which assumes the source returns them in the same order.
+    Errors and timeouts stop this source only.
     """
+    emitted = 0
+
+    def put(item, timed=True):
+        while not abandoned.is_set():
+            if timed and metrics.active_seconds() > source.timeout:
+                raise TimeoutError(f"no result within {source.timeout}s")
+            waiting_since = time.monotonic()
+            try:
+                buffer.put((source.name, item), timeout=0.1)
+                return
+            except queue.Full:
+                pass
+            finally:
+                metrics.blocked_seconds += time.monotonic() - waiting_since
+        raise RuntimeError("Extraction stopped")
+
     try:
-        # Yield each record from the generator function.
-        yield from gen_func(*args, **kwargs)
-    except Exception as e:
-        print(f"Error in {gen_func.__name__}: {e}. Continuing with remaining sources.")
+        for attempt in range(1, source.retries + 2):
+            metrics.attempts = attempt
+            try:
+                already_emitted, skipped = emitted, 0
+                for record in source.extract(*source.args, **source.kwargs):
+                    if skipped < already_emitted:
+                        skipped += 1
+                        continue
+                    if metrics.active_seconds() > source.timeout:
+                        raise TimeoutError(f"no result within {source.timeout}s")
+                    if isinstance(record, Offset):
+                        put(Offset(record.value, source.name))
+                    else:
+                        put(record)
+                        metrics.records += 1
+                    emitted += 1
+                metrics.status = "ok"
+                break
+            except TimeoutError as e:
+                metrics.status, metrics.error = "timeout", str(e)
+                break
+            except Exception as e:
+                if abandoned.is_set():
+                    break
+                metrics.failures += 1
+                metrics.error = str(e)
+                print(f"Error in {source.name} (attempt {attempt}): {e}")
+                if attempt > source.retries:
+                    metrics.status = "failed"
+                    print(f"Giving up on {source.name}. Continuing with remaining sources.")
+                    break
+                time.sleep(source.backoff * 2 ** (attempt - 1))
+    finally:
+        metrics.finished_at = time.monotonic()
+        try:
+            # The end of the stream is delivered even after a timeout, or the consumer waits for it
+            put(_DONE, timed=False)
+        except Exception:
+            pass
 
-def extract_all():
+def extract_concurrently(sources, buffer_size=1000, offsets=False, require_complete=False):
     """
-    Extract data from all sources and combine the results into a single list.
+    Extract from all sources at once, each in its own thread, merging their records into
+    a single stream through a buffer of at most `buffer_size` records. A source that fails,
+    keeps failing after its retries, or runs past its timeout is dropped without affecting the
+    others. Per-source metrics are printed once the stream ends, and kept in `extract_metrics`.
+    With `offsets`, the Offset markers of resumable sources are part of the stream, each after
+    the records of its source that it covers.
+    With `require_complete`, the stream ends with a RuntimeError instead if any source was
+    dropped, e.g. for a full refresh, which would otherwise replace the data with part of it.
     """
-    return chain(
-        safe_extract(extract_from_api),
-        safe_extract(extract_from_csv),
-        safe_extract(extract_from_db_simulation)
-    )
+    buffer = queue.Queue(maxsize=buffer_size)
+    abandoned = threading.Event()
+    metrics = {source.name: SourceMetrics(source.name) for source in sources}
+    extract_metrics.clear()
+    extract_metrics.update(metrics)
+    pending = {source.name: source for source in sources}
+    for source in sources:
+        threading.Thread(
+            target=_extract_source,
+            args=(source, metrics[source.name], buffer, abandoned),
+            name=f"extract-{source.name}",
+            daemon=True
+        ).start()
+    try:
+        while pending:
+            try:
+                name, item = buffer.get(timeout=0.1)
+            except queue.Empty:
+                # A source stuck inside its own generator cannot be interrupted, only left behind
+                for name, source in list(pending.items()):
+                    if metrics[name].active_seconds() > source.timeout + 1:
+                        metrics[name].status = "timeout"
+                        metrics[name].error = f"no result within {source.timeout}s"
+                        print(f"Source {name} timed out. Continuing with remaining sources.")
+                        del pending[name]
+                continue
+            if name not in pending:
+                continue
+            if item is _DONE:
+                del pending[name]
+            elif offsets or not isinstance(item, Offset):
+                yield item
+        incomplete = {name: m.status for name, m in metrics.items() if m.status != "ok"}
+        if require_complete and incomplete:
+            raise RuntimeError(f"Extraction incomplete: {incomplete}")
+    finally:
+        abandoned.set()
+        for name, source_metrics in metrics.items():
+            print(f"Source {name}: {source_metrics.summary()}")
+
+# Metrics of the sources of the last extraction, by source name
+extract_metrics = {}
+
+def extract_all(sources=None, require_complete=False):
+    """
+    Extract data from all sources concurrently and combine the results into a single stream.
+    With `require_complete`, a source that timed out or failed fails the stream (see extract_concurrently).
+    """
+    return extract_concurrently(sources if sources is not None else SOURCES, require_complete=require_complete)
 
 def transform(record):
     """
@@ -115,6 +375,214 @@ def transform_all(records):
         if trans is not None:
             yield trans
 
+def _csv_options(header, rejected, **read_options):
+    """
+    Arrow CSV options reading every column as strings, like the values `csv.DictReader` yields.
+    Rows with more or fewer fields than the header, which Arrow rejects, are read by
+    `csv.DictReader` instead and appended to `rejected`.
+    """
+    def reject(row):
+        rejected.extend(csv.DictReader(StringIO(row.text), fieldnames=header))
+        return "skip"
+
+    return {
+        "read_options": pa_csv.ReadOptions(column_names=header, **read_options),
+        "parse_options": pa_csv.ParseOptions(newlines_in_values=True, invalid_row_handler=reject),
+        "convert_options": pa_csv.ConvertOptions(column_types={name: pa.string() for name in header},
+                                                 strings_can_be_null=False),
+    }
+
+def read_csv_batches(csv_file_path, block_size=1 << 20):
+    """
+    Read a CSV file as Arrow record batches of about `block_size` bytes, every column as
+    strings. Rows Arrow rejects (see `_csv_options`) are yielded as a list of records after
+    their block.
+    """
+    with open(csv_file_path, newline='', encoding="utf-8") as f:
+        header = next(csv.reader(f), [])
+    rejected = []
+    reader = pa_csv.open_csv(csv_file_path, **_csv_options(header, rejected, skip_rows=1, block_size=block_size))
+    for batch in reader:
+        yield batch
+        if rejected:
+            yield rejected
+            rejected = []
+
+def csv_byte_ranges(csv_file_path, chunk_bytes, start=None):
+    """
+    Split a memory-mapped CSV file into byte ranges of about `chunk_bytes` that start and end
+    on row boundaries. A newline only ends a row outside quotes, i.e. after an even number of
+    quote characters since the start of the file (a quote in a value is doubled).
+    Returns the header fields, and the ranges of the rows after the header, or after `start`
+    if it is given, which must be the start of a row.
+    """
+    with open(csv_file_path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if not size:
+            return [], []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            def row_end(position, quotes):
+                # The end of the row containing `position`, and the quotes before that end
+                while True:
+                    newline = data.find(b"\n", position)
+                    end = size if newline < 0 else newline + 1
+                    quotes += data[position:end].count(b'"')
+                    if quotes % 2 == 0 or end == size:
+                        return end, quotes
+                    position = end
+
+            header_end, quotes = row_end(0, 0)
+            header = next(csv.reader(StringIO(data[:header_end].decode("utf-8"))), [])
+            start = max(start or 0, header_end)
+            ranges = []
+            while start < size:
+                target = min(start + chunk_bytes, size)
+                end, quotes = row_end(target, quotes + data[start:target].count(b'"'))
+                ranges.append((start, end))
+                start = end
+    return header, ranges
+
+def _parse_csv_range(csv_file_path, header, start, end):
+    """
+    Parse the rows in a byte range of a CSV file, in a worker process. The range is read
+    from a memory map without copying it.
+    Returns Arrow record batches, and the records of the rows Arrow rejected.
+    """
+    with pa.memory_map(csv_file_path) as source:
+        rows = source.read_at(end - start, start)
+    rejected = []
+    table = pa_csv.read_csv(pa.BufferReader(rows), **_csv_options(header, rejected, use_threads=False))
+    return table.to_batches(), rejected
+
+def read_csv_parallel(pattern, workers=None, chunk_bytes=64 << 20, ordered=True, offsets=False, resume_from=None):
+    """
+    Read the CSV files matching a glob pattern with a pool of `workers` processes, one per core
+    by default. Each file is split into row-aligned byte ranges (see `csv_byte_ranges`), and
+    the ranges of all files are parsed in parallel, at most two per worker at a time. A single
+    range, e.g. a file smaller than `chunk_bytes`, is parsed in this process.
+    Yields Arrow record batches and lists of rejected records, like `read_csv_batches`: in file
+    and row order if `ordered`, otherwise as soon as each range is parsed.
+    With `offsets`, an Offset follows the chunks of each range. Its value, the file and the end
+    of the range, can be passed as `resume_from` to read the rows after that range only.
+    """
+    if offsets and not ordered:
+        raise ValueError("Offsets need the files to be read in order")
+    paths = sorted(glob.glob(pattern))
+    if not paths:
+        raise FileNotFoundError(f"No CSV file matches {pattern}")
+    if resume_from:
+        paths = [path for path in paths if path >= resume_from["file"]]
+    workers = workers or os.cpu_count() or 1
+    tasks = []
+    split = workers > 1 or offsets
+    if split:
+        for path in paths:
+            start = resume_from["position"] if resume_from and path == resume_from["file"] else None
+            header, ranges = csv_byte_ranges(path, chunk_bytes, start)
+            tasks.extend((path, header, start, end) for start, end in ranges)
+
+    def chunks(task, result):
+        batches, rejected = result
+        yield from batches
+        if rejected:
+            yield rejected
+        if offsets:
+            yield Offset({"file": task[0], "position": task[3]})
+
+    # Starting workers costs more than parsing a single range here
+    if workers == 1 or len(tasks) <= 1:
+        if not split:
+            for path in paths:
+                yield from read_csv_batches(path)
+        for task in tasks:
+            yield from chunks(task, _parse_csv_range(*task))
+        return
+
+    pending_tasks = iter(tasks)
+    # Workers are spawned: forking a process running threads (the pipeline's, Arrow's) is unsafe
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        def submit(count):
+            return [(pool.submit(_parse_csv_range, *task), task) for task in islice(pending_tasks, count)]
+
+        in_flight = deque(submit(2 * workers))
+        while in_flight:
+            if ordered:
+                done = [in_flight.popleft()]
+            else:
+                finished = wait([future for future, _ in in_flight], return_when=FIRST_COMPLETED).done
+                done = [item for item in in_flight if item[0] in finished]
+                in_flight = deque(item for item in in_flight if item[0] not in finished)
+            for future, task in done:
+                yield from chunks(task, future.result())
+            in_flight.extend(submit(len(done)))
+
+# Prices that Arrow and float() parse to the same value; float() parses the others
+_DECIMAL_PATTERN = r"^[+-]?([0-9]+\.?[0-9]*|\.[0-9]+)([eE][+-]?[0-9]+)?$"
+
+def _string_column(batch, name):
+    if name in batch.schema.names:
+        return batch.column(name)
+    return pa.array([""] * batch.num_rows, pa.string())
+
+def _map_strings(column, kernel, method):
+    """
+    Strip a string column and apply an Arrow case kernel to it. Arrow changes the case of
+    ASCII text like Python does, but not of all Unicode text (e.g. Python title-cases "ß" to
+    "Ss"), so non-ASCII values get the Python `method` instead.
+    """
+    result = kernel(pc.utf8_trim_whitespace(column))
+    unicode = pc.invert(pc.string_is_ascii(column))
+    if not pc.any(unicode).as_py():
+        return result
+    fallback = [method(value) for value in pc.filter(column, unicode).to_pylist()]
+    return pc.replace_with_mask(result, unicode, pa.array(fallback, pa.string()))
+
+def _parse_prices(column):
+    """
+    Parse a column of prices. Returns the prices, and a mask of the valid ones.
+    """
+    decimal = pc.match_substring_regex(column, _DECIMAL_PATTERN)
+    prices = pc.cast(pc.if_else(decimal, column, "0"), pa.float64())
+    if pc.all(decimal).as_py():
+        return prices, decimal
+    # Anything else float() accepts, e.g. "inf", " 1" or "1_000", gets float()'s value
+    fallback, valid = [], decimal.to_pylist()
+    for i in pc.indices_nonzero(pc.invert(decimal)).to_pylist():
+        try:
+            fallback.append(float(column[i].as_py()))
+            valid[i] = True
+        except ValueError:
+            fallback.append(0.0)
+    return pc.replace_with_mask(prices, pc.invert(decimal), pa.array(fallback, pa.float64())), pa.array(valid)
+
+def transform_batch(batch):
+    """
+    Transform a chunk of records like `transform` does one by one, with the same output.
+    An Arrow record batch (see `read_csv_batches`) is transformed a column at a time with
+    Arrow compute kernels; rows with an invalid price go through `transform`, which reports
+    and drops them. Any other chunk is a list of records, transformed one by one.
+    """
+    if not isinstance(batch, pa.RecordBatch):
+        return list(transform_all(batch))
+    prices, valid = (_parse_prices(batch.column("price")) if "price" in batch.schema.names
+                     else (pa.array([0.0] * batch.num_rows), pa.array([True] * batch.num_rows)))
+    subcategories = _string_column(batch, "subcategory")
+    transformed = pa.RecordBatch.from_arrays([
+        _map_strings(_string_column(batch, "name"), pc.utf8_title, lambda name: name.strip().title()),
+        prices,
+        _map_strings(_string_column(batch, "category"), pc.utf8_lower, lambda category: category.strip().lower()),
+        pc.if_else(pc.equal(subcategories, ""), pa.scalar(None, pa.string()),
+                   _map_strings(subcategories, pc.utf8_lower, lambda subcategory: subcategory.strip().lower())),
+    ], names=["name", "price", "category", "subcategory"])
+    if pc.all(valid).as_py():
+        return transformed.to_pylist()
+    results = transformed.filter(valid).to_pylist()
+    invalid = pc.indices_nonzero(pc.invert(valid)).to_pylist()
+    # Invalid rows are dropped by transform, which reports them
+    for record in batch.take(invalid).to_pylist():
+        transform(record)
+    return results
+
 def dedup_key(record):
     """
     Define a key used for deduplication.
@@ -142,39 +610,251 @@ def merge_records(acc, record):
     return return_model
 
 
-def deduplicate_records(records):
+def dedup_partitions(count, workers, min_partition_size=10000):
+    """
+    The number of partitions to deduplicate `count` records with `workers` workers: a few per
+    worker to balance the load, but no smaller than `min_partition_size` records, since each
+    partition costs a task and a partial result to combine.
+    """
+    return max(1, min(4 * workers, math.ceil(count / min_partition_size)))
+
+
+def deduplicate_records(records, scheduler=None, workers=None, split_every=None):
     """
     Deduplicate records using Dask Bag's foldby.
+    The partition count follows the number of records and of workers, one per core by default.
+    `scheduler` is "processes" (merge_records runs without GIL contention, but records are
+    pickled to the workers), "threads" or "sync"; by default, processes with several workers
+    and sync with one. `split_every` is the fan-out of the tree reduction that
+    combines the partitions' results (Dask's default is 8).
     """
     print("Deduplicating records using Dask...")
+    records = records if isinstance(records, list) else list(records)
+    workers = workers or os.cpu_count() or 1
+    npartitions = dedup_partitions(len(records), workers)
+    scheduler = scheduler or ("processes" if workers > 1 and npartitions > 1 else "sync")
     # Create a Dask Bag from our sequence.
-    bag = db.from_sequence(records, npartitions=4)
+    bag = db.from_sequence(records, npartitions=npartitions)
     # foldby groups records by the deduplication key and applies the merge function.
     deduped = bag.foldby(
         key=dedup_key,
         binop=merge_records,
-        initial=None  # The initial value is None so that merge_records returns the record.
+        initial=None,  # The initial value is None so that merge_records returns the record.
+        split_every=split_every
     ).map(lambda t: t[1])
-    return deduped.compute()
+    return deduped.compute(scheduler=scheduler, num_workers=workers)
+
+
+def benchmark_dedup(rows, max_workers=None, scheduler="processes", split_every=None, distinct_keys=100000):
+    """
+    Time deduplicate_records on synthetic records with 1 to `max_workers` workers (one per core
+    by default), to see how it scales with cores.
+    """
+    records = list(transform_all(extract_synthetic(rows, distinct_keys)))
+    max_workers = max_workers or os.cpu_count() or 1
+    counts = sorted({1, max_workers, *(2 ** i for i in range(max_workers.bit_length()) if 2 ** i < max_workers)})
+    results = []
+    for workers in counts:
+        started_at = time.monotonic()
+        deduped = deduplicate_records(records, scheduler=scheduler, workers=workers, split_every=split_every)
+        seconds = time.monotonic() - started_at
+        results.append({"workers": workers, "partitions": dedup_partitions(len(records), workers),
+                        "seconds": round(seconds, 2), "speedup": round(results[0]["seconds"] / seconds, 2) if results else 1.0,
+                        "deduplicated": len(deduped)})
+        print(f"Deduplication benchmark: {results[-1]}")
+    return results
+
+def deduplicate_records_external(records, memory_limit_mb=256, spill_dir=None):
+    """
+    Deduplicate records out of core with a SpillingDeduplicator, for inputs larger than memory.
+    Yields the deduplicated records, and prints the peak memory and disk usage at the end.
+    """
+    print("Deduplicating records out of core...")
+    monitor = MemoryMonitor()
+    monitor.start()
+    deduplicator = SpillingDeduplicator(memory_limit_mb * 1024 * 1024, spill_dir)
+    try:
+        for record in records:
+            deduplicator.add(record)
+        yield from deduplicator.results()
+    finally:
+        deduplicator.close()
+        monitor.stop()
+    print(f"Out-of-core deduplication: {deduplicator.spilled_records} records spilled, "
+          f"peak memory {monitor.peak_mb:.0f} MB, peak disk usage {deduplicator.peak_disk_bytes / (1024 * 1024):.1f} MB")
 
-def is_equal(existing_doc, record):
+# Fields that are not part of a record's content
+_UNHASHED_FIELDS = ("_id", "contentHash")
+
+def content_hash(record):
+    """
+    Compute a stable hash of a transformed record's fields, stored with the document as
+    `contentHash`. Fields are serialized in sorted order, so any change to any field,
+    including fields added later, changes the hash, while key order does not.
+    """
+    content = {field: value for field, value in record.items() if field not in _UNHASHED_FIELDS}
+    serialized = json.dumps(content, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.blake2b(serialized.encode("utf-8"), digest_size=16).hexdigest()
+
+def chunked(records, chunk_size):
+    """
+    Group a stream of records into lists of at most `chunk_size` records.
+    """
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+# The deduplication key, unique in the target collection
+KEY_INDEX = [("name", pymongo.ASCENDING), ("category", pymongo.ASCENDING)]
+
+# Covers the change detection lookup: (name, category) -> contentHash without reading documents
+HASH_INDEX = KEY_INDEX + [("contentHash", pymongo.ASCENDING)]
+
+def ensure_key_index(collection, required=False):
+    """
+    Create the unique (name, category) index that guarantees one document per key, even
+    with concurrent loads, and the (name, category, contentHash) index that covers the
+    loader's change detection lookups.
+    Existing duplicates prevent the unique index: unless `required`, the failure is only
+    reported, as lookups still work.
+    """
+    try:
+        collection.create_index(KEY_INDEX, unique=True, name="name_1_category_1")
+    except pymongo.errors.OperationFailure as e:
+        if required:
+            raise
+        print(f"Could not create the unique (name, category) index: {e}")
+    collection.create_index(HASH_INDEX, name="name_1_category_1_contentHash_1")
+
+def find_existing_hashes(collection, batch):
     """
-    Compare an existing document with a new record.
-    For now, considers the record equal if 'price' differs by less than 0.001.
-    It is better to calculate hash of the record and compare it with the existing document.
+    Fetch the content hashes of a batch's keys only, with an indexed $in lookup on
+    (name, category), so the cost follows the number of incoming records, not the size
+    of the collection. Only indexed fields are projected, so the query is covered by the
+    hash index and no document is read. Names and categories are matched separately by
+    the index, so the few documents pairing a name with another category of the batch
+    are filtered out here. Documents loaded before hashing have a None hash.
     """
-    # Assume that name and category are the same because they’re used as a key
-    if abs(existing_doc.get("price", 0) - record.get("price", 0)) > 0.001:
-        return False
-    return True
+    names = list({record["name"] for record in batch})
+    categories = list({record["category"] for record in batch})
+    keys = {(record["name"], record["category"]) for record in batch}
+    existing_hashes = {}
+    cursor = collection.find(
+        {"name": {"$in": names}, "category": {"$in": categories}},
+        {"_id": 0, "name": 1, "category": 1, "contentHash": 1}
+    ).hint(HASH_INDEX)
+    for doc in cursor:
+        key = (doc["name"], doc["category"])
+        if key in keys:
+            existing_hashes[key] = doc.get("contentHash")
+    return existing_hashes
+
+def _insert_batch(collection, batch):
+    """
+    Insert a batch in one unordered bulk write and return the number of documents inserted.
+    Documents whose key is already in the collection, from a batch inserted before a resumed
+    run stopped, are skipped.
+    """
+    documents = [dict(record, contentHash=content_hash(record)) for record in batch]
+    try:
+        return len(collection.insert_many(documents, ordered=False).inserted_ids)
+    except pymongo.errors.BulkWriteError as e:
+        if any(error["code"] != 11000 for error in e.details["writeErrors"]):
+            raise
+        return e.details["nInserted"]
+
+def _ensure_shadow_key_index(shadow, collection_name):
+    try:
+        ensure_key_index(shadow, required=True)
+    except pymongo.errors.OperationFailure as e:
+        raise RuntimeError(f"{shadow.name} has duplicate keys ({e}); {collection_name} was left unchanged") from e
+
+def full_refresh_via_shadow(db, collection_name, records, batch_size=10000, workers=None, on_batch=None,
+                            resume_from=None):
+    """
+    Replace a collection without readers ever seeing it empty or partly loaded. The records
+    are inserted into a shadow collection by `workers` threads in parallel unordered batches,
+    the indexes are built once the data is in, and the shadow is renamed over the live
+    collection, which MongoDB does in one step. The swap is aborted, leaving the live
+    collection unchanged, if the shadow does not hold one document per record submitted or
+    its unique (name, category) index cannot be built.
+    With `resume_from`, the number of records an interrupted refresh already loaded, its
+    shadow is loaded further instead of dropped.
+    `on_batch` is called with the number of batches done, once a batch and all the batches
+    before it are inserted.
+    Returns the number of documents inserted.
+    """
+    shadow = db[f"{collection_name}_shadow"]
+    if resume_from is not None:
+        if shadow.name not in db.list_collection_names():
+            print(f"{shadow.name} was already renamed to {collection_name}.")
+            return 0
+        # Batches inserted after the last acknowledged one are inserted again, so the
+        # unique index must already be there to skip their documents
+        _ensure_shadow_key_index(shadow, collection_name)
+        expected = resume_from
+    else:
+        shadow.drop()
+        expected = 0
+    inserted = 0
+    workers = workers or os.cpu_count() or 1
+    in_flight, completed, acknowledged = {}, set(), 0
+
+    def collect(futures):
+        nonlocal inserted, acknowledged
+        for future in futures:
+            inserted += future.result()
+            completed.add(in_flight.pop(future))
+        while acknowledged + 1 in completed:
+            acknowledged += 1
+            completed.remove(acknowledged)
+            if on_batch:
+                on_batch(acknowledged)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for batch_number, batch in enumerate(chunked(records, batch_size), start=1):
+            # At most two batches per worker are held in memory
+            if len(in_flight) >= 2 * workers:
+                collect(wait(in_flight, return_when=FIRST_COMPLETED).done)
+            in_flight[pool.submit(_insert_batch, shadow, batch)] = batch_number
+            expected += len(batch)
+        collect(wait(in_flight).done)
+
+    print(f"Inserted {inserted} documents into {shadow.name}; building indexes.")
+    _ensure_shadow_key_index(shadow, collection_name)
+    count = shadow.count_documents({})
+    if count != expected:
+        raise RuntimeError(f"{shadow.name} has {count} documents instead of {expected}; "
+                           f"{collection_name} was left unchanged")
+    shadow.rename(collection_name, dropTarget=True)
+    print(f"Renamed {shadow.name} to {collection_name}.")
+    return inserted
 
 def load_to_mongodb(records,
                     mongodb_url="mongodb://localhost:27017",
                     db_name="ecommerceetl",
                     collection_name="products",
-                    full_refresh=False):
+                    full_refresh=False,
+                    batch_size=10000,
+                    on_batch=None,
+                    workers=None,
+                    resume_from=None):
     """
     Load the deduplicated records into MongoDB.
+    Records may be any iterable; they are written in bulk writes of at most `batch_size`
+    operations, so the pending operations do not grow with the number of records.
+    Only the content hashes of the current batch's keys are looked up: new records are
+    inserted, changed ones updated, and unchanged ones skipped.
+    `on_batch` is called with the number of batches done after each batch is acknowledged.
+    With `full_refresh`, the collection is replaced through a shadow collection loaded by
+    `workers` threads instead (see full_refresh_via_shadow), and `resume_from` continues an
+    interrupted refresh.
+    Returns the number of inserted, updated and unchanged records.
     """
     print("Loading data into MongoDB...")
     client = pymongo.MongoClient(mongodb_url)
@@ -182,70 +862,646 @@ def load_to_mongodb(records,
     collection = db[collection_name]
 
     if full_refresh:
-        print("Performing full refresh: Dropping existing collection.")
-        collection.drop()
-    
-    # Build a dictionary of existing products keyed by (name, category)
-    existing_products = {}
-    for doc in collection.find({}):
-        key = (doc['name'], doc['category'])
-        existing_products[key] = doc
+        print("Performing full refresh through a shadow collection.")
+        inserted = full_refresh_via_shadow(db, collection_name, records, batch_size, workers, on_batch, resume_from)
+        counts = {"inserted": inserted, "updated": 0, "unchanged": 0}
+        print(f"Load result: {counts}")
+        client.close()
+        return counts
+    ensure_key_index(collection)
 
-    operations = []
-    for record in records:
-        key = (record["name"], record["category"])
-        if key in existing_products:
-            # If the record exists but is different, add an update operation.
-            if not is_equal(existing_products[key], record):
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+    for batch_number, batch in enumerate(chunked(records, batch_size), start=1):
+        existing_hashes = find_existing_hashes(collection, batch)
+        operations = []
+        for record in batch:
+            key = (record["name"], record["category"])
+            document = dict(record, contentHash=content_hash(record))
+            if key not in existing_hashes:
+                operations.append(pymongo.InsertOne(document))
+                counts["inserted"] += 1
+            elif existing_hashes[key] != document["contentHash"]:
+                # The record changed: set its fields and its new hash
                 operations.append(
                     pymongo.UpdateOne(
                         {"name": record["name"], "category": record["category"]},
-                        {"$set": record}
+                        {"$set": document}
                     )
                 )
-            # Else: No change, so skip.
-        else:
-            operations.append(pymongo.InsertOne(record))
-    
-    if operations:
-        result = collection.bulk_write(operations, ordered=False)
-        print(f"Bulk write result: {result.bulk_api_result}")
-    else:
+                counts["updated"] += 1
+            else:
+                counts["unchanged"] += 1
+
+        if operations:
+            result = collection.bulk_write(operations, ordered=False)
+            print(f"Bulk write result: {result.bulk_api_result}")
+        if on_batch:
+            on_batch(batch_number)
+
+    if not counts["inserted"] and not counts["updated"]:
         print("No changes detected; skipping updates/inserts.")
-    
+    print(f"Load result: {counts}")
+
     client.close()
+    return counts
 
 
-def run_etl(full_refresh=False):
+def run_etl(full_refresh=False, external_dedup=False, memory_limit_mb=None, spill_dir=None,
+            dedup_scheduler=None, workers=None, split_every=None, checkpoint_dir=None, sources=None):
     """
     Runs the complete ETL pipeline:
       1. Extract from multiple sources.
       2. Transform the extracted data.
       3. Deduplicates records.
       4. Load the final data into MongoDB.
+    With `external_dedup`, records are deduplicated out of core within `memory_limit_mb`,
+    spilling to `spill_dir`, instead of in memory. Otherwise `dedup_scheduler`, `workers`
+    and `split_every` tune the in-memory deduplication (see deduplicate_records).
+    With `checkpoint_dir`, the run can be resumed after a crash (see run_etl_resumable).
+    `sources` defaults to SOURCES. A full refresh is aborted before loading if any of them
+    timed out or failed.
     """
+    if checkpoint_dir:
+        def deduplicate(records):
+            if external_dedup:
+                return deduplicate_records_external(records, memory_limit_mb or 256, spill_dir)
+            return deduplicate_records(records, dedup_scheduler, workers, split_every)
+        run_etl_resumable(checkpoint_dir, full_refresh, sources=sources, deduplicate=deduplicate,
+                          load=lambda records, **options: load_to_mongodb(records, workers=workers, **options))
+        return
+
     print("Starting ETL process...")
 
     # Extract
-    records_gen = extract_all()
+    records_gen = extract_all(sources, require_complete=full_refresh)
     
     # Transform
     transformed_gen = transform_all(records_gen)
 
+    if external_dedup:
+        deduped_records = deduplicate_records_external(transformed_gen, memory_limit_mb or 256, spill_dir)
+        load_to_mongodb(deduped_records, full_refresh=full_refresh, workers=workers)
+        print("ETL process completed successfully.")
+        return
+
     transformed_records = list(transformed_gen)
     print(f"Total transformed records: {len(transformed_records)}")
 
-    deduped_records = deduplicate_records(transformed_records)
+    deduped_records = deduplicate_records(transformed_records, dedup_scheduler, workers, split_every)
     print(f"Total deduplicated records: {len(deduped_records)}")
     
     # Load
-    load_to_mongodb(deduped_records, full_refresh=full_refresh)
+    load_to_mongodb(deduped_records, full_refresh=full_refresh, workers=workers)
+    print("ETL process completed successfully.")
+
+class CheckpointStore:
+    """
+    The progress of a run, kept in a small JSON file. Saving writes a new file and renames it
+    over the previous one, so a crash leaves one checkpoint or the other, never a partial one.
+    """
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def save(self, state):
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary_path, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class Spool:
+    """
+    An append-only file of pickled lists of records. Each append is flushed to disk and
+    returns the new file size, to which a resumed run can truncate the spool back.
+    """
+    def __init__(self, path):
+        self.path = path
+
+    def append(self, records):
+        with open(self.path, "ab") as f:
+            pickle.dump(records, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+            return f.tell()
+
+    def truncate(self, size):
+        with open(self.path, "ab") as f:
+            f.truncate(size)
+
+    def __iter__(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            while True:
+                try:
+                    yield pickle.load(f)
+                except EOFError:
+                    return
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def run_etl_resumable(checkpoint_dir, full_refresh=False, sources=None, deduplicate=None, load=None,
+                      batch_size=10000):
+    """
+    Runs the ETL pipeline with checkpoints in `checkpoint_dir`, so that running it again after
+    a crash resumes the run where it stopped:
+      1. Transformed records are appended to a spool file. Every `batch_size` records, the spool
+         is flushed to disk and the checkpoint saves its size and the last offset of each
+         resumable source (see Offset). A resumed run truncates the spool to that size and
+         restarts each source from its offset. Other sources start over; their repeated
+         records are merged away by the deduplication.
+      2. The deduplicated records are spooled as load batches.
+      3. Each batch the database acknowledges is recorded, and a resumed run skips it. A full
+         refresh resumes loading the shadow collection it had started (see full_refresh_via_shadow).
+    `deduplicate` defaults to deduplicate_records, and `load` to load_to_mongodb.
+    The checkpoint files are removed once the run completes.
+    """
+    deduplicate = deduplicate or deduplicate_records
+    load = load or load_to_mongodb
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    store = CheckpointStore(os.path.join(checkpoint_dir, "checkpoint.json"))
+    transformed = Spool(os.path.join(checkpoint_dir, "transformed.spool"))
+    deduplicated = Spool(os.path.join(checkpoint_dir, "deduplicated.spool"))
+    state = store.load()
+    if state is None:
+        print("Starting resumable ETL process...")
+        state = {"stage": "extract", "full_refresh": full_refresh, "offsets": {}, "spooled_bytes": 0,
+                 "batches": 0, "records": 0, "loaded_batches": 0}
+    else:
+        print(f"Resuming ETL process at the {state['stage']} stage, from {store.path}")
+
+    if state["stage"] == "extract":
+        transformed.truncate(state["spooled_bytes"])
+        sources = [source.resumed(state["offsets"].get(source.name)) for source in sources or SOURCES]
+        buffer = []
+
+        def checkpoint():
+            # Offsets seen so far only cover records that are in the spool once it is flushed
+            if buffer:
+                state["spooled_bytes"] = transformed.append(buffer)
+                buffer.clear()
+            store.save(state)
+
+        for item in extract_concurrently(sources, offsets=True, require_complete=state["full_refresh"]):
+            if isinstance(item, Offset):
+                state["offsets"][item.source] = item.value
+                continue
+            record = transform(item)
+            if record is not None:
+                buffer.append(record)
+                if len(buffer) >= batch_size:
+                    checkpoint()
+        state["stage"] = "deduplicate"
+        checkpoint()
+
+    if state["stage"] == "deduplicate":
+        deduped_records = deduplicate(record for batch in transformed for record in batch)
+        deduplicated.truncate(0)
+        state["batches"] = 0
+        state["records"] = 0
+        for batch in chunked(deduped_records, batch_size):
+            deduplicated.append(batch)
+            state["batches"] += 1
+            state["records"] += len(batch)
+        print(f"Total deduplicated batches: {state['batches']}")
+        state["stage"] = "load"
+        store.save(state)
+        transformed.remove()
+
+    loaded = state["loaded_batches"]
+    if loaded:
+        print(f"Skipping {loaded} of {state['batches']} batches already loaded")
+
+    def acknowledge(batches_done):
+        state["loaded_batches"] = loaded + batches_done
+        store.save(state)
+
+    # Every batch but the last is full
+    loaded_records = min(loaded * batch_size, state["records"]) if loaded else None
+    load((record for batch in islice(deduplicated, loaded, None) for record in batch),
+         full_refresh=state["full_refresh"], batch_size=batch_size, on_batch=acknowledge, resume_from=loaded_records)
+    store.clear()
+    deduplicated.remove()
+    if not os.listdir(checkpoint_dir):
+        os.rmdir(checkpoint_dir)
     print("ETL process completed successfully.")
 
+def current_rss_mb():
+    """
+    Current resident memory of the process in MB, from /proc where available,
+    otherwise the peak resident memory reported by the OS.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class MemoryMonitor(threading.Thread):
+    """
+    Samples the resident memory of the process while the pipeline runs, keeps the peak,
+    and warns once when it goes over the memory ceiling. It only reports: the ceiling is
+    enforced by the stages themselves (see StreamingDeduplicator).
+    """
+    def __init__(self, limit_mb=None, interval=0.2):
+        super().__init__(name="memory-monitor", daemon=True)
+        self.limit_mb = limit_mb
+        self.interval = interval
+        self.peak_mb = current_rss_mb()
+        # Not `_stop`, which would shadow threading.Thread._stop and break join()
+        self._stopped = threading.Event()
+        self._warned = False
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        rss = current_rss_mb()
+        self.peak_mb = max(self.peak_mb, rss)
+        if self.limit_mb and rss > self.limit_mb and not self._warned:
+            self._warned = True
+            print(f"Warning: resident memory {rss:.0f} MB is over the {self.limit_mb} MB ceiling")
+
+    def stop(self):
+        self._stopped.set()
+        if self.is_alive():
+            self.join()
+        self.sample()
+
+
+def _put(q, item, stop):
+    """
+    Put an item on a bounded queue, blocking while it is full (backpressure),
+    unless another stage failed.
+    """
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return
+        except queue.Full:
+            pass
+    raise RuntimeError("Pipeline stopped")
+
+def _drain_chunks(q, stop):
+    """
+    Yield the chunks on a queue, until the stage feeding it is done.
+    """
+    while True:
+        try:
+            chunk = q.get(timeout=0.1)
+        except queue.Empty:
+            if stop.is_set():
+                raise RuntimeError("Pipeline stopped")
+            continue
+        if chunk is _DONE:
+            return
+        yield chunk
+
+def _drain(q, stop):
+    """
+    Yield the records of the chunks on a queue, until the stage feeding it is done.
+    """
+    for chunk in _drain_chunks(q, stop):
+        yield from chunk
+
+
+class StreamingDeduplicator:
+    """
+    Merges records by dedup_key as they stream in, with merge_records.
+    Its memory grows with the number of distinct keys, not with the number of records.
+    Once its estimated size goes over `limit_bytes`, its share of the memory ceiling, the
+    merged records are handed to a SpillingDeduplicator, which takes the rest of the stream
+    out of core. Call `close` if `results` is not consumed.
+    """
+    # Rough size of one merged record and its key in the dict, in bytes
+    RECORD_BYTES = 600
+
+    def __init__(self, limit_bytes=None, spill_dir=None):
+        self.limit_bytes = limit_bytes
+        self.spill_dir = spill_dir
+        self.records = {}
+        # The out-of-core deduplicator, once the records outgrew the memory share
+        self.spilling = None
+
+    def add(self, record):
+        if self.spilling is not None:
+            self.spilling.add(record)
+            return
+        key = dedup_key(record)
+        self.records[key] = merge_records(self.records.get(key), record)
+        if self.limit_bytes and len(self.records) * self.RECORD_BYTES > self.limit_bytes:
+            print(f"Deduplication state of {len(self.records)} keys is over its memory share, spilling to disk")
+            # Each merged record goes first in its partition, so later records merge with it as before
+            self.spilling = SpillingDeduplicator(self.limit_bytes, self.spill_dir)
+            records, self.records = self.records, {}
+            for merged in records.values():
+                self.spilling.add(merged)
+
+    def results(self):
+        return self.spilling.results() if self.spilling is not None else self.records.values()
+
+    def close(self):
+        """
+        Remove the spill files, if any.
+        """
+        if self.spilling is not None:
+            self.spilling.close()
+
+
+def _key_hash(key):
+    # Stable across processes and runs, unlike hash() of strings
+    return zlib.crc32("\0".join(key).encode("utf-8"))
+
+
+class SpillingDeduplicator:
+    """
+    Merges records by dedup_key like StreamingDeduplicator, out of core. Records are
+    hash-partitioned by key into spill files, then each partition is merged on its own with
+    merge_records, in the order its records came in. A partition whose distinct keys outgrow
+    the memory budget while it is merged is split again, so one hot key with many records is
+    merged in one pass. Memory stays within the budget whatever the number of distinct keys;
+    disk usage grows with the number of records. Call `close` if `results` is not consumed.
+    """
+    # Hash values are 32 bits: a partition cannot be split beyond that
+    HASH_RANGE = 1 << 32
+
+    def __init__(self, limit_bytes, spill_dir=None, partitions=16):
+        self.limit_bytes = limit_bytes
+        self.partitions = partitions
+        self.spill_dir = tempfile.mkdtemp(prefix="dedup_", dir=spill_dir)
+        self.spilled_records = 0
+        self.disk_bytes = 0
+        self.peak_disk_bytes = 0
+        self.splits = 0
+        self._buffers = [[] for _ in range(partitions)]
+        self._buffered = 0
+        self._sizes = [0] * partitions
+
+    def _path(self, partition):
+        return os.path.join(self.spill_dir, f"partition-{partition}")
+
+    def _write(self, path, records):
+        with open(path, "ab") as f:
+            start = f.seek(0, os.SEEK_END)
+            pickle.dump(records, f, protocol=pickle.HIGHEST_PROTOCOL)
+            self.disk_bytes += f.tell() - start
+        self.peak_disk_bytes = max(self.peak_disk_bytes, self.disk_bytes)
+
+    def _read(self, path):
+        with open(path, "rb") as f:
+            while True:
+                try:
+                    yield from pickle.load(f)
+                except EOFError:
+                    break
+        self.disk_bytes -= os.path.getsize(path)
+        os.remove(path)
+
+    def add(self, record):
+        self._buffers[_key_hash(dedup_key(record)) % self.partitions].append(record)
+        self._buffered += 1
+        # Buffers use half the budget, leaving the other half to merge a partition
+        if self._buffered * StreamingDeduplicator.RECORD_BYTES > self.limit_bytes // 2:
+            self._flush()
+
+    def _flush(self):
+        for partition, buffer in enumerate(self._buffers):
+            if buffer:
+                self._write(self._path(partition), buffer)
+                self._sizes[partition] += len(buffer)
+                self.spilled_records += len(buffer)
+                self._buffers[partition] = []
+        self._buffered = 0
+
+    def _split(self, path, divisor, parts):
+        # Records of this file share their hash modulo `divisor`, so the next digit spreads them
+        self.splits += 1
+        paths = [f"{path}.{part}" for part in range(parts)]
+        buffers = [[] for _ in range(parts)]
+        sizes = [0] * parts
+        for record in self._read(path):
+            part = _key_hash(dedup_key(record)) // divisor % parts
+            buffers[part].append(record)
+            sizes[part] += 1
+            if len(buffers[part]) * StreamingDeduplicator.RECORD_BYTES * parts > self.limit_bytes // 2:
+                self._write(paths[part], buffers[part])
+                buffers[part] = []
+        for part_path, buffer in zip(paths, buffers):
+            if buffer:
+                self._write(part_path, buffer)
+        return [(part_path, size, divisor * parts) for part_path, size in zip(paths, sizes) if size]
+
+    def _merge(self, path, size, divisor):
+        """
+        Merge a partition. Returns the merged records, or None and the number of parts to split
+        the file into once its distinct keys outgrow the budget, estimated from the records read.
+        """
+        budget = self.limit_bytes // 2
+        merged = {}
+        records = self._read(path)
+        for read, record in enumerate(records, start=1):
+            key = dedup_key(record)
+            merged[key] = merge_records(merged.get(key), record)
+            if len(merged) * StreamingDeduplicator.RECORD_BYTES > budget and divisor < self.HASH_RANGE:
+                records.close()
+                expected_keys = len(merged) * size // read
+                return None, max(2, -(-expected_keys * StreamingDeduplicator.RECORD_BYTES // budget))
+        return merged, 0
+
+    def results(self):
+        """
+        Yield the merged records one partition at a time, removing the spill files.
+        """
+        self._flush()
+        pending = [(self._path(p), size, self.partitions) for p, size in enumerate(self._sizes) if size]
+        try:
+            while pending:
+                path, size, divisor = pending.pop()
+                merged, parts = self._merge(path, size, divisor)
+                if merged is None:
+                    pending.extend(self._split(path, divisor, parts))
+                    continue
+                yield from merged.values()
+        finally:
+            self.close()
+
+    def close(self):
+        """
+        Remove the spill files.
+        """
+        shutil.rmtree(self.spill_dir, ignore_errors=True)
+        self.disk_bytes = 0
+
+
+def run_etl_streaming(sources=None, load=None, chunk_size=10000, queue_size=4, memory_limit_mb=None, batches=None,
+                      external_dedup=False, spill_dir=None):
+    """
+    Runs the ETL pipeline as a stream of chunks:
+      extract -> transform -> dedup -> load
+    Each stage runs in its own thread, and stages are connected by queues holding at most
+    `queue_size` chunks of `chunk_size` records. A stage that gets ahead blocks until the next
+    one catches up, so the records in flight are bounded whatever the input size; only the
+    deduplication state grows, with the number of distinct keys.
+    `batches` replaces the sources with Arrow record batches (see `read_csv_parallel`), which
+    the transform stage processes a column at a time.
+    With `memory_limit_mb`, the deduplication state gets what the records in flight leave of the
+    ceiling, and spills to `spill_dir` once it outgrows it (see StreamingDeduplicator). With
+    `external_dedup`, it spills from the start (see SpillingDeduplicator), within its share or
+    256 MB without a ceiling. A warning is printed if the process still goes over the ceiling.
+    Returns a summary with record counts, duration and peak memory.
+    """
+    print("Starting streaming ETL process...")
+    started_at = time.monotonic()
+    if batches is None:
+        batches = chunked(sources if sources is not None else extract_all(), chunk_size)
+    load = load or load_to_mongodb
+    monitor = MemoryMonitor(memory_limit_mb)
+    in_flight_bytes = 3 * (queue_size + 2) * chunk_size * StreamingDeduplicator.RECORD_BYTES
+    dedup_limit = memory_limit_mb * 1024 * 1024 - in_flight_bytes if memory_limit_mb else None
+    if dedup_limit is not None and dedup_limit <= 0:
+        raise ValueError("The memory ceiling is too low for this chunk size and queue size")
+    if external_dedup:
+        deduplicator = SpillingDeduplicator(dedup_limit or 256 * 1024 * 1024, spill_dir)
+    else:
+        deduplicator = StreamingDeduplicator(dedup_limit, spill_dir)
+    extracted_q, transformed_q, deduped_q = (queue.Queue(maxsize=queue_size) for _ in range(3))
+    stop = threading.Event()
+    counts = {"extracted": 0, "transformed": 0, "deduplicated": 0}
+    errors = []
+
+    def stage(name, body):
+        def run():
+            try:
+                body()
+            except Exception as e:
+                if not stop.is_set():
+                    print(f"Error in {name} stage: {e}")
+                    errors.append(e)
+                stop.set()
+        return threading.Thread(target=run, name=name, daemon=True)
+
+    def extract():
+        for chunk in batches:
+            counts["extracted"] += len(chunk)
+            _put(extracted_q, chunk, stop)
+        _put(extracted_q, _DONE, stop)
+
+    def transform_stage():
+        for chunk in _drain_chunks(extracted_q, stop):
+            transformed = transform_batch(chunk)
+            counts["transformed"] += len(transformed)
+            _put(transformed_q, transformed, stop)
+        _put(transformed_q, _DONE, stop)
+
+    def dedup():
+        for record in _drain(transformed_q, stop):
+            deduplicator.add(record)
+        for chunk in chunked(deduplicator.results(), chunk_size):
+            counts["deduplicated"] += len(chunk)
+            _put(deduped_q, chunk, stop)
+        _put(deduped_q, _DONE, stop)
+
+    threads = [stage("extract", extract), stage("transform", transform_stage), stage("dedup", dedup)]
+    monitor.start()
+    for thread in threads:
+        thread.start()
+    try:
+        # Load runs in this thread, pulling deduplicated records as they come
+        load(_drain(deduped_q, stop))
+    except Exception:
+        stop.set()
+        # When a stage failed first, the load only saw the pipeline stop: raise the stage's error
+        if not errors:
+            raise
+    finally:
+        for thread in threads:
+            thread.join()
+        monitor.stop()
+        # The dedup stage may have failed before its spill files were merged
+        deduplicator.close()
+    if errors:
+        raise errors[0]
+
+    summary = dict(counts, seconds=round(time.monotonic() - started_at, 1), peak_memory_mb=round(monitor.peak_mb))
+    spilling = deduplicator if external_dedup else deduplicator.spilling
+    if spilling is not None:
+        summary["peak_disk_mb"] = round(spilling.peak_disk_bytes / (1024 * 1024), 1)
+    print(f"Streaming ETL process completed: {summary}")
+    return summary
+
+
+def count_only(records):
+    """
+    A load step that only consumes the records, to measure the pipeline without MongoDB.
+    """
+    loaded = sum(1 for _ in records)
+    print(f"Records reaching the load step: {loaded}")
+
+
+def _option(name, default, cast=int):
+    """
+    Read a `--name value` command line option.
+    """
+    if name in sys.argv:
+        return cast(sys.argv[sys.argv.index(name) + 1])
+    return default
+
+
 def main():
     # Check if the script is run with a full refresh flag
     full_refresh = "--full-refresh" in sys.argv
-    run_etl(full_refresh=full_refresh)
+    external_dedup = "--external-dedup" in sys.argv
+    dedup_scheduler = _option("--dedup-scheduler", None, cast=str)
+    workers = _option("--workers", None)
+    split_every = _option("--split-every", None)
+    sources = sources_with_timeouts(_option("--source-timeouts", None, cast=str))
+    if "--benchmark-dedup" in sys.argv:
+        benchmark_dedup(_option("--benchmark-dedup", 1000000), workers, dedup_scheduler or "processes", split_every,
+                        _option("--distinct-keys", 100000))
+        return
+    if "--stream" not in sys.argv:
+        run_etl(full_refresh=full_refresh, external_dedup=external_dedup,
+                memory_limit_mb=_option("--memory-limit-mb", None), spill_dir=_option("--spill-dir", None, cast=str),
+                dedup_scheduler=dedup_scheduler, workers=workers, split_every=split_every,
+                checkpoint_dir=_option("--checkpoint-dir", None, cast=str), sources=sources)
+        return
+
+    synthetic_rows = _option("--synthetic", None)
+    if synthetic_rows:
+        records = extract_synthetic(synthetic_rows, _option("--distinct-keys", 100000))
+    else:
+        records = extract_all(sources, require_complete=full_refresh)
+    csv_file_path = _option("--csv", None, cast=str)
+    run_etl_streaming(
+        sources=records,
+        load=count_only if "--no-load" in sys.argv else
+        lambda records: load_to_mongodb(records, full_refresh=full_refresh, workers=workers),
+        chunk_size=_option("--chunk-size", 10000),
+        queue_size=_option("--queue-size", 4),
+        memory_limit_mb=_option("--memory-limit-mb", None),
+        batches=read_csv_parallel(csv_file_path, workers,
+                                  ordered="--unordered" not in sys.argv) if csv_file_path else None,
+        external_dedup=external_dedup,
+        spill_dir=_option("--spill-dir", None, cast=str),
+    )
 
 
 if __name__ == "__main__":
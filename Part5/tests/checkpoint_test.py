@@ -0,0 +1,90 @@
+import pytest
+
+import main
+from main import Offset, Source, StreamingDeduplicator, chunked, run_etl_resumable
+
+class Crash(Exception):
+    pass
+
+def numbered_source(calls, rows=25):
+    def extract(resume_from=None):
+        calls.append(resume_from)
+        for i in range(resume_from or 0, rows):
+            yield {"name": f"product {i}", "price": str(i), "category": "x"}
+            yield Offset(i + 1)
+    return Source("numbered", extract, timeout=10)
+
+def deduplicate(records):
+    deduplicator = StreamingDeduplicator()
+    for record in records:
+        deduplicator.add(record)
+    return sorted(deduplicator.results(), key=lambda record: record["name"])
+
+class Load:
+    def __init__(self, fail_at_batch=None):
+        self.fail_at_batch = fail_at_batch
+        self.loaded = []
+        self.calls = []
+
+    def __call__(self, records, full_refresh, batch_size, on_batch, resume_from):
+        self.calls.append((full_refresh, resume_from))
+        for number, batch in enumerate(chunked(records, batch_size), start=1):
+            if number == self.fail_at_batch:
+                raise Crash()
+            self.loaded.extend(batch)
+            on_batch(number)
+
+def test_run_resumes_sources_from_their_offsets(tmp_path, monkeypatch):
+    calls = []
+    transform = main.transform
+
+    def crashing_transform(record):
+        if record["name"] == "product 17":
+            raise Crash()
+        return transform(record)
+
+    monkeypatch.setattr(main, "transform", crashing_transform)
+    with pytest.raises(Crash):
+        run_etl_resumable(str(tmp_path), sources=[numbered_source(calls)], deduplicate=deduplicate, load=Load(),
+                          batch_size=10)
+    checkpoint = main.CheckpointStore(str(tmp_path / "checkpoint.json")).load()
+    assert checkpoint["stage"] == "extract" and checkpoint["spooled_bytes"] > 0
+
+    monkeypatch.setattr(main, "transform", transform)
+    load = Load()
+    run_etl_resumable(str(tmp_path), sources=[numbered_source(calls)], deduplicate=deduplicate, load=load, batch_size=10)
+    # The second run only extracted the records after the last checkpoint
+    assert calls[0] is None and 0 < calls[1] <= 17
+    assert sorted(record["price"] for record in load.loaded) == [float(i) for i in range(25)]
+    assert not tmp_path.exists()
+
+def test_run_skips_acknowledged_batches(tmp_path):
+    calls = []
+    with pytest.raises(Crash):
+        run_etl_resumable(str(tmp_path), full_refresh=True, sources=[numbered_source(calls)], deduplicate=deduplicate,
+                          load=Load(fail_at_batch=3), batch_size=10)
+    assert main.CheckpointStore(str(tmp_path / "checkpoint.json")).load()["loaded_batches"] == 2
+
+    load = Load()
+    run_etl_resumable(str(tmp_path), full_refresh=True, sources=[numbered_source(calls)], deduplicate=deduplicate,
+                      load=load, batch_size=10)
+    # Nothing is extracted again, and only the last batch is loaded, into the same refresh
+    assert calls == [None]
+    assert [record["name"] for record in load.loaded] == [f"Product {i}" for i in sorted(range(25), key=str)][20:]
+    assert load.calls == [(True, 20)]
+
+def test_retried_source_emits_records_and_offsets_once():
+    attempts = []
+
+    def flaky(resume_from=None):
+        attempts.append(resume_from)
+        for i in range(6):
+            if i == 4 and len(attempts) == 1:
+                raise ConnectionError("connection reset")
+            yield {"name": f"product {i}"}
+            yield Offset(i + 1)
+
+    items = list(main.extract_concurrently([Source("flaky", flaky, backoff=0)], offsets=True))
+    assert [item["name"] for item in items if not isinstance(item, Offset)] == [f"product {i}" for i in range(6)]
+    assert [(item.source, item.value) for item in items if isinstance(item, Offset)] == \
+        [("flaky", i) for i in range(1, 7)]
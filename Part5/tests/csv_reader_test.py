@@ -0,0 +1,66 @@
+import csv
+import random
+
+from main import Offset, csv_byte_ranges, extract_from_csv, read_csv_parallel, _parse_csv_range
+
+HEADER = ["name", "price", "category", "subcategory"]
+
+def write_random_csv(path, seed, rows=1000):
+    rng = random.Random(seed)
+    # Quoted commas, quotes and newlines make most byte offsets fall inside a value
+    pieces = ["a", "b,c", '"q"', "\n", "x\r\ny", "ß", ""]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerows(["".join(rng.choice(pieces) for _ in range(rng.randint(0, 4))) for _ in HEADER]
+                         for _ in range(rows))
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+def records(chunks):
+    return [record for chunk in chunks if not isinstance(chunk, Offset)
+            for record in (chunk if isinstance(chunk, list) else chunk.to_pylist())]
+
+def test_byte_ranges_split_on_row_boundaries(tmp_path):
+    path = tmp_path / "products.csv"
+    expected = write_random_csv(path, seed=1)
+    for chunk_bytes in (1, 7, 100, 5000, 10 ** 9):
+        header, ranges = csv_byte_ranges(path, chunk_bytes)
+        assert header == HEADER
+        assert all(end == start for (_, end), (start, _) in zip(ranges, ranges[1:]))
+        parsed = []
+        for start, end in ranges:
+            batches, rejected = _parse_csv_range(str(path), header, start, end)
+            parsed.extend(records(batches) + rejected)
+        assert parsed == expected
+
+def test_parallel_read_of_a_glob_matches_dict_reader(tmp_path):
+    expected = write_random_csv(tmp_path / "a.csv", seed=2) + write_random_csv(tmp_path / "b.csv", seed=3)
+    pattern = str(tmp_path / "*.csv")
+    assert records(read_csv_parallel(pattern, workers=2, chunk_bytes=4096)) == expected
+    unordered = records(read_csv_parallel(pattern, workers=2, chunk_bytes=4096, ordered=False))
+    assert sorted(map(repr, unordered)) == sorted(map(repr, expected))
+    assert records(read_csv_parallel(pattern, workers=1)) == expected
+
+def test_parallel_read_of_a_single_range_reads_each_row_once(tmp_path):
+    expected = write_random_csv(tmp_path / "a.csv", seed=7, rows=2)
+    assert records(read_csv_parallel(str(tmp_path / "a.csv"), workers=4)) == expected
+
+def test_extract_from_csv_reads_a_glob(tmp_path, capsys):
+    expected = write_random_csv(tmp_path / "a.csv", seed=4, rows=10)
+    items = list(extract_from_csv(str(tmp_path / "*.csv")))
+    assert [item for item in items if not isinstance(item, Offset)] == expected
+    assert items[-1].value == {"file": str(tmp_path / "a.csv"), "position": (tmp_path / "a.csv").stat().st_size}
+    # Without a matching file, the sample data is used as before
+    fallback = [row["name"].strip() for row in extract_from_csv(str(tmp_path / "missing-*.csv"))]
+    assert fallback[:2] == ["Dell Laptop", "HP Printer"]
+    assert "No CSV file matches" in capsys.readouterr().out
+
+def test_read_csv_resumes_after_an_offset(tmp_path):
+    expected = write_random_csv(tmp_path / "a.csv", seed=5) + write_random_csv(tmp_path / "b.csv", seed=6)
+    pattern = str(tmp_path / "*.csv")
+    chunks = list(read_csv_parallel(pattern, workers=1, chunk_bytes=2048, offsets=True))
+    for i, chunk in enumerate(chunks):
+        if isinstance(chunk, Offset):
+            resumed = read_csv_parallel(pattern, workers=1, chunk_bytes=2048, offsets=True, resume_from=chunk.value)
+            assert records(chunks[:i] + list(resumed)) == expected
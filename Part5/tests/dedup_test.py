@@ -0,0 +1,84 @@
+import os
+import random
+
+import pytest
+
+from main import (SpillingDeduplicator, StreamingDeduplicator, dedup_key, dedup_partitions, deduplicate_records,
+                  deduplicate_records_external)
+
+def random_records(count, keys, seed):
+    rng = random.Random(seed)
+    return [
+        {"name": f"product {rng.randrange(keys)}", "price": float(rng.randint(1, 20)), "category": rng.choice("ab"),
+         "subcategory": rng.choice([None, "", "sub x", "sub y"])}
+        for _ in range(count)
+    ]
+
+def in_memory(records):
+    deduplicator = StreamingDeduplicator()
+    for record in records:
+        deduplicator.add(dict(record))
+    return {dedup_key(record): record for record in deduplicator.results()}
+
+def out_of_core(deduplicator, records):
+    for record in records:
+        deduplicator.add(dict(record))
+    merged = list(deduplicator.results())
+    assert len(merged) == len({dedup_key(record) for record in merged})
+    return {dedup_key(record): record for record in merged}
+
+def test_spilled_partitions_merge_like_in_memory(tmp_path):
+    records = random_records(5000, keys=800, seed=1)
+    # A budget of a few dozen records forces many spills, and splits of every partition
+    deduplicator = SpillingDeduplicator(limit_bytes=40 * StreamingDeduplicator.RECORD_BYTES,
+                                        spill_dir=str(tmp_path), partitions=2)
+    assert out_of_core(deduplicator, records) == in_memory(records)
+    assert deduplicator.splits > 0
+    assert deduplicator.spilled_records >= len(records)
+    assert deduplicator.peak_disk_bytes > 0 and deduplicator.disk_bytes == 0
+    assert os.listdir(tmp_path) == []
+
+def test_single_key_partition_is_merged_without_splitting_forever(tmp_path):
+    records = random_records(2000, keys=1, seed=2)
+    deduplicator = SpillingDeduplicator(limit_bytes=10 * StreamingDeduplicator.RECORD_BYTES,
+                                        spill_dir=str(tmp_path), partitions=1)
+    assert out_of_core(deduplicator, records) == in_memory(records)
+    # The merge only holds one key, so the partition is not rewritten
+    assert deduplicator.splits == 0
+
+def test_spill_files_are_removed_when_adding_fails(tmp_path):
+    def failing(records):
+        yield from records
+        raise ValueError("source failed")
+
+    merged = deduplicate_records_external(failing(random_records(1000, keys=100, seed=5)), memory_limit_mb=0,
+                                          spill_dir=str(tmp_path))
+    with pytest.raises(ValueError):
+        list(merged)
+    assert os.listdir(tmp_path) == []
+
+def test_deduplicate_records_external_reports_usage(tmp_path, capsys):
+    records = random_records(1000, keys=100, seed=3)
+    merged = list(deduplicate_records_external(records, memory_limit_mb=1, spill_dir=str(tmp_path)))
+    assert {dedup_key(record): record for record in merged} == in_memory(records)
+    assert "peak memory" in capsys.readouterr().out
+
+def test_partitions_follow_input_size_and_workers():
+    assert dedup_partitions(0, workers=8) == 1
+    assert dedup_partitions(25000, workers=8) == 3
+    assert dedup_partitions(10 ** 7, workers=8) == 32
+    assert dedup_partitions(10 ** 7, workers=1) == 4
+
+def test_schedulers_give_the_same_result():
+    records = random_records(30000, keys=500, seed=4)
+    expected = in_memory(records)
+    results = []
+    for scheduler in ("sync", "threads", "processes"):
+        merged = deduplicate_records([dict(record) for record in records], scheduler=scheduler, workers=2, split_every=2)
+        by_key = {dedup_key(record): record for record in merged}
+        assert len(merged) == len(by_key)
+        # Partial results are combined in a tree, so only the lowest price is the same as in order
+        assert {key: record["price"] for key, record in by_key.items()} == \
+            {key: record["price"] for key, record in expected.items()}
+        results.append(by_key)
+    assert results[0] == results[1] == results[2]
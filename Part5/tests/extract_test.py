@@ -0,0 +1,66 @@
+import time
+
+import pytest
+
+import main
+from main import Source, extract_concurrently, sources_with_timeouts
+
+def numbers(count, delay=0.0):
+    for i in range(count):
+        time.sleep(delay)
+        yield {"name": f"product {i}"}
+
+def names(records):
+    return sorted(record["name"] for record in records)
+
+def test_a_slow_source_times_out_without_stopping_the_others():
+    sources = [Source("fast", numbers, args=(20,)), Source("slow", numbers, timeout=0.2, args=(100, 0.05))]
+    records = list(extract_concurrently(sources))
+    assert 20 <= len(records) < 120
+    assert main.extract_metrics["fast"].status == "ok"
+    assert main.extract_metrics["slow"].status == "timeout"
+    assert main.extract_metrics["slow"].records < 100
+
+def test_a_failing_source_is_retried_then_dropped_alone():
+    def failing():
+        yield {"name": "partial"}
+        raise ConnectionError("connection refused")
+
+    sources = [Source("ok", numbers, args=(10,)), Source("failing", failing, retries=1, backoff=0)]
+    records = list(extract_concurrently(sources))
+    assert names(records) == sorted(names(numbers(10)) + ["partial"])
+    assert main.extract_metrics["failing"].status == "failed"
+    assert main.extract_metrics["failing"].attempts == 2
+
+def test_time_blocked_on_the_buffer_does_not_count_towards_the_timeout():
+    records = []
+    for record in extract_concurrently([Source("blocked", numbers, timeout=0.2, args=(30,))], buffer_size=2):
+        # A slow consumer keeps the buffer full for much longer than the timeout
+        time.sleep(0.02)
+        records.append(record)
+    assert len(records) == 30
+    assert main.extract_metrics["blocked"].status == "ok"
+    assert main.extract_metrics["blocked"].blocked_seconds > 0.2
+
+def test_incomplete_extraction_fails_when_complete_data_is_required():
+    sources = [Source("ok", numbers, args=(10,)), Source("slow", numbers, timeout=0.1, args=(100, 0.05))]
+    with pytest.raises(RuntimeError, match="Extraction incomplete"):
+        list(extract_concurrently(sources, require_complete=True))
+
+def test_full_refresh_is_not_loaded_from_partial_data(monkeypatch):
+    loads = []
+    monkeypatch.setattr(main, "load_to_mongodb", lambda records, **options: loads.append(list(records)))
+    sources = [Source("ok", numbers, args=(10,)), Source("slow", numbers, timeout=0.1, args=(100, 0.05))]
+    with pytest.raises(RuntimeError, match="Extraction incomplete"):
+        main.run_etl(full_refresh=True, sources=sources, dedup_scheduler="sync")
+    assert loads == []
+    # An incremental run loads what it got
+    main.run_etl(sources=sources, dedup_scheduler="sync")
+    assert len(loads) == 1 and 10 <= len(loads[0]) < 110
+
+def test_source_timeouts_can_be_configured():
+    sources = sources_with_timeouts("csv=900, api=45")
+    assert {source.name: source.timeout for source in sources} == {"api": 45.0, "csv": 900.0, "db": 60}
+    assert sources_with_timeouts(None) == main.SOURCES
+    with pytest.raises(ValueError, match="Unknown sources in timeouts: ftp"):
+        sources_with_timeouts("ftp=10")
@@ -0,0 +1,228 @@
+import pymongo
+import pytest
+
+import main
+from main import load_to_mongodb
+
+class InsertResult:
+    def __init__(self, inserted_ids):
+        self.inserted_ids = inserted_ids
+
+class BulkWriteResult:
+    def __init__(self, operations):
+        self.bulk_api_result = {"operations": len(operations)}
+
+class Cursor:
+    def __init__(self, db, documents):
+        self.db = db
+        self.documents = documents
+
+    def hint(self, index):
+        self.db.hints.append(index)
+        return self
+
+    def __iter__(self):
+        return iter(self.documents)
+
+def matches(document, query):
+    return all(document.get(field) in condition["$in"] for field, condition in query.items())
+
+class Collection:
+    """
+    The part of a pymongo collection a full refresh uses. Like pymongo's, it is a handle
+    on the named collection of the database.
+    """
+    def __init__(self, db, name):
+        self.db = db
+        self.name = name
+
+    @property
+    def documents(self):
+        return self.db.data.get(self.name, {}).get("documents", [])
+
+    @property
+    def indexes(self):
+        return self.db.data.get(self.name, {}).get("indexes", {})
+
+    def _create(self):
+        return self.db.data.setdefault(self.name, {"documents": [], "indexes": {}})
+
+    def insert_many(self, documents, ordered=True):
+        data = self._create()
+        keys = {(document["name"], document["category"]) for document in data["documents"]}
+        unique = any(options.get("unique") for options in data["indexes"].values())
+        inserted, errors = [], []
+        for document in documents:
+            if unique and (document["name"], document["category"]) in keys:
+                errors.append({"code": 11000})
+                continue
+            inserted.append(document)
+            if len(inserted) != self.db.lose_document:
+                data["documents"].append(document)
+        if errors:
+            raise pymongo.errors.BulkWriteError({"writeErrors": errors, "nInserted": len(inserted)})
+        return InsertResult(inserted)
+
+    def count_documents(self, query):
+        return len(self.documents)
+
+    def find(self, query, projection):
+        self.db.queries.append(query)
+        fields = [field for field, included in projection.items() if included]
+        return Cursor(self.db, [{field: document[field] for field in fields if field in document}
+                                for document in self.documents if matches(document, query)])
+
+    def bulk_write(self, operations, ordered=True):
+        self.db.bulk_writes.append(operations)
+        data = self._create()
+        for operation in operations:
+            if isinstance(operation, pymongo.InsertOne):
+                data["documents"].append(operation._doc)
+            else:
+                for document in data["documents"]:
+                    if all(document.get(field) == value for field, value in operation._filter.items()):
+                        document.update(operation._doc["$set"])
+        return BulkWriteResult(operations)
+
+    def create_index(self, keys, name, **options):
+        if options.get("unique"):
+            keys = [(document["name"], document["category"]) for document in self.documents]
+            if len(set(keys)) != len(keys):
+                raise pymongo.errors.OperationFailure("E11000 duplicate key error")
+        self._create()["indexes"][name] = options
+
+    def drop(self):
+        self.db.data.pop(self.name, None)
+
+    def rename(self, new_name, dropTarget=False):
+        assert dropTarget
+        self.db.data[new_name] = self.db.data.pop(self.name)
+
+class Database:
+    def __init__(self):
+        self.data = {}
+        self.lose_document = None
+        self.queries = []
+        self.hints = []
+        self.bulk_writes = []
+
+    def __getitem__(self, name):
+        return Collection(self, name)
+
+    def list_collection_names(self):
+        return sorted(self.data)
+
+class Client:
+    def __init__(self, db):
+        self.db = db
+
+    def __getitem__(self, name):
+        return self.db
+
+    def close(self):
+        pass
+
+@pytest.fixture
+def db(monkeypatch):
+    db = Database()
+    db["products"].insert_many([{"name": "Old", "category": "x"}])
+    monkeypatch.setattr(main.pymongo, "MongoClient", lambda url: Client(db))
+    return db
+
+def records(count):
+    return [{"name": f"Product {i}", "price": float(i), "category": "x", "subcategory": None} for i in range(count)]
+
+def test_full_refresh_swaps_in_a_loaded_shadow(db):
+    batches = []
+    counts = load_to_mongodb(records(95), full_refresh=True, batch_size=10, workers=3, on_batch=batches.append)
+    assert counts == {"inserted": 95, "updated": 0, "unchanged": 0}
+    assert batches == list(range(1, 11))
+    live = db["products"]
+    assert sorted(document["price"] for document in live.documents) == [float(i) for i in range(95)]
+    assert set(live.indexes) == {"name_1_category_1", "name_1_category_1_contentHash_1"}
+    assert db.list_collection_names() == ["products"]
+
+def test_count_mismatch_leaves_the_live_collection(db):
+    # The third document of each insert is acknowledged but not stored
+    db.lose_document = 3
+    with pytest.raises(RuntimeError, match="instead of 20"):
+        load_to_mongodb(records(20), full_refresh=True, batch_size=10, workers=2)
+    assert [document["name"] for document in db["products"].documents] == ["Old"]
+
+def test_resumed_refresh_continues_the_shadow(db):
+    # The first run stopped after inserting its first batch, and part of the second
+    db["products_shadow"].insert_many([dict(record) for record in records(15)])
+    counts = load_to_mongodb(records(30)[10:], full_refresh=True, batch_size=10, workers=2, resume_from=10)
+    assert counts["inserted"] == 15
+    assert sorted(document["price"] for document in db["products"].documents) == [float(i) for i in range(30)]
+    assert db.list_collection_names() == ["products"]
+    # Once the shadow is renamed, resuming again leaves the live collection alone
+    load_to_mongodb([], full_refresh=True, resume_from=30)
+    assert len(db["products"].documents) == 30
+
+def test_resumed_refresh_checks_the_records_loaded_before(db):
+    # The first run acknowledged a batch of 10 records, but the shadow only kept 5 of them
+    db["products_shadow"].insert_many([dict(record) for record in records(5)])
+    with pytest.raises(RuntimeError, match="25 documents instead of 30"):
+        load_to_mongodb(records(30)[10:], full_refresh=True, batch_size=10, resume_from=10)
+    assert [document["name"] for document in db["products"].documents] == ["Old"]
+
+def test_duplicate_keys_abort_the_swap(db):
+    with pytest.raises(RuntimeError, match="duplicate keys"):
+        load_to_mongodb(records(10) + records(1), full_refresh=True, batch_size=10)
+    assert [document["name"] for document in db["products"].documents] == ["Old"]
+
+def by_key(documents):
+    return {(document["name"], document["category"]): document for document in documents}
+
+def test_incremental_load_inserts_updates_and_skips(db):
+    first = load_to_mongodb(records(3), batch_size=10)
+    assert first == {"inserted": 3, "updated": 0, "unchanged": 0}
+
+    changed = records(4)
+    changed[1]["price"] = 99.0
+    # Loaded before hashing: no contentHash, so it is updated once
+    changed.append({"name": "Old", "price": 1.0, "category": "x", "subcategory": None})
+    second = load_to_mongodb(changed, batch_size=10)
+    assert second == {"inserted": 1, "updated": 2, "unchanged": 2}
+    documents = by_key(db["products"].documents)
+    assert len(db["products"].documents) == 5
+    assert documents[("Product 1", "x")]["price"] == 99.0
+    # The $set carries the new content hash, so the next run finds the record unchanged
+    updates = [operation for operation in db.bulk_writes[-1] if isinstance(operation, pymongo.UpdateOne)]
+    assert {operation._doc["$set"]["contentHash"] for operation in updates} == \
+        {main.content_hash(changed[1]), main.content_hash(changed[4])}
+    assert documents[("Product 1", "x")]["contentHash"] == main.content_hash(changed[1])
+    assert documents[("Old", "x")]["contentHash"] == main.content_hash(changed[4])
+
+    assert load_to_mongodb(changed, batch_size=10) == {"inserted": 0, "updated": 0, "unchanged": 5}
+
+def test_lookups_cover_only_each_batch(db):
+    load_to_mongodb(records(5), batch_size=2)
+    assert [sorted(query["name"]["$in"]) for query in db.queries] == \
+        [["Product 0", "Product 1"], ["Product 2", "Product 3"], ["Product 4"]]
+    assert all(query["category"] == {"$in": ["x"]} for query in db.queries)
+    # Covered by the (name, category, contentHash) index
+    assert db.hints == [main.HASH_INDEX] * 3
+
+def test_names_and_categories_of_other_keys_are_not_matches(db):
+    db["products"].insert_many([
+        {"name": "A", "category": "y", "contentHash": "a-in-y"},
+        {"name": "B", "category": "x", "contentHash": "b-in-x"},
+    ])
+    batch = [{"name": "A", "price": 1.0, "category": "x", "subcategory": None},
+             {"name": "B", "price": 2.0, "category": "y", "subcategory": None}]
+    # The $in lookup finds (A, y) and (B, x), which are other products
+    assert main.find_existing_hashes(db["products"], batch) == {}
+    assert load_to_mongodb(batch) == {"inserted": 2, "updated": 0, "unchanged": 0}
+    assert by_key(db["products"].documents)[("A", "y")]["contentHash"] == "a-in-y"
+
+def test_incremental_load_without_the_unique_index(db, capsys):
+    # Duplicates already in the collection prevent the unique index
+    db["products"].insert_many([{"name": "Old", "category": "x"}])
+    counts = load_to_mongodb(records(2), batch_size=10)
+    assert counts == {"inserted": 2, "updated": 0, "unchanged": 0}
+    assert "Could not create the unique (name, category) index" in capsys.readouterr().out
+    # Lookups still use the hash index
+    assert set(db["products"].indexes) == {"name_1_category_1_contentHash_1"}
+    assert db.hints == [main.HASH_INDEX]
@@ -0,0 +1,81 @@
+import os
+
+import pytest
+
+from main import (MemoryMonitor, StreamingDeduplicator, dedup_key, deduplicate_records, extract_synthetic,
+                  run_etl_streaming, transform)
+
+def expected(rows, distinct_keys):
+    records = [transform(record) for record in extract_synthetic(rows, distinct_keys)]
+    return {dedup_key(record): record for record in deduplicate_records([record for record in records if record])}
+
+class Collect:
+    def __init__(self):
+        self.records = []
+
+    def __call__(self, records):
+        self.records.extend(records)
+
+    def by_key(self):
+        assert len(self.records) == len({dedup_key(record) for record in self.records})
+        return {dedup_key(record): record for record in self.records}
+
+def test_streaming_run_matches_the_batch_deduplication():
+    load = Collect()
+    summary = run_etl_streaming(sources=extract_synthetic(5000, 300), load=load, chunk_size=100, queue_size=2)
+    assert load.by_key() == expected(5000, 300)
+    assert summary["extracted"] == 5000
+    assert summary["deduplicated"] == len(load.records)
+
+def test_streaming_run_with_external_dedup_removes_its_spill_files(tmp_path):
+    load = Collect()
+    summary = run_etl_streaming(sources=extract_synthetic(5000, 300), load=load, chunk_size=100, queue_size=2,
+                                external_dedup=True, spill_dir=str(tmp_path))
+    assert load.by_key() == expected(5000, 300)
+    assert "peak_disk_mb" in summary
+    assert os.listdir(tmp_path) == []
+
+def test_dedup_state_spills_once_over_its_share_of_the_ceiling(tmp_path):
+    records = [record for record in map(transform, extract_synthetic(5000, 300)) if record]
+    deduplicator = StreamingDeduplicator(100 * StreamingDeduplicator.RECORD_BYTES, str(tmp_path))
+    for record in records:
+        deduplicator.add(record)
+    assert deduplicator.spilling is not None and deduplicator.records == {}
+    merged = {dedup_key(record): record for record in deduplicator.results()}
+    assert merged == expected(5000, 300)
+    assert os.listdir(tmp_path) == []
+
+def test_streaming_run_enforces_the_memory_ceiling(tmp_path):
+    load = Collect()
+    # The records in flight take about 7 of the 8 MB, leaving the deduplication state about 1400 keys
+    summary = run_etl_streaming(sources=extract_synthetic(10000, 3000), load=load, chunk_size=1000, queue_size=2,
+                                memory_limit_mb=8, spill_dir=str(tmp_path))
+    assert load.by_key() == expected(10000, 3000)
+    assert "peak_disk_mb" in summary
+    assert os.listdir(tmp_path) == []
+
+def test_failed_stage_stops_the_run(tmp_path):
+    def failing_source():
+        yield from extract_synthetic(500, 50)
+        raise ConnectionError("source failed")
+
+    with pytest.raises(ConnectionError):
+        run_etl_streaming(sources=failing_source(), load=Collect(), chunk_size=100, external_dedup=True,
+                          spill_dir=str(tmp_path))
+    assert os.listdir(tmp_path) == []
+
+def test_failed_load_stops_the_run():
+    def failing_load(records):
+        next(iter(records))
+        raise RuntimeError("database unavailable")
+
+    with pytest.raises(RuntimeError, match="database unavailable"):
+        run_etl_streaming(sources=extract_synthetic(5000, 300), load=failing_load, chunk_size=100, queue_size=1)
+
+def test_memory_monitor_warns_once_and_stops(capsys):
+    monitor = MemoryMonitor(limit_mb=1, interval=0.01)
+    monitor.start()
+    monitor.stop()
+    assert not monitor.is_alive()
+    assert monitor.peak_mb > 1
+    assert capsys.readouterr().out.count("over the 1 MB ceiling") == 1
@@ -0,0 +1,97 @@
+import csv
+import math
+import random
+
+from main import extract_synthetic, read_csv_batches, transform, transform_batch
+
+HEADER = ["name", "price", "category", "subcategory"]
+
+# Rows exercising every rule of transform, and the ways a row can be invalid
+EDGE_CASES = [
+    ["apple iPhone 12", "699.99", "Electronics", ""],
+    ["  sony  headphones ", " 149.99 ", " Accessories ", " Audio "],
+    ["o'neil's ßtore", "1_000", "ÉLECTRONIQUE", ""],
+    ["ǆungla", "١٢", "toys", "  "],
+    ["ﬃ İstanbul ΐ", "+.5", "Ñandú", "Ǆ"],
+    ["they're 4g-lte x2b", "1.", "x", "Phone"],
+    ["\x1c separators \x1f", "\x0b3\x0c", "\x1cx", "\x1d"],
+    ["nan price", "nan", "x", ""],
+    ["inf price", "-inf", "x", ""],
+    ["exponent", "1e3", "x", "SUB"],
+    ["big exponent", "1e400", "x", ""],
+    ["many digits", "0.1000000000000000055511151231257827", "x", ""],
+    ["invalid price", "n/a", "x", ""],
+    ["empty price", "", "x", ""],
+    ["hex price", "0x10", "x", ""],
+    ["double sign", "--1", "x", ""],
+    ["multi\nline, \"quoted\"", "5", "x", ""],
+    ["tabs\t", " 2.5\t", "\tTabs\n", ""],
+    ["", "0", "", ""],
+]
+
+def write_csv(path, rows, header=HEADER):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+    return path
+
+def per_record(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return [result for result in map(transform, csv.DictReader(f)) if result is not None]
+
+def columnar(path, block_size=1 << 20):
+    return [record for batch in read_csv_batches(path, block_size) for record in transform_batch(batch)]
+
+def same(expected, actual):
+    assert len(expected) == len(actual)
+    for left, right in zip(expected, actual):
+        assert list(left) == list(right)
+        for field in left:
+            if isinstance(left[field], float) and math.isnan(left[field]):
+                assert math.isnan(right[field])
+            else:
+                assert left[field] == right[field] and type(left[field]) is type(right[field])
+
+def test_edge_cases_match_per_record_transform(tmp_path, capsys):
+    path = write_csv(tmp_path / "products.csv", EDGE_CASES)
+    expected = per_record(path)
+    expected_output = capsys.readouterr().out
+    same(expected, columnar(path))
+    # Invalid rows are reported exactly as the per-record path reports them
+    assert capsys.readouterr().out == expected_output
+
+def test_small_blocks_match(tmp_path):
+    path = write_csv(tmp_path / "products.csv", EDGE_CASES * 20)
+    same(per_record(path), columnar(path, block_size=256))
+
+def test_random_rows_match(tmp_path):
+    rng = random.Random(3)
+    pieces = ["", " ", "  a", "B ", "ß", "ǆ", "o'k", "x-y", "\t", "Ñandú", "42", "1.5", "nan", "n/a", "1e-3", "-7", "1_0",
+              "ﬃ", "İ", "ΐ", ",", '"', "\n"]
+    rows = [["".join(rng.choice(pieces) for _ in range(rng.randint(0, 3))) for _ in HEADER] for _ in range(2000)]
+    path = write_csv(tmp_path / "products.csv", rows)
+    same(per_record(path), columnar(path, block_size=4096))
+
+def test_missing_columns_match(tmp_path):
+    path = write_csv(tmp_path / "products.csv", [["  widget ", "Tools"], ["gadget", ""]], header=["name", "category"])
+    same(per_record(path), columnar(path))
+
+def test_rows_with_wrong_field_count_match(tmp_path, capsys):
+    path = tmp_path / "products.csv"
+    path.write_text("name,price,category\nshort row,1.0\nlong row,2.0,toys,extra\nok,3.0,x\n", encoding="utf-8")
+    expected = per_record(path)
+    expected_output = capsys.readouterr().out
+    # Rows Arrow rejects come after their block, so compare regardless of order
+    assert sorted(map(repr, columnar(path))) == sorted(map(repr, expected))
+    assert sorted(capsys.readouterr().out.splitlines()) == sorted(expected_output.splitlines())
+
+def test_synthetic_rows_match(tmp_path):
+    rows = [[record["name"], record["price"], record["category"], record.get("subcategory", "")]
+            for record in extract_synthetic(20000, distinct_keys=500, seed=9)]
+    path = write_csv(tmp_path / "products.csv", rows)
+    same(per_record(path), columnar(path, block_size=65536))
+
+def test_list_chunks_are_transformed_per_record():
+    records = [{"name": " a ", "price": 1, "category": "X"}, {"name": None, "price": "1"}]
+    assert transform_batch(records) == [{"name": "A", "price": 1.0, "category": "x", "subcategory": None}]